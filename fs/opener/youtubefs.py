@@ -11,15 +11,22 @@ __copyright__ = "Copyright (c) 2017 media-proxy"
 __author__ = "media-proxy"
 __version__ = 'dev'
 
-# Dynamically get the version of the main module
+# Dynamically get the version of the main module, without the slow
+# `pkg_resources` working set scan: openers are loaded by every process
+# using `fs.open_fs`
 try:
-    import pkg_resources
-    _name = __name__.replace('.opener', '')
-    __version__ = pkg_resources.get_distribution(_name).version
+    from importlib import metadata as _metadata
+except ImportError:  # pragma: no cover
+    try:
+        import importlib_metadata as _metadata
+    except ImportError:
+        _metadata = None
+try:
+    __version__ = _metadata.version('fs.youtube')
 except Exception:  # pragma: no cover
-    pkg_resources = None
+    pass
 finally:
-    del pkg_resources
+    del _metadata
 
 
 class YouTubeOpener(Opener):
@@ -33,14 +40,21 @@ class YouTubeOpener(Opener):
         from ..youtube import YoutubeFS
 
         _, _, _, ytuuid, params, _ = parse_result
+        options = {
+            'quality': params.get('quality', 'best'),
+            'extractor': params.get('extractor'),
+            'sidecars': [
+                kind for kind in params.get('sidecars', '').split(',') if kind
+            ],
+        }
         if 'v' in params:
-            return YoutubeFS(params['v'], playlist=False)
+            return YoutubeFS(params['v'], playlist=False, **options)
         if 'list' in params:
-            return YoutubeFS(params['list'])
+            return YoutubeFS(params['list'], **options)
 
         try:
-            yt_fs = YoutubeFS(ytuuid)
+            yt_fs = YoutubeFS(ytuuid, **options)
         except ValueError:
-            yt_fs = YoutubeFS(ytuuid, playlist=False)
+            yt_fs = YoutubeFS(ytuuid, playlist=False, **options)
 
         return yt_fs
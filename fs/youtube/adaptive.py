@@ -0,0 +1,476 @@
+# coding: utf-8
+"""Read fragmented HLS and DASH streams as one continuous file.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import bisect
+import collections
+import io
+import re
+import socket
+import xml.etree.ElementTree as ElementTree
+from multiprocessing.pool import ThreadPool
+
+from six.moves import http_client
+from six.moves.urllib.parse import urljoin
+
+from .. import errors
+from .pool import HTTPConnectionPool
+from .shaping import BACKGROUND
+from .shaping import INTERACTIVE
+
+#: youtube-dl protocols of streams served as HLS media playlists.
+HLS_PROTOCOLS = ('m3u8', 'm3u8_native')
+
+#: youtube-dl protocols of streams served as DASH fragments.
+DASH_PROTOCOLS = ('http_dash_segments',)
+
+_ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class Segment(object):
+    """A segment of a fragmented stream.
+
+    Arguments:
+        url (str): The URL of the segment.
+        offset (int, optional): The offset of the segment in the
+            resource at ``url``, if it is a byte range of it.
+        length (int, optional): The size of the segment in bytes, if
+            known.
+
+    """
+
+    __slots__ = ('url', 'offset', 'length')
+
+    def __init__(self, url, offset=None, length=None):
+        self.url = url
+        self.offset = offset
+        self.length = length
+
+    def __eq__(self, other):
+        return (self.url, self.offset) == (other.url, other.offset)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Segment(%r, %r, %r)' % (self.url, self.offset, self.length)
+
+
+def _attributes(line):
+    return {
+        name: value.strip('"')
+        for name, value in _ATTRIBUTE.findall(line.partition(':')[2])
+    }
+
+
+def _byterange(value, default_offset):
+    length, _, offset = value.partition('@')
+    return int(length), int(offset) if offset else default_offset
+
+
+def parse_m3u8(text, base_url):
+    """Parse an HLS media playlist.
+
+    For a master playlist, the media playlist of the variant with the
+    highest bandwidth is returned as the only item of ``segments``,
+    with ``ended`` set to `None`.
+
+    Returns:
+        tuple: ``(segments, ended)``, where ``ended`` tells whether the
+        playlist is complete, or still growing for a live stream.
+
+    Raises:
+        ValueError: If ``text`` is not an M3U8 playlist.
+
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or lines[0] != '#EXTM3U':
+        raise ValueError('not an M3U8 playlist')
+
+    variants = []
+    segments = []
+    ended = False
+    byterange = None
+    next_offset = 0
+    bandwidth = None
+    for line in lines[1:]:
+        if line.startswith('#EXT-X-STREAM-INF'):
+            bandwidth = int(_attributes(line).get('BANDWIDTH', 0))
+        elif line.startswith('#EXT-X-MAP'):
+            attributes = _attributes(line)
+            url = urljoin(base_url, attributes['URI'])
+            if 'BYTERANGE' in attributes:
+                length, offset = _byterange(attributes['BYTERANGE'], 0)
+                segments.append(Segment(url, offset, length))
+            else:
+                segments.append(Segment(url))
+        elif line.startswith('#EXT-X-BYTERANGE'):
+            byterange = line.partition(':')[2]
+        elif line.startswith('#EXT-X-ENDLIST'):
+            ended = True
+        elif line.startswith('#'):
+            continue
+        elif bandwidth is not None:
+            variants.append((bandwidth, urljoin(base_url, line)))
+            bandwidth = None
+        else:
+            url = urljoin(base_url, line)
+            if byterange is None:
+                segments.append(Segment(url))
+            else:
+                length, offset = _byterange(byterange, next_offset)
+                segments.append(Segment(url, offset, length))
+                next_offset = offset + length
+                byterange = None
+
+    if variants:
+        return [Segment(max(variants)[1])], None
+    return segments, ended
+
+
+def parse_mpd(text, base_url, representation=None):
+    """Parse the segment list of a DASH manifest.
+
+    Only representations listing their segments with ``SegmentList``
+    are supported.
+
+    Arguments:
+        text (str): The MPD manifest.
+        base_url (str): The URL of the manifest.
+        representation (str, optional): The ``id`` of the
+            representation to read, defaults to the first one.
+
+    Returns:
+        list: The `Segment` of the representation, starting with its
+        initialization segment.
+
+    Raises:
+        ValueError: If the representation is not found.
+
+    """
+    root = ElementTree.fromstring(text)
+    namespace = root.tag[:root.tag.index('}') + 1] if root.tag[0] == '{' else ''
+
+    def base(element, url):
+        node = element.find(namespace + 'BaseURL')
+        return urljoin(url, node.text.strip()) if node is not None else url
+
+    url = base(root, base_url)
+    for period in root.iter(namespace + 'Period'):
+        period_url = base(period, url)
+        for adaptation in period.iter(namespace + 'AdaptationSet'):
+            adaptation_url = base(adaptation, period_url)
+            for rep in adaptation.iter(namespace + 'Representation'):
+                if representation is not None and rep.get('id') != representation:
+                    continue
+                rep_url = base(rep, adaptation_url)
+                segment_list = rep.find(namespace + 'SegmentList')
+                if segment_list is None:
+                    segment_list = adaptation.find(namespace + 'SegmentList')
+                if segment_list is None:
+                    continue
+                segments = []
+                init = segment_list.find(namespace + 'Initialization')
+                if init is not None:
+                    segments.append(_mpd_segment(
+                        rep_url, init.get('sourceURL'), init.get('range')))
+                for node in segment_list.iter(namespace + 'SegmentURL'):
+                    segments.append(_mpd_segment(
+                        rep_url, node.get('media'), node.get('mediaRange')))
+                return segments
+    raise ValueError('no segment list for representation %s' % representation)
+
+
+def _mpd_segment(base_url, media, byterange):
+    url = urljoin(base_url, media) if media else base_url
+    if not byterange:
+        return Segment(url)
+    start, _, end = byterange.partition('-')
+    return Segment(url, int(start), int(end) - int(start) + 1)
+
+
+def format_segments(info, base_url=None):
+    """Get the segments of a youtube-dl format with a ``fragments`` list.
+    """
+    base_url = info.get('fragment_base_url') or base_url or ''
+    return [
+        Segment(
+            fragment.get('url') or urljoin(base_url, fragment['path']),
+            length=fragment.get('filesize'),
+        )
+        for fragment in info['fragments']
+    ]
+
+
+def is_fragmented(info):
+    """Tell whether a youtube-dl format is an HLS or DASH stream.
+    """
+    return (info or {}).get('protocol') in HLS_PROTOCOLS + DASH_PROTOCOLS
+
+
+class AdaptiveHTTPFile(io.RawIOBase):
+    """A read-only file over the segments of a fragmented stream.
+
+    The segments are fetched whole, ``prefetch`` of them ahead of the
+    reader on a thread pool, and the last ``cache_segments`` are kept in
+    memory. Byte offsets are mapped to segments with an index of their
+    sizes, learned as segments are fetched: a seek ahead fetches the
+    sizes of the skipped segments with concurrent HEAD requests.
+
+    A live HLS stream is reloaded when the reader reaches its last
+    segment, so the file grows as new segments are published.
+
+    Arguments:
+        segments (list): The `Segment` objects of the stream.
+        pool (HTTPConnectionPool, optional): The pool used for requests.
+        prefetch (int): The number of segments fetched ahead.
+        cache_segments (int, optional): The number of segments kept in
+            memory, defaults to twice ``prefetch``.
+        reload (callable, optional): Called to get the segments of a
+            live playlist again, returns ``(segments, ended)``.
+
+    """
+
+    def __init__(self, segments, pool=None, prefetch=2, cache_segments=None,
+                 reload=None):
+        super(AdaptiveHTTPFile, self).__init__()
+        self.pos = 0
+        self.prefetch = max(prefetch, 0)
+        self.cache_segments = max(cache_segments or 2 * self.prefetch, 1)
+        self.requests = 0
+        self._pool = pool or HTTPConnectionPool()
+        self._segments = list(segments)
+        self._starts = [0]
+        self._reload = reload
+        self._data = collections.OrderedDict()
+        self._pending = {}
+        self._workers = ThreadPool(max(self.prefetch, 1))
+
+    @classmethod
+    def from_format(cls, info, pool=None, **kwargs):
+        """Open the stream of a youtube-dl format.
+
+        Raises:
+            fs.errors.RemoteConnectionError: If the manifest can't be
+                fetched.
+            ValueError: If the format is not a supported HLS or DASH
+                stream.
+
+        """
+        pool = pool or HTTPConnectionPool()
+        protocol = info.get('protocol')
+        if info.get('fragments'):
+            return cls(format_segments(info), pool, **kwargs)
+        if protocol in DASH_PROTOCOLS and info.get('manifest_url'):
+            url = info['manifest_url']
+            segments = parse_mpd(
+                _get(pool, url).decode('utf-8'), url, info.get('format_id'))
+            return cls(segments, pool, **kwargs)
+        if protocol not in HLS_PROTOCOLS:
+            raise ValueError('unsupported protocol: %s' % protocol)
+
+        playlist = [info['url']]
+
+        def reload():
+            url = playlist[0]
+            return parse_m3u8(_get(pool, url).decode('utf-8'), url)
+
+        segments, ended = reload()
+        if ended is None:
+            # A master playlist: read its best variant
+            playlist[0] = segments[0].url
+            segments, ended = reload()
+        return cls(segments, pool, reload=None if ended else reload, **kwargs)
+
+    @property
+    def size(self):
+        """int: The size of the stream, or `None` if it is not known yet.
+        """
+        if len(self._starts) <= len(self._segments) or self._reload:
+            return None
+        return self._starts[-1]
+
+    def _request(self, segment, method='GET', priority=INTERACTIVE):
+        headers = {}
+        if segment.offset is not None:
+            end = ''
+            if segment.length is not None:
+                end = segment.offset + segment.length - 1
+            headers['Range'] = 'bytes=%s-%s' % (segment.offset, end)
+        self.requests += 1
+        try:
+            res = self._pool.urlopen(
+                segment.url, headers=headers, method=method, priority=priority)
+            if res.status >= 400:
+                res.close()
+                raise errors.RemoteConnectionError(
+                    msg='HTTP Error %s: %s' % (res.status, res.reason))
+            if method == 'HEAD':
+                return res
+            return res.read()
+        except (http_client.HTTPException, socket.error) as error:
+            raise errors.RemoteConnectionError(msg=str(error))
+
+    def _fetch_length(self, index):
+        segment = self._segments[index]
+        if segment.length is None:
+            length = self._request(segment, 'HEAD').getheader('Content-Length')
+            if length is None:
+                # No size in the headers: the whole segment is needed
+                self._download(index)
+            else:
+                segment.length = int(length)
+        return segment.length
+
+    def _index_lengths(self, stop):
+        """Extend the offset index over the segments before ``stop``.
+        """
+        first = len(self._starts) - 1
+        if first >= stop:
+            return
+        unknown = [
+            i for i in range(first, stop) if self._segments[i].length is None
+        ]
+        if unknown:
+            self._workers.map(self._fetch_length, unknown)
+        for i in range(first, stop):
+            self._starts.append(self._starts[-1] + self._segments[i].length)
+
+    def _grow(self):
+        """Reload a live playlist, returning whether segments were added.
+        """
+        if self._reload is None:
+            return False
+        segments, ended = self._reload()
+        if ended:
+            self._reload = None
+        known = self._segments[-1] if self._segments else None
+        new = segments
+        if known is not None and known in segments:
+            new = segments[segments.index(known) + 1:]
+        self._segments.extend(new)
+        return bool(new)
+
+    def _locate(self, pos):
+        """Return ``(index, offset)`` of the segment holding ``pos``.
+
+        ``index`` is the number of segments if ``pos`` is past the end.
+        """
+        while True:
+            index = bisect.bisect_right(self._starts, pos) - 1
+            if index < len(self._starts) - 1:
+                return index, pos - self._starts[index]
+            first = len(self._starts) - 1
+            if first < len(self._segments):
+                if pos == self._starts[first]:
+                    # Reading on sequentially: no need for its size yet
+                    return first, 0
+                # Past the indexed segments: extend the index by a batch
+                stop = first + max(self.prefetch, 1) * 4
+                self._index_lengths(min(stop, len(self._segments)))
+            elif not self._grow():
+                return len(self._segments), 0
+
+    def _download(self, index, priority=INTERACTIVE):
+        data = self._request(self._segments[index], priority=priority)
+        self._segments[index].length = len(data)
+        return data
+
+    def _schedule(self, index):
+        if (index < len(self._segments) and index not in self._data
+                and index not in self._pending):
+            self._pending[index] = self._workers.apply_async(
+                self._download, (index, BACKGROUND))
+
+    def _segment(self, index):
+        data = self._data.pop(index, None)
+        if data is None:
+            pending = self._pending.pop(index, None)
+            if pending is not None:
+                data = pending.get()
+            else:
+                data = self._download(index)
+        self._data[index] = data
+        while len(self._data) > self.cache_segments:
+            self._data.popitem(last=False)
+        return data
+
+    def read(self, size=-1):
+        chunks = []
+        while size != 0:
+            index, offset = self._locate(self.pos)
+            if index >= len(self._segments):
+                break
+            for stale in [i for i in self._pending if i < index]:
+                # Skipped by a seek: drop its result
+                del self._pending[stale]
+            for ahead in range(index + 1, index + 1 + self.prefetch):
+                self._schedule(ahead)
+            data = self._segment(index)
+            self._index_lengths(index + 1)
+            chunk = data[offset:] if size < 0 else data[offset:offset + size]
+            if not chunk:
+                if data:
+                    break
+                continue
+            chunks.append(chunk)
+            self.pos += len(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b''.join(chunks)
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            pos = offset
+        elif whence == 1:
+            pos = self.pos + offset
+        elif whence == 2:
+            if self._reload is not None:
+                raise errors.Unsupported('seek from end of a live stream.')
+            self._index_lengths(len(self._segments))
+            pos = self._starts[-1] + offset
+        else:
+            raise errors.Unsupported('Whence must be 0, 1 or 2')
+        if pos < 0:
+            raise ValueError('negative seek position %s' % pos)
+        self.pos = pos
+        return self.pos
+
+    def close(self):
+        if not self.closed:
+            self._workers.terminate()
+            self._pending.clear()
+            self._data.clear()
+        super(AdaptiveHTTPFile, self).close()
+
+    @classmethod
+    def writable(self):
+        return False
+
+
+def _get(pool, url):
+    try:
+        res = pool.urlopen(url)
+        data = res.read()
+    except (http_client.HTTPException, socket.error) as error:
+        raise errors.RemoteConnectionError(msg=str(error))
+    if res.status >= 400:
+        raise errors.RemoteConnectionError(
+            msg='HTTP Error %s: %s' % (res.status, res.reason))
+    return data
@@ -0,0 +1,717 @@
+# coding: utf-8
+"""An asyncio front-end to `YoutubeFS`, for Python 3.5 and later.
+
+Streams are read with non-blocking HTTP/1.1 range requests sent over
+`asyncio` streams, so one event loop serves many concurrent readers
+without a thread per connection. Extractions still go through the
+blocking extractor of the filesystem: they run on an executor, and so
+do reads of sidecars and of HLS or DASH streams.
+
+This module uses ``async`` syntax and can't be imported on Python 2.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import asyncio
+import collections
+import functools
+import socket
+import time
+
+from six.moves.urllib.parse import urljoin
+from six.moves.urllib.parse import urlsplit
+
+from .. import errors
+from .adaptive import is_fragmented
+from .cache import url_expiry
+from .metrics import NullMetrics
+from .pool import HTTPConnectionPool
+from .pool import REDIRECT_CODES
+from .youtubefs import YoutubeFS
+
+#: Errors meaning a reused keep-alive connection was dropped by the server.
+STALE_ERRORS = (ConnectionError, asyncio.IncompleteReadError)
+
+# The loop of the calling coroutine, `get_event_loop` before Python 3.7
+_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+class AsyncResponse(object):
+    """A response read from an `AsyncHTTPConnectionPool` connection.
+
+    The connection goes back to the pool once the body is read to the
+    end, and is closed if the response is closed before that.
+
+    Arguments:
+        status (int): The status code.
+        reason (str): The reason phrase.
+        headers (dict): The headers, with lowercase names.
+        conn (tuple): The ``(reader, writer)`` pair of the connection.
+        pool (AsyncHTTPConnectionPool): The pool owning ``conn``.
+        key (tuple): The ``(scheme, host, port)`` key of ``conn``.
+        method (str): The method of the request.
+
+    """
+
+    def __init__(self, status, reason, headers, conn, pool, key, method):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._conn = conn
+        self._pool = pool
+        self._key = key
+        self._chunked = 'chunked' in headers.get('transfer-encoding', '').lower()
+        self._chunk_left = 0
+        length = headers.get('content-length')
+        self._remaining = int(length) if length and not self._chunked else None
+        if method == 'HEAD' or status in (204, 304) or status < 200:
+            self._remaining = 0
+            self._chunked = False
+        self.will_close = (
+            headers.get('connection', '').lower() == 'close'
+            or (self._remaining is None and not self._chunked)
+        )
+        if self._remaining == 0:
+            self.close()
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name.lower(), default)
+
+    async def _read_chunked(self, size):
+        reader = self._conn[0]
+        if not self._chunk_left:
+            line = await reader.readline()
+            self._chunk_left = int(line.split(b';')[0], 16)
+            if not self._chunk_left:
+                # Skip the trailers up to the final empty line
+                while (await reader.readline()).strip():
+                    pass
+                return b'', True
+        count = self._chunk_left if size < 0 else min(size, self._chunk_left)
+        data = await reader.readexactly(count)
+        self._chunk_left -= count
+        if not self._chunk_left:
+            await reader.readexactly(2)
+        return data, False
+
+    async def read(self, size=-1):
+        """Read up to ``size`` bytes of the body, or all of it.
+        """
+        if self._conn is None or size == 0:
+            return b''
+        reader = self._conn[0]
+        try:
+            if self._chunked:
+                chunks = []
+                while True:
+                    data, done = await self._read_chunked(size)
+                    chunks.append(data)
+                    if done or size >= 0:
+                        break
+                data = b''.join(chunks)
+            elif self._remaining is None:
+                data = await reader.read(size)
+                done = not data
+            else:
+                count = self._remaining if size < 0 else min(size, self._remaining)
+                data = await reader.readexactly(count)
+                self._remaining -= count
+                done = not self._remaining
+        except asyncio.IncompleteReadError as error:
+            data, done = error.partial, True
+            self.will_close = True
+        self._pool.metrics.incr('http_bytes', len(data))
+        if done:
+            self.close()
+        return data
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        finished = self._remaining == 0 or (self._chunked and not self._chunk_left)
+        if finished and not self.will_close:
+            self._pool._put(self._key, conn)
+        else:
+            # Unread body left on the wire: the socket can't be reused
+            conn[1].close()
+
+    @property
+    def closed(self):
+        return self._conn is None
+
+
+class AsyncHTTPConnectionPool(object):
+    """A pool of persistent HTTP(S) connections for asyncio.
+
+    The asyncio counterpart of `~fs.youtube.pool.HTTPConnectionPool`.
+    Connections belong to the event loop they were opened on, so a pool
+    must only be used from a single loop.
+
+    Arguments:
+        maxsize (int): Maximum number of idle connections kept across
+            all hosts.
+        per_host (int): Maximum number of idle connections kept for a
+            single host.
+        idle_timeout (float): Seconds after which an idle connection is
+            closed instead of being reused.
+        timeout (float): Seconds to wait for a connection or for the
+            headers of a response.
+        metrics (Metrics, optional): Where request latencies, bytes read
+            and connection reuse are reported.
+
+    """
+
+    max_redirects = 5
+
+    def __init__(self, maxsize=16, per_host=4, idle_timeout=30.0,
+                 timeout=30.0, metrics=None):
+        self.maxsize = maxsize
+        self.per_host = per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.metrics = metrics or NullMetrics()
+        self._idle = collections.OrderedDict()
+        self._count = 0
+
+    _key = staticmethod(HTTPConnectionPool._key)
+
+    async def _new_conn(self, key):
+        scheme, host, port = key
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=scheme == 'https'),
+            self.timeout)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            # Range requests are tiny: don't let Nagle delay them
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return reader, writer
+
+    def _get(self, key):
+        """Return an idle connection for ``key``, or `None`.
+        """
+        self._evict()
+        conns = self._idle.get(key)
+        while conns:
+            conn, _ = conns.pop()
+            self._count -= 1
+            if not conns:
+                del self._idle[key]
+            if not conn[0].at_eof():
+                return conn
+            conn[1].close()
+        return None
+
+    def _put(self, key, conn):
+        conns = self._idle.setdefault(key, collections.deque())
+        if len(conns) >= self.per_host or self.maxsize <= 0:
+            conn[1].close()
+            return
+        conns.append((conn, time.time()))
+        self._count += 1
+        # Drop the least recently used connections over the budget
+        while self._count > self.maxsize:
+            oldest = min(self._idle, key=lambda k: self._idle[k][0][1])
+            self._idle[oldest].popleft()[0][1].close()
+            self._count -= 1
+            if not self._idle[oldest]:
+                del self._idle[oldest]
+
+    def _evict(self):
+        deadline = time.time() - self.idle_timeout
+        for key in list(self._idle):
+            conns = self._idle[key]
+            while conns and conns[0][1] < deadline:
+                conns.popleft()[0][1].close()
+                self._count -= 1
+            if not conns:
+                del self._idle[key]
+
+    async def _send(self, conn, key, method, path, headers):
+        reader, writer = conn
+        host = key[1] if key[2] in (80, 443) else '%s:%s' % (key[1], key[2])
+        lines = ['%s %s HTTP/1.1' % (method, path), 'Host: %s' % host]
+        lines.extend('%s: %s' % item for item in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+        if not status_line:
+            raise ConnectionResetError('connection closed by the server')
+        _, status, reason = (status_line.decode('latin-1').rstrip('\r\n') + ' ').split(' ', 2)
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        return AsyncResponse(
+            int(status), reason.strip(), response_headers, conn, self, key, method)
+
+    async def _request(self, key, method, path, headers):
+        conn = self._get(key)
+        if conn is not None:
+            try:
+                response = await self._send(conn, key, method, path, headers)
+                self.metrics.incr('http_connections_reused')
+                return response
+            except STALE_ERRORS:
+                # The server closed the keep-alive socket: retry once
+                conn[1].close()
+        conn = await self._new_conn(key)
+        self.metrics.incr('http_connections_opened')
+        try:
+            return await self._send(conn, key, method, path, headers)
+        except BaseException:
+            conn[1].close()
+            raise
+
+    async def urlopen(self, url, headers=None, method='GET'):
+        """Issue a request over a pooled connection.
+
+        Redirects are followed. Any other status is returned as is, so
+        callers must check `AsyncResponse.status`.
+
+        Returns:
+            AsyncResponse: The response, which must be read to the end
+            or closed to release its connection.
+
+        Raises:
+            OSError: On network errors.
+            asyncio.TimeoutError: If the server does not answer.
+
+        """
+        for _ in range(self.max_redirects + 1):
+            key = self._key(url)
+            parts = urlsplit(url)
+            path = parts.path or '/'
+            if parts.query:
+                path = '%s?%s' % (path, parts.query)
+            with self.metrics.timer('http_request_seconds'):
+                response = await self._request(key, method, path, headers or {})
+            if response.status not in REDIRECT_CODES:
+                return response
+            location = response.getheader('Location')
+            await response.read()
+            response.close()
+            if not location:
+                return response
+            url = urljoin(url, location)
+        raise ConnectionError('too many redirects: %s' % url)
+
+    def clear(self):
+        """Close every idle connection.
+        """
+        for conns in self._idle.values():
+            for conn, _ in conns:
+                conn[1].close()
+        self._idle.clear()
+        self._count = 0
+
+
+class AsyncSeekableHTTPFile(object):
+    """A read-only stream over HTTP Range requests, read with ``await``.
+
+    Works like `~fs.youtube.youtubefs.SeekableHTTPFile`: blocks aligned
+    on ``block_size`` are kept in a small LRU cache, and the read-ahead
+    window doubles up to ``readahead`` blocks while reads are
+    sequential, and the size learned from the responses stops reads at
+    the end of the stream. Only `read` touches the network, so `seek`
+    and `tell` are plain methods.
+
+    Use `open` to check the URL before reading.
+
+    Arguments:
+        url (str): The URL of the stream.
+        pool (AsyncHTTPConnectionPool): The pool used for range requests.
+        block_size (int): The size of a cached block in bytes.
+        readahead (int): Maximum number of blocks fetched by a single
+            request.
+        cache_blocks (int, optional): Maximum number of blocks kept in
+            memory, defaults to twice ``readahead``.
+        size (int, optional): The size of the stream, if known.
+        refresh (callable, optional): A coroutine function called with
+            the current URL, returning a new URL for the stream, used
+            when it expires or the server answers 403 or 410.
+        refresh_margin (float): Seconds before the ``expire`` of a
+            signed URL at which it is refreshed.
+
+    """
+
+    def __init__(self, url, pool, block_size=1024 * 1024, readahead=4,
+                 cache_blocks=None, size=None, refresh=None,
+                 refresh_margin=60):
+        self.url = url
+        self.pos = 0
+        self.block_size = block_size
+        self.readahead = max(readahead, 1)
+        self.cache_blocks = max(cache_blocks or 2 * self.readahead, self.readahead)
+        self.requests = 0
+        self.size = None
+        self.closed = False
+        self._pool = pool
+        self._blocks = collections.OrderedDict()
+        self._eof = None
+        self._window = 1
+        self._last = None
+        self._refresh = refresh
+        self.refresh_margin = refresh_margin
+        self._expires = url_expiry(url)
+        if size is not None:
+            self.size = size
+            self._eof = -(-size // block_size)
+
+    async def _refresh_url(self):
+        try:
+            url = await self._refresh(self.url)
+        except errors.FSError:
+            raise
+        except Exception as error:
+            raise errors.RemoteConnectionError(
+                msg='stream URL refresh failed: %s' % error)
+        self._pool.metrics.incr('url_refreshes')
+        self.url = url
+        self._expires = url_expiry(url)
+        if self._expires is not None and self._expired():
+            # The new URL is as close to expiry: don't refresh it again
+            self._expires = None
+
+    def _expired(self):
+        return time.time() >= self._expires - self.refresh_margin
+
+    async def _urlopen(self, headers=None, method='GET'):
+        """Request the stream, refreshing its URL when it expires.
+
+        Returns:
+            AsyncResponse: A response with a status below 400, or 416.
+
+        Raises:
+            fs.errors.RemoteConnectionError: On network and HTTP errors.
+
+        """
+        if self._refresh is not None and self._expires is not None:
+            if self._expired():
+                await self._refresh_url()
+        try:
+            res = await self._pool.urlopen(
+                self.url, headers=headers, method=method)
+            if res.status in (403, 410) and self._refresh is not None:
+                # Expired or revoked signature: retry with a new URL
+                res.close()
+                await self._refresh_url()
+                res = await self._pool.urlopen(
+                    self.url, headers=headers, method=method)
+        except (OSError, asyncio.TimeoutError) as error:
+            raise errors.RemoteConnectionError(msg=str(error))
+        if res.status >= 400 and res.status != 416:
+            res.close()
+            raise errors.RemoteConnectionError(
+                msg='HTTP Error %s: %s' % (res.status, res.reason))
+        return res
+
+    def _learn_size(self, res):
+        """Get the size of the stream from the headers of ``res``.
+        """
+        if self.size is not None:
+            return
+        content_range = res.getheader('Content-Range') or ''
+        total = content_range.rpartition('/')[2].strip()
+        if res.status == 200:
+            total = res.getheader('Content-Length') or ''
+        if total.isdigit():
+            self.size = int(total)
+            self._eof = -(-self.size // self.block_size)
+
+    async def open(self):
+        """Check that the stream can be read.
+
+        Returns:
+            AsyncSeekableHTTPFile: This file.
+
+        Raises:
+            fs.errors.RemoteConnectionError: If the server can't be
+                reached or answers with an error.
+
+        """
+        response = await self._urlopen(method='HEAD')
+        response.close()
+        self._learn_size(response)
+        return self
+
+    async def _fetch(self, index, count):
+        """Return up to ``count`` blocks from ``index``.
+        """
+        start = index * self.block_size
+        end = (index + count) * self.block_size - 1
+        rangeheader = {'Range': 'bytes=%s-%s' % (start, end)}
+
+        self.requests += 1
+        res = await self._urlopen(headers=rangeheader)
+        self._learn_size(res)
+        if res.status == 416:
+            res.close()
+            return []
+        try:
+            data = await res.read()
+        except (OSError, asyncio.TimeoutError) as error:
+            raise errors.RemoteConnectionError(msg=str(error))
+
+        if res.status == 200:
+            # Range header ignored: the whole file was sent
+            data = data[start:end + 1]
+
+        return [
+            data[offset:offset + self.block_size]
+            for offset in range(0, len(data), self.block_size)
+        ]
+
+    def _store(self, index, block):
+        self._blocks.pop(index, None)
+        self._blocks[index] = block
+        while len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
+
+    async def _block(self, index, sequential):
+        block = self._blocks.pop(index, None)
+        if block is not None:
+            self._blocks[index] = block
+            self._pool.metrics.incr('block_cache_hits')
+            return block
+        if self._eof is not None and index >= self._eof:
+            return b''
+        self._pool.metrics.incr('block_cache_misses')
+
+        if sequential:
+            self._window = min(self._window * 2, self.readahead)
+        else:
+            self._window = 1
+        count = self._window
+        if self._eof is not None:
+            count = min(count, self._eof - index)
+        blocks = await self._fetch(index, count)
+        for i, block in enumerate(blocks):
+            self._store(index + i, block)
+        if len(blocks) < count or len(blocks[-1]) < self.block_size:
+            self._eof = index + len(blocks)
+        return self._blocks.get(index, b'')
+
+    async def read(self, size=-1):
+        """Read up to ``size`` bytes, or to the end of the stream.
+
+        Raises:
+            fs.errors.RemoteConnectionError: If a range can't be read.
+
+        """
+        if self.closed:
+            raise ValueError('I/O operation on closed file.')
+        if self.size is not None:
+            remaining = max(self.size - self.pos, 0)
+            size = remaining if size < 0 else min(size, remaining)
+        sequential = self.pos == self._last
+        chunks = []
+        while size != 0:
+            index, offset = divmod(self.pos, self.block_size)
+            block = await self._block(index, sequential)
+            if offset >= len(block):
+                break
+            chunk = block[offset:] if size < 0 else block[offset:offset + size]
+            chunks.append(chunk)
+            self.pos += len(chunk)
+            if size > 0:
+                size -= len(chunk)
+            sequential = True
+
+        self._last = self.pos
+        return b''.join(chunks)
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            pos = offset
+        elif whence == 1:
+            pos = self.pos + offset
+        elif whence == 2:
+            if self.size is None:
+                raise errors.Unsupported('size of the stream is unknown.')
+            pos = self.size + offset
+        else:
+            raise errors.Unsupported('Whence must be 0, 1 or 2')
+        if pos < 0:
+            raise ValueError('negative seek position %s' % pos)
+        self.pos = pos
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def close(self):
+        self.closed = True
+        self._blocks.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+
+class AsyncFileWrapper(object):
+    """Read a blocking file object with ``await``, on an executor.
+
+    Used for the files `AsyncSeekableHTTPFile` can't read: sidecars,
+    and HLS or DASH streams.
+
+    Arguments:
+        file (io.IOBase): The file, opened for reading.
+        run (callable): Called with a blocking function and its
+            arguments, returns an awaitable of its result.
+
+    """
+
+    def __init__(self, file, run):
+        self._file = file
+        self._run = run
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    async def read(self, size=-1):
+        return await self._run(self._file.read, size)
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+
+class AsyncYoutubeFS(object):
+    """A `YoutubeFS` with coroutine methods, for asyncio servers.
+
+    Listing and metadata calls run the blocking `YoutubeFS` methods on
+    ``executor``; files are read with non-blocking range requests on
+    the event loop.
+
+    Constructing the filesystem fetches nothing, but may open the
+    index and disk cache and import the extractor: use `create` to do
+    that on the executor.
+
+    Arguments:
+        url (str): The YouTube URL for a Playlist or a Video.
+        executor (concurrent.futures.Executor, optional): Where blocking
+            extractions run, defaults to the loop's default executor.
+        **kwargs: Arguments of `YoutubeFS`. ``pool_size``,
+            ``pool_per_host``, ``pool_idle_timeout``, ``block_size``,
+            ``readahead`` and ``metrics`` also apply to the files
+            opened by `openbin`. ``max_connections``,
+            ``max_connections_per_host`` and ``bandwidth`` do not: they
+            only limit the requests of the blocking filesystem, which
+            include sidecars and HLS or DASH streams.
+
+    """
+
+    def __init__(self, url, executor=None, **kwargs):
+        self.fs = YoutubeFS(url, **kwargs)
+        self.executor = executor
+        self._pool = AsyncHTTPConnectionPool(
+            maxsize=kwargs.get('pool_size', 16),
+            per_host=kwargs.get('pool_per_host', 4),
+            idle_timeout=kwargs.get('pool_idle_timeout', 30.0),
+            metrics=self.fs.metrics,
+        )
+
+    @classmethod
+    async def create(cls, url, executor=None, **kwargs):
+        """Construct the filesystem on ``executor``.
+        """
+        loop = _running_loop()
+        return await loop.run_in_executor(
+            executor, functools.partial(cls, url, executor=executor, **kwargs))
+
+    @property
+    def metrics(self):
+        return self.fs.metrics
+
+    def _run(self, func, *args):
+        return _running_loop().run_in_executor(self.executor, func, *args)
+
+    async def listdir(self, path):
+        return await self._run(self.fs.listdir, path)
+
+    async def scandir(self, path, namespaces=None, page=None):
+        """Get a list of resource info, in the playlist order.
+        """
+        return await self._run(
+            lambda: list(self.fs.scandir(path, namespaces, page)))
+
+    async def getinfo(self, path, namespaces=None):
+        return await self._run(self.fs.getinfo, path, namespaces)
+
+    async def exists(self, path):
+        return await self._run(self.fs.exists, path)
+
+    async def openbin(self, path, mode='r'):
+        """Open a file for reading.
+
+        Streams are resolved like `YoutubeFS.openbin` resolves them, and
+        read on the event loop. Sidecars and HLS or DASH streams are
+        read from the file `YoutubeFS.openbin` opens, on the executor.
+
+        Returns:
+            AsyncSeekableHTTPFile: The opened file, or an
+            `AsyncFileWrapper` with the same methods.
+
+        Raises:
+            fs.errors.ResourceNotFound: If ``path`` does not exist.
+            fs.errors.RemoteConnectionError: If the stream can't be
+                reached.
+
+        """
+        if 'r' not in mode or set(mode) - set('rb'):
+            raise errors.Unsupported()
+        if self.fs.validatepath(path) not in self.fs._sidecar_paths:
+            stream = await self._run(self.fs._get_stream, path)
+            if not is_fragmented(stream['info']):
+                refresh = functools.partial(
+                    self._run, self.fs._refresh_url, stream['ref'],
+                    stream['itag'])
+                file = AsyncSeekableHTTPFile(
+                    stream['url'],
+                    self._pool,
+                    block_size=self.fs.block_size,
+                    readahead=self.fs.readahead,
+                    size=stream['size'],
+                    refresh=refresh,
+                    refresh_margin=self.fs.expiry_margin,
+                )
+                return await file.open()
+        file = await self._run(self.fs.openbin, path, 'rb')
+        return AsyncFileWrapper(file, self._run)
+
+    open = openbin
+
+    async def readbytes(self, path):
+        """Get the contents of a file.
+        """
+        stream = await self.openbin(path)
+        async with stream:
+            return await stream.read()
+
+    async def close(self):
+        self._pool.clear()
+        await self._run(self.fs.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
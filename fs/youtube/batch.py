@@ -0,0 +1,83 @@
+# coding: utf-8
+"""Concurrent, rate limited resolution of many videos.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+
+class RateLimiter(object):
+    """Space calls to `wait` out to at most ``rate`` per second.
+
+    Arguments:
+        rate (float, optional): The maximum number of calls per second,
+            `None` for no limit.
+
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class BatchResolver(object):
+    """Run a resolve function over many items on a bounded thread pool.
+
+    Arguments:
+        resolve (callable): Called with each item, returns its result.
+        workers (int): The number of items resolved concurrently.
+        rate (float, optional): The maximum number of calls to
+            ``resolve`` started per second.
+
+    """
+
+    def __init__(self, resolve, workers=8, rate=None):
+        self._resolve = resolve
+        self.workers = max(workers, 1)
+        self._limiter = RateLimiter(rate)
+
+    def _call(self, item):
+        self._limiter.wait()
+        try:
+            return item, self._resolve(item), None
+        except Exception as error:
+            return item, None, error
+
+    def map(self, items, ordered=False):
+        """Resolve ``items``, yielding results as they are ready.
+
+        Arguments:
+            items (iterable): The items to resolve. It is consumed on a
+                background thread, so results are yielded before a slow
+                iterable is exhausted.
+            ordered (bool): Yield results in the order of ``items``
+                instead of the order in which they complete.
+
+        Yields:
+            tuple: ``(item, result, error)`` where ``error`` is the
+            exception raised by ``resolve``, or `None`.
+
+        """
+        workers = ThreadPool(self.workers)
+        try:
+            imap = workers.imap if ordered else workers.imap_unordered
+            for result in imap(self._call, items):
+                yield result
+        finally:
+            # Also reached when the consumer stops iterating early
+            workers.terminate()
+            workers.join()
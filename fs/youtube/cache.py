@@ -0,0 +1,132 @@
+# coding: utf-8
+"""In-memory caches for video metadata.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import collections
+import threading
+import time
+
+from six.moves.urllib.parse import parse_qs
+from six.moves.urllib.parse import urlsplit
+
+
+def url_expiry(url):
+    """Get the expiry timestamp of a signed stream URL.
+
+    Returns:
+        float: The ``expire`` query parameter of ``url``, or `None`.
+
+    """
+    try:
+        return float(parse_qs(urlsplit(url).query)['expire'][0])
+    except (KeyError, IndexError, ValueError, TypeError, AttributeError):
+        return None
+
+
+class TTLCache(object):
+    """A thread-safe LRU mapping whose items expire.
+
+    Arguments:
+        maxsize (int): Maximum number of items, the least recently used
+            item is dropped when it is exceeded.
+        ttl (float): Default lifetime of an item in seconds.
+
+    """
+
+    def __init__(self, maxsize=256, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Get an item which has not expired yet.
+        """
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is None:
+                return default
+            value, expires = item
+            if expires <= time.time():
+                return default
+            self._items[key] = item
+            return value
+
+    def set(self, key, value, expires=None):
+        """Store an item.
+
+        Arguments:
+            key (object): The key of the item.
+            value (object): The item.
+            expires (float, optional): The timestamp at which the item
+                expires, at most ``ttl`` seconds from now.
+
+        """
+        deadline = time.time() + self.ttl
+        if expires is not None:
+            deadline = min(deadline, expires)
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (value, deadline)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._items.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class BlobCache(object):
+    """A thread-safe LRU mapping of small byte strings, bounded in bytes.
+
+    Arguments:
+        max_size (int): Maximum total size of the items in bytes, the
+            least recently used items are dropped when it is exceeded.
+            Larger items are not kept at all.
+
+    """
+
+    def __init__(self, max_size=32 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            data = self._items.pop(key, None)
+            if data is None:
+                return default
+            self._items[key] = data
+            return data
+
+    def set(self, key, data):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            if len(data) > self.max_size:
+                return
+            self._items[key] = data
+            self.size += len(data)
+            while self.size > self.max_size:
+                _, dropped = self._items.popitem(last=False)
+                self.size -= len(dropped)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._items)
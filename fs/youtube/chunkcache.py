@@ -0,0 +1,222 @@
+# coding: utf-8
+"""A persistent on-disk cache of stream chunks.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import collections
+import io
+import json
+import mmap
+import os
+import threading
+import zlib
+
+
+def _replace(src, dst):
+    try:
+        os.replace(src, dst)
+    except AttributeError:  # pragma: no cover
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+class ChunkCache(object):
+    """Keep chunks of streams on disk, keyed by video ID, itag and index.
+
+    The chunks of a stream are written at their offset in a sparse data
+    file and read back through `mmap`. A JSON index next to each data
+    file records the length and CRC32 of every chunk, so a chunk which
+    does not match its checksum is dropped and fetched again.
+
+    Indexes are written every `save_every` new chunks of a stream and
+    by `flush`, rather than on every `put`: chunks stored since the last
+    write are lost if the process dies, and fetched again.
+
+    When the chunks stored exceed ``max_size`` bytes, whole streams are
+    evicted in least recently used order, which frees their disk space.
+    A stream alone never takes more than ``max_size`` bytes: its chunks
+    over the budget are not stored.
+
+    Arguments:
+        root (str): The directory holding the cache, created if needed.
+        max_size (int): The size budget of the cache in bytes.
+        chunk_size (int): The size of a chunk in bytes.
+
+    """
+
+    #: Number of new chunks of a stream after which its index is written.
+    save_every = 64
+
+    def __init__(self, root, max_size=1024 ** 3, chunk_size=1024 * 1024):
+        self.root = root
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self._lock = threading.RLock()
+        self._streams = collections.OrderedDict()
+        self._size = 0
+        self._dirty = collections.Counter()
+        if not os.path.isdir(root):
+            os.makedirs(root)
+        self._load()
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, '%s.%s.%s' % (key[0], key[1], ext))
+
+    def _load(self):
+        indexes = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                with io.open(path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                key = tuple(index['key'])
+                chunks = {int(i): tuple(c) for i, c in index['chunks'].items()}
+            except (IOError, OSError, ValueError, KeyError, TypeError):
+                continue
+            if index.get('chunk_size') != self.chunk_size:
+                self._remove(key)
+                continue
+            indexes.append((os.path.getmtime(path), key, chunks))
+        for _, key, chunks in sorted(indexes):
+            self._streams[key] = chunks
+            self._size += sum(length for length, _ in chunks.values())
+        self._evict()
+
+    def _save(self, key):
+        index = {
+            'key': list(key),
+            'chunk_size': self.chunk_size,
+            'chunks': {str(i): list(c) for i, c in self._streams[key].items()},
+        }
+        path = self._path(key, 'json')
+        with io.open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(json.dumps(index))
+        _replace(path + '.tmp', path)
+        self._dirty.pop(key, None)
+
+    def _remove(self, key):
+        self._dirty.pop(key, None)
+        chunks = self._streams.pop(key, {})
+        self._size -= sum(length for length, _ in chunks.values())
+        for ext in ('json', 'data'):
+            try:
+                os.remove(self._path(key, ext))
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self._size > self.max_size and self._streams:
+            self._remove(next(iter(self._streams)))
+
+    def _touch(self, key):
+        self._streams[key] = self._streams.pop(key)
+        try:
+            os.utime(self._path(key, 'json'), None)
+        except OSError:
+            pass
+
+    def _read(self, key, index, length):
+        offset = index * self.chunk_size
+        # mmap offsets must be a multiple of the allocation granularity
+        delta = offset % mmap.ALLOCATIONGRANULARITY
+        with open(self._path(key, 'data'), 'rb') as f:
+            mapped = mmap.mmap(
+                f.fileno(), length + delta,
+                offset=offset - delta, access=mmap.ACCESS_READ)
+            try:
+                return mapped[delta:delta + length]
+            finally:
+                mapped.close()
+
+    def missing(self, key, index, count):
+        """Count the chunks from ``index`` which are not cached.
+
+        Returns:
+            int: The number of consecutive missing chunks, at most
+            ``count``, starting with ``index``.
+
+        """
+        with self._lock:
+            chunks = self._streams.get(key, {})
+            for i in range(count):
+                if index + i in chunks:
+                    return i
+            return count
+
+    def get(self, key, index):
+        """Return a cached chunk, or `None` if it is missing or corrupt.
+        """
+        with self._lock:
+            entry = self._streams.get(key, {}).get(index)
+            if entry is None:
+                return None
+            length, crc = entry
+            try:
+                data = self._read(key, index, length)
+            except (IOError, OSError, ValueError):
+                data = None
+            if data is None or zlib.crc32(data) & 0xffffffff != crc:
+                del self._streams[key][index]
+                self._size -= length
+                self._dirty[key] += 1
+                return None
+            self._touch(key)
+            return data
+
+    def put(self, key, index, data):
+        """Store a chunk, evicting the least recently used streams.
+        """
+        if not data or len(data) > self.chunk_size or len(data) > self.max_size:
+            return
+        with self._lock:
+            chunks = self._streams.get(key)
+            if chunks is None:
+                chunks = self._streams[key] = {}
+            elif index in chunks:
+                return
+            stored = sum(length for length, _ in chunks.values())
+            if stored + len(data) > self.max_size:
+                return
+            path = self._path(key, 'data')
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.seek(index * self.chunk_size)
+                f.write(data)
+            chunks[index] = (len(data), zlib.crc32(data) & 0xffffffff)
+            self._size += len(data)
+            self._touch(key)
+            self._evict()
+            if key in self._streams:
+                self._dirty[key] += 1
+                if self._dirty[key] >= self.save_every:
+                    self._save(key)
+
+    def flush(self, key=None):
+        """Write the indexes of the chunks stored since the last write.
+
+        Arguments:
+            key (tuple, optional): The stream to write the index of,
+                all of them by default.
+
+        """
+        with self._lock:
+            keys = list(self._dirty) if key is None else [key]
+            for key in keys:
+                if self._dirty.get(key) and key in self._streams:
+                    self._save(key)
+
+    @property
+    def size(self):
+        """int: The number of bytes stored in the cache.
+        """
+        return self._size
+
+    def clear(self):
+        """Remove every cached stream.
+        """
+        with self._lock:
+            for key in list(self._streams):
+                self._remove(key)
@@ -0,0 +1,424 @@
+# coding: utf-8
+"""Backends fetching the metadata of videos and playlists.
+
+`YoutubeFS` only relies on the interface of `Extractor`. Videos are
+returned as objects shaped like `pafy` videos: a ``videoid``, a
+``title`` and the other attributes of the ``mediaproxy.media``
+namespace, and streams selected with `~fs.youtube.streams.select_stream`.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import abc
+import re
+import threading
+import time
+
+import six
+from six.moves.urllib.parse import parse_qs
+from six.moves.urllib.parse import urlparse
+from six.moves.urllib.request import Request
+from six.moves.urllib.request import urlopen
+
+from .lazy import LazyModule
+
+_PLAYLIST_ID = re.compile(r'((?:RD|PL|LL|UU|FL|OL)[-_0-9a-zA-Z]+)$')
+_VIDEO_ID = re.compile(r'[\w-]{11}$')
+_VIDEO_PATH = re.compile(r'/(?:embed|e|v|shorts|live)/([\w-]{11})(?:/|$)')
+_VIDEO_HOSTS = (
+    'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com',
+    'youtube-nocookie.com', 'www.youtube-nocookie.com',
+)
+
+#: Qualities served from the streams with both audio and video.
+_MUXED = ('best', 'worst')
+_HEIGHT = re.compile(r'^\d+p$')
+
+
+def extract_playlist_id(url):
+    """Get the ID of a playlist from its URL or ID, or `None`.
+    """
+    playlist_id = None
+    if _PLAYLIST_ID.match(url):
+        playlist_id = url
+    if '://' not in url:
+        url = '//' + url
+    parsed = urlparse(url)
+    if parsed.netloc in ('youtube.com', 'www.youtube.com'):
+        query = parse_qs(parsed.query)
+        if 'list' in query and _PLAYLIST_ID.match(query['list'][0]):
+            playlist_id = query['list'][0]
+    return playlist_id
+
+
+def extract_video_id(url):
+    """Get the ID of a video from its URL or ID.
+
+    Raises:
+        ValueError: If ``url`` holds no video ID.
+
+    """
+    video_id = None
+    if _VIDEO_ID.match(url):
+        video_id = url
+    else:
+        parsed = urlparse(url if '://' in url else '//' + url)
+        host = parsed.netloc.lower()
+        if host in ('youtu.be', 'www.youtu.be'):
+            video_id = parsed.path[1:]
+        elif host in _VIDEO_HOSTS:
+            if parsed.path == '/watch':
+                video_id = parse_qs(parsed.query).get('v', [''])[0]
+            else:
+                match = _VIDEO_PATH.match(parsed.path)
+                video_id = match and match.group(1)
+    if not video_id or not _VIDEO_ID.match(video_id):
+        raise ValueError(
+            'Need 11 character video id or the URL of the video. '
+            'Got %s' % url)
+    return video_id
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Extractor(object):
+    """The interface of the backends of a `YoutubeFS`.
+
+    Implementations must be thread-safe: videos are extracted
+    concurrently when a playlist is listed.
+    """
+
+    def playlist_id(self, url):
+        """Get the ID of the playlist at ``url``, or `None`.
+        """
+        return extract_playlist_id(url)
+
+    def video_id(self, url):
+        """Get the ID of the video at ``url``, without fetching it.
+
+        Raises:
+            ValueError: If ``url`` is not a video URL or ID.
+
+        """
+        return extract_video_id(url)
+
+    @abc.abstractmethod
+    def playlist(self, url):
+        """Get the playlist at ``url``.
+
+        Returns:
+            object: An object with a ``title``, iterating over entries
+            with a ``videoid``. Pages may be fetched as the iteration
+            reaches them.
+
+        """
+
+    @abc.abstractmethod
+    def video(self, ref):
+        """Extract the video ``ref``, a video ID or URL.
+
+        Returns:
+            object: A video with the attributes of a `pafy` video.
+
+        """
+
+    def entry_name(self, entry, quality):
+        """Get the name of a playlist entry without extracting it.
+
+        Returns:
+            str: The unsanitized name, or `None` if the video must be
+            extracted to know it.
+
+        """
+        return None
+
+
+class PafyExtractor(Extractor):
+    """Extract videos and playlists with `pafy`.
+
+    Arguments:
+        module (module, optional): The `pafy` module, imported on first
+            use by default.
+
+    """
+
+    def __init__(self, module=None):
+        self.module = module or LazyModule('pafy')
+
+    def playlist(self, url):
+        return self.module.get_playlist2(url)
+
+    def video(self, ref):
+        return self.module.new(ref)
+
+
+class _HeadRequest(Request):
+
+    def get_method(self):
+        return 'HEAD'
+
+
+class Stream(object):
+    """A stream of a video, from a youtube-dl format dict.
+    """
+
+    def __init__(self, info):
+        self._info = info
+        self.url = info.get('url')
+        self.extension = info.get('ext')
+        self.itag = '%s' % info.get('format_id')
+        self.dimensions = (info.get('width') or 0, info.get('height') or 0)
+        if info.get('height'):
+            self.quality = '%sx%s' % self.dimensions
+        else:
+            self.quality = '%sk' % int(info.get('abr') or 0)
+        if info.get('vcodec') == 'none':
+            self.mediatype = 'audio'
+        elif info.get('acodec') == 'none':
+            self.mediatype = 'video'
+        else:
+            self.mediatype = 'normal'
+        self._size = info.get('filesize')
+
+    @property
+    def bitrate(self):
+        return self._info.get('tbr') or self._info.get('abr') or 0
+
+    def get_filesize(self):
+        """Get the size of the stream, with a HEAD request if unknown.
+        """
+        if self._size is None:
+            response = urlopen(_HeadRequest(self.url))
+            try:
+                self._size = int(response.info().get('Content-Length', 0))
+            finally:
+                response.close()
+        return self._size
+
+
+class Video(object):
+    """A video, from a youtube-dl info dict.
+
+    Arguments:
+        info (dict): The info dict.
+        extension (str, optional): Only serve the streams with both
+            audio and video which have that extension, if there is one.
+
+    """
+
+    def __init__(self, info, extension=None):
+        self.videoid = info.get('id')
+        self.title = info.get('title')
+        self.author = info.get('uploader')
+        self.rating = info.get('average_rating')
+        self.viewcount = info.get('view_count')
+        self.length = int(info.get('duration') or 0)
+        self.duration = time.strftime('%H:%M:%S', time.gmtime(self.length))
+        self.likes = info.get('like_count')
+        self.dislikes = info.get('dislike_count')
+        self.description = info.get('description')
+        self.thumb = info.get('thumbnail')
+        self.bigthumbhd = info.get('thumbnail')
+        self.category = (info.get('categories') or [None])[0]
+        self.keywords = info.get('tags') or []
+        self.allstreams = [Stream(f) for f in info.get('formats') or [info]]
+        self.extension = extension
+
+    def _of_type(self, mediatype):
+        streams = [s for s in self.allstreams if s.mediatype == mediatype]
+        if mediatype == 'normal' and self.extension is not None:
+            matching = [s for s in streams if s.extension == self.extension]
+            streams = matching or streams
+        return streams
+
+    @property
+    def streams(self):
+        return self._of_type('normal')
+
+    @property
+    def audiostreams(self):
+        return self._of_type('audio')
+
+    @property
+    def videostreams(self):
+        return self._of_type('video')
+
+    @staticmethod
+    def _best(streams):
+        if not streams:
+            return None
+        return max(streams, key=lambda s: (
+            s.dimensions[1], s.extension == 'mp4', s.bitrate))
+
+    def getbest(self):
+        return self._best(self.streams) or self._best(self.allstreams)
+
+    def getbestaudio(self):
+        return self._best(self.audiostreams)
+
+    def getbestvideo(self):
+        return self._best(self.videostreams)
+
+
+class Playlist(object):
+    """A playlist, from a flat youtube-dl info dict.
+    """
+
+    def __init__(self, info):
+        self.title = info.get('title')
+        self._entries = [Entry(e) for e in info.get('entries') or () if e]
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Entry(object):
+    """An entry of a flat playlist: only its ID and title are known.
+    """
+
+    def __init__(self, info):
+        self.videoid = info.get('id')
+        self.title = info.get('title')
+
+
+class _InfoExtractor(Extractor):
+    """An extractor building videos from youtube-dl info dicts.
+
+    With an ``extension``, videos are served from the streams with that
+    extension, so with the ``best``, ``worst`` or height qualities the
+    name of a playlist entry is known without extracting it. Videos
+    without such a stream are served as their best stream.
+    """
+
+    extension = None
+
+    def _video(self, info):
+        return Video(info, self.extension)
+
+    def entry_name(self, entry, quality):
+        if self.extension is None or entry.title is None:
+            return None
+        if quality not in _MUXED and not _HEIGHT.match(quality):
+            return None
+        return '%s.%s' % (entry.title, self.extension)
+
+
+class YoutubeDLExtractor(_InfoExtractor):
+    """Extract videos and playlists with the youtube-dl API directly.
+
+    Playlists are listed flat, with one request per page. Given an
+    ``extension``, videos are not extracted to list them with the
+    ``best``, ``worst`` or height qualities. Each thread reuses one
+    ``YoutubeDL`` instance.
+
+    Arguments:
+        module (str): The module providing ``YoutubeDL``, ``youtube_dl``
+            or ``yt_dlp``.
+        options (dict, optional): Extra ``YoutubeDL`` options.
+        extension (str, optional): The extension of the streams with
+            audio and video to serve, such as ``mp4``.
+
+    """
+
+    def __init__(self, module='youtube_dl', options=None, extension=None):
+        self.module = LazyModule(module)
+        self.options = options or {}
+        self.extension = extension
+        self._local = threading.local()
+
+    def _ydl(self, flat):
+        attr = 'flat' if flat else 'full'
+        ydl = getattr(self._local, attr, None)
+        if ydl is None:
+            options = {
+                'quiet': True,
+                'no_warnings': True,
+                'skip_download': True,
+                'noplaylist': not flat,
+            }
+            if flat:
+                options['extract_flat'] = 'in_playlist'
+            options.update(self.options)
+            ydl = self.module.YoutubeDL(options)
+            setattr(self._local, attr, ydl)
+        return ydl
+
+    def playlist(self, url):
+        if '://' not in url:
+            url = 'https://www.youtube.com/playlist?list=%s' % url
+        return Playlist(self._ydl(True).extract_info(url, download=False))
+
+    def video(self, ref):
+        url = ref
+        if '://' not in url:
+            url = 'https://www.youtube.com/watch?v=%s' % ref
+        return self._video(self._ydl(False).extract_info(url, download=False))
+
+
+class StaticExtractor(_InfoExtractor):
+    """Serve videos and playlists from youtube-dl info dicts in memory.
+
+    A backend working offline, for tests and for fixed collections.
+
+    Arguments:
+        videos (list): The info dicts of the videos, in playlist order.
+        title (str): The title of the playlist.
+        extension (str, optional): The extension of the streams with
+            audio and video to serve, such as ``mp4``.
+
+    """
+
+    def __init__(self, videos, title='Playlist', extension=None):
+        self.videos = [dict(info) for info in videos]
+        self.title = title
+        self.extension = extension
+        self._lock = threading.Lock()
+        self.calls = {'playlist': 0, 'video': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    def playlist(self, url):
+        self._count('playlist')
+        return Playlist({
+            'title': self.title,
+            'entries': [
+                {'id': info['id'], 'title': info.get('title')}
+                for info in self.videos
+            ],
+        })
+
+    def video(self, ref):
+        self._count('video')
+        videoid = ref.rsplit('v=', 1)[-1]
+        for info in self.videos:
+            if info['id'] == videoid:
+                return self._video(info)
+        raise ValueError('no such video: %s' % ref)
+
+
+#: Backends selected by name with the ``extractor`` of a `YoutubeFS`.
+#: The youtube-dl ones serve mp4 streams, so as to list playlists
+#: without extracting their videos.
+EXTRACTORS = {
+    'pafy': PafyExtractor,
+    'youtube-dl': lambda: YoutubeDLExtractor('youtube_dl', extension='mp4'),
+    'yt-dlp': lambda: YoutubeDLExtractor('yt_dlp', extension='mp4'),
+}
+
+
+def get_extractor(name):
+    """Get a new extractor from its name in `EXTRACTORS`.
+
+    Raises:
+        ValueError: If there is no such extractor.
+
+    """
+    try:
+        return EXTRACTORS[name]()
+    except KeyError:
+        raise ValueError('Unknown extractor: %s (expected one of %s)' % (
+            name, ', '.join(sorted(EXTRACTORS))))
@@ -0,0 +1,205 @@
+# coding: utf-8
+"""A persistent index of playlists and videos, shared between processes.
+
+Workers of a pre-fork server given the same database share what any of
+them resolved: listings, the metadata of videos and their signed stream
+URLs.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    url TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    refs TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (url, quality)
+);
+CREATE TABLE IF NOT EXISTS videos (
+    ref TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    media TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (ref, quality)
+);
+CREATE TABLE IF NOT EXISTS streams (
+    ref TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    videoid TEXT NOT NULL,
+    itag TEXT NOT NULL,
+    url TEXT NOT NULL,
+    size INTEGER,
+    expires REAL NOT NULL,
+    PRIMARY KEY (ref, quality)
+);
+"""
+
+_MAX_PARAMS = 900
+
+
+class MetadataIndex(object):
+    """Keep playlist listings and video metadata in an SQLite database.
+
+    The database is opened in WAL mode, so several processes can read
+    it while one of them writes. Each thread uses its own connection,
+    and a process forked after the index was opened makes new ones
+    instead of sharing those of its parent.
+
+    Arguments:
+        path (str): The path of the database file, created if needed.
+        timeout (float): Seconds to wait for a lock held by another
+            process.
+
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._connect()
+
+    def _connect(self):
+        if self._pid != os.getpid():
+            # SQLite connections must not be used across a fork
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get_listing(self, url, quality, max_age=None):
+        """Get the refs of a playlist, or `None` if unknown or stale.
+
+        Arguments:
+            url (str): The URL of the playlist or video.
+            quality (str): The quality policy of the listing.
+            max_age (float, optional): Maximum age of the listing in
+                seconds, `None` to accept any age.
+
+        """
+        row = self._connect().execute(
+            'SELECT refs, updated FROM listings WHERE url = ? AND quality = ?',
+            (url, quality)).fetchone()
+        if row is None:
+            return None
+        if max_age is not None and row[1] + max_age <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def get_updated(self, url, quality):
+        """Get when a listing was last stored, or `None` if unknown.
+        """
+        row = self._connect().execute(
+            'SELECT updated FROM listings WHERE url = ? AND quality = ?',
+            (url, quality)).fetchone()
+        return None if row is None else row[0]
+
+    def set_listing(self, url, quality, refs):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?)',
+            (url, quality, json.dumps(list(refs)), time.time()))
+
+    def get_video(self, ref, quality):
+        """Get the metadata of a video, or `None` if unknown or expired.
+
+        Returns:
+            dict: The ``name``, ``size`` and ``media`` of the video.
+
+        """
+        row = self._connect().execute(
+            'SELECT name, size, media FROM videos '
+            'WHERE ref = ? AND quality = ? AND expires > ?',
+            (ref, quality, time.time())).fetchone()
+        if row is None:
+            return None
+        return {'name': row[0], 'size': row[1], 'media': json.loads(row[2])}
+
+    def get_names(self, refs, quality):
+        """Get the names of the known videos among ``refs``, even expired.
+
+        Returns:
+            dict: The name of each known ref.
+
+        """
+        conn = self._connect()
+        refs = list(refs)
+        names = {}
+        # Older SQLite builds accept at most 999 parameters per query
+        for start in range(0, len(refs), _MAX_PARAMS):
+            batch = refs[start:start + _MAX_PARAMS]
+            names.update(conn.execute(
+                'SELECT ref, name FROM videos WHERE quality = ? AND ref IN '
+                '(%s)' % ', '.join('?' * len(batch)), [quality] + batch))
+        return names
+
+    def set_video(self, ref, quality, name, size, media, expires):
+        """Store the metadata of a video until ``expires``.
+        """
+        self._connect().execute(
+            'INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?, ?)',
+            (ref, quality, name, size, json.dumps(media), expires))
+
+    def set_size(self, ref, quality, size):
+        """Record the size of the stream of a video already stored.
+        """
+        conn = self._connect()
+        for table in ('videos', 'streams'):
+            conn.execute(
+                'UPDATE %s SET size = ? WHERE ref = ? AND quality = ?' % table,
+                (size, ref, quality))
+
+    def get_stream(self, ref, quality):
+        """Get the stream served for a video, or `None` if unknown or expired.
+
+        Returns:
+            dict: The ``videoid`` of the video, and the ``itag``, signed
+            ``url`` and ``size`` of the stream.
+
+        """
+        row = self._connect().execute(
+            'SELECT videoid, itag, url, size FROM streams '
+            'WHERE ref = ? AND quality = ? AND expires > ?',
+            (ref, quality, time.time())).fetchone()
+        if row is None:
+            return None
+        return {'videoid': row[0], 'itag': row[1], 'url': row[2],
+                'size': row[3]}
+
+    def set_stream(self, ref, quality, videoid, itag, url, size, expires):
+        """Store the stream of a video until ``expires``.
+        """
+        self._connect().execute(
+            'INSERT OR REPLACE INTO streams VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (ref, quality, videoid, itag, url, size, expires))
+
+    def purge(self):
+        """Delete the expired videos and streams.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('DELETE FROM videos WHERE expires <= ?', (now,))
+        conn.execute('DELETE FROM streams WHERE expires <= ?', (now,))
+
+    def close(self):
+        """Close the connection of the calling thread.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
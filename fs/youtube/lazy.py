@@ -0,0 +1,111 @@
+# coding: utf-8
+"""Deferred imports of heavy dependencies.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import importlib
+import threading
+
+
+class LazyModule(object):
+    """A module imported on first attribute access.
+
+    Importing ``pafy`` imports all of youtube-dl, which takes longer
+    than everything else `fs.youtube` needs: it is only paid once a
+    video or playlist is actually fetched.
+
+    Arguments:
+        name (str): The absolute name of the module.
+
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return '<LazyModule %r (%s)>' % (self._name, state)
+
+
+class LazyDict(dict):
+    """A dict whose values are computed on first access, then kept.
+
+    Used for info namespaces whose fields may each cost a request: only
+    the fields read are computed. Iterating over the values, copying,
+    pickling or serializing the dict computes all of them.
+
+    Arguments:
+        getters (dict): A function computing the value of each key.
+        values (dict): Values known already. There should be at least
+            one, since `json` serializes a dict with nothing stored yet
+            as ``{}``.
+
+    """
+
+    def __init__(self, getters, values):
+        super(LazyDict, self).__init__(values)
+        self._getters = getters
+        self._keys = list(values) + [k for k in getters if k not in values]
+
+    def __missing__(self, key):
+        value = self._getters[key]()
+        dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        return self[key]
+
+    def __contains__(self, key):
+        return key in self._getters or dict.__contains__(self, key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        return [self[key] for key in self._keys]
+
+    def items(self):
+        return [(key, self[key]) for key in self._keys]
+
+    def copy(self):
+        return dict(self.items())
+
+    def computed(self):
+        """Get a dict of the values known so far, computing none.
+        """
+        return dict(dict.items(self))
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
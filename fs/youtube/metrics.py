@@ -0,0 +1,180 @@
+# coding: utf-8
+"""Counters and latency histograms of a `YoutubeFS`.
+
+Any object with ``incr(name, value=1)``, ``observe(name, seconds)``
+and ``timer(name)`` methods can be passed as the ``metrics`` of a
+`YoutubeFS`. ``timer`` returns a context manager observing the time
+spent in its ``with`` block: subclasses of `NullMetrics` get it on top
+of their ``observe``. The names reported are:
+
+* ``extraction_seconds``: latency of video extractions.
+* ``http_request_seconds``: time until response headers arrive.
+* ``http_bytes``: bytes of response bodies read.
+* ``http_connections_opened`` / ``http_connections_reused``.
+* ``segment_retries``: ranges of segmented downloads retried.
+* ``metadata_cache_hits`` / ``metadata_cache_misses``.
+* ``block_cache_hits`` / ``block_cache_misses``: in-memory blocks of
+  seekable files.
+* ``chunk_cache_hits`` / ``chunk_cache_misses``: on-disk chunks.
+* ``coalesced_extractions`` / ``coalesced_fetches`` /
+  ``coalesced_refreshes`` / ``coalesced_sidecar_fetches``: extractions,
+  block fetches, stream URL refreshes and sidecar fetches which waited
+  for the same work in another thread.
+* ``url_refreshes``: expired stream URLs replaced by open files.
+* ``index_stream_hits``: files opened from a stream stored in the
+  index, without an extraction.
+* ``sidecar_cache_hits`` / ``sidecar_cache_misses``: sidecars served
+  from memory or fetched.
+* ``sidecar_errors``: sidecars which failed to fetch while listing.
+* ``connection_wait_seconds`` / ``throttle_wait_seconds``: time
+  requests waited for a connection slot or for bandwidth, when limits
+  are set.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import bisect
+import socket
+import threading
+import time
+
+
+class _Timer(object):
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        self._metrics.observe(self._name, time.time() - self._start)
+
+
+class NullMetrics(object):
+    """Metrics discarding everything reported to them.
+
+    The base class of metrics backends: subclasses implement `incr`
+    and `observe`, and inherit `timer`.
+    """
+
+    def incr(self, name, value=1):
+        pass
+
+    def observe(self, name, seconds):
+        pass
+
+    def timer(self, name):
+        """Time a ``with`` block as an observation of ``name``.
+        """
+        return _Timer(self, name)
+
+
+class Metrics(NullMetrics):
+    """Metrics kept in memory, exportable in the Prometheus text format.
+
+    Arguments:
+        prefix (str): The prefix of exported metric names.
+        buckets (tuple): Upper bounds of the histogram buckets, in
+            seconds.
+
+    """
+
+    def __init__(self, prefix='youtubefs',
+                 buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                          2.5, 5.0, 10.0)):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = {
+                    'buckets': [0] * (len(self.buckets) + 1),
+                    'sum': 0.0,
+                    'count': 0,
+                }
+            histogram['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    def counter(self, name):
+        """Get the value of a counter.
+        """
+        return self._counters.get(name, 0)
+
+    def histogram(self, name):
+        """Get a histogram as a dict with ``buckets``, ``sum`` and ``count``.
+
+        ``buckets`` holds the count of each bucket, the last one being
+        the observations above the largest bound.
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                return {'buckets': [0] * (len(self.buckets) + 1),
+                        'sum': 0.0, 'count': 0}
+            return dict(histogram, buckets=list(histogram['buckets']))
+
+    def to_prometheus(self):
+        """Export every metric in the Prometheus text format.
+        """
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                metric = '%s_%s_total' % (self.prefix, name)
+                lines.append('# TYPE %s counter' % metric)
+                lines.append('%s %s' % (metric, self._counters[name]))
+            for name in sorted(self._histograms):
+                histogram = self._histograms[name]
+                metric = '%s_%s' % (self.prefix, name)
+                lines.append('# TYPE %s histogram' % metric)
+                cumulative = 0
+                bounds = ['%g' % b for b in self.buckets] + ['+Inf']
+                for bound, count in zip(bounds, histogram['buckets']):
+                    cumulative += count
+                    lines.append('%s_bucket{le="%s"} %s' % (metric, bound, cumulative))
+                lines.append('%s_sum %r' % (metric, histogram['sum']))
+                lines.append('%s_count %s' % (metric, histogram['count']))
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdMetrics(Metrics):
+    """Metrics also sent to a statsd daemon over UDP.
+
+    Arguments:
+        host (str): The statsd host.
+        port (int): The statsd port.
+        prefix (str): The prefix of metric names.
+
+    """
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix='youtubefs',
+                 **kwargs):
+        super(StatsdMetrics, self).__init__(prefix=prefix, **kwargs)
+        self.address = (host, port)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _send(self, line):
+        try:
+            self._socket.sendto(line.encode('utf-8'), self.address)
+        except socket.error:
+            pass
+
+    def incr(self, name, value=1):
+        super(StatsdMetrics, self).incr(name, value)
+        self._send('%s.%s:%s|c' % (self.prefix, name, value))
+
+    def observe(self, name, seconds):
+        super(StatsdMetrics, self).observe(name, seconds)
+        self._send('%s.%s:%d|ms' % (self.prefix, name, seconds * 1000))
@@ -0,0 +1,89 @@
+# coding: utf-8
+"""The index of the file names of a playlist.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import posixpath
+import threading
+
+from ..path import abspath
+from ..path import normpath
+
+
+def _normalize(path):
+    # Paths are looked up after `~fs.base.FS.validatepath`
+    return abspath(normpath(path))
+
+
+class NameIndex(object):
+    """Map the paths of the root directory to video refs, and back.
+
+    Titles are sanitized with a translate table built once. Videos
+    whose names collide are told apart with a counter, ``Title (2).mp4``
+    for the second one registered, so registering the entries of a
+    listing in order always gives them the same names.
+
+    Arguments:
+        invalid_chars (str): The characters removed from names.
+
+    """
+
+    def __init__(self, invalid_chars):
+        self._table = dict.fromkeys(ord(char) for char in invalid_chars)
+        self._lock = threading.Lock()
+        self._refs = {}
+        self._paths = {}
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __contains__(self, path):
+        return path in self._refs
+
+    def sanitize(self, name):
+        """Remove the invalid characters of ``name``.
+        """
+        return name.translate(self._table)
+
+    def add(self, ref, name):
+        """Register the video ``ref`` as ``name``.
+
+        A video registered again keeps its path, unless its name
+        changed.
+
+        Arguments:
+            ref (str): A video ID or URL.
+            name (str): The unsanitized name of the video.
+
+        Returns:
+            str: The unique name of the video.
+
+        """
+        name = self.sanitize(name)
+        with self._lock:
+            entry = self._paths.get(ref)
+            if entry is not None:
+                if entry[0] == name:
+                    return entry[1][1:]
+                del self._refs[entry[1]]
+            path = _normalize(u'/%s' % name)
+            stem, ext = posixpath.splitext(name)
+            count = 1
+            while path in self._refs:
+                count += 1
+                path = _normalize(u'/%s (%s)%s' % (stem, count, ext))
+            self._refs[path] = ref
+            self._paths[ref] = (name, path)
+            return path[1:]
+
+    def get(self, path):
+        """Get the ref of the video at ``path``, or `None`.
+        """
+        return self._refs.get(path)
+
+    def path(self, ref):
+        """Get the path of the video ``ref``, or `None`.
+        """
+        entry = self._paths.get(ref)
+        return entry and entry[1]
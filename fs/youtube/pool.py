@@ -0,0 +1,283 @@
+# coding: utf-8
+"""Keep-alive HTTP connection pool shared by the files of a `YoutubeFS`.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import collections
+import socket
+import threading
+import time
+
+from six.moves import http_client
+from six.moves.urllib.parse import urljoin
+from six.moves.urllib.parse import urlsplit
+
+from .metrics import NullMetrics
+from .shaping import INTERACTIVE
+
+#: Status codes followed by `HTTPConnectionPool.urlopen`.
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+#: Errors meaning a reused keep-alive connection was dropped by the server,
+#: except `socket.timeout`, which is raised as is.
+STALE_ERRORS = (http_client.HTTPException, socket.error)
+
+
+class PooledResponse(object):
+    """A response which hands its connection back to the pool once consumed.
+
+    Arguments:
+        response (http.client.HTTPResponse): The wrapped response.
+        conn (http.client.HTTPConnection): The connection it was read from.
+        pool (HTTPConnectionPool): The pool owning ``conn``.
+        key (tuple): The ``(scheme, host, port)`` key of ``conn``.
+        priority (int): The `~fs.youtube.shaping` priority its body is
+            read with.
+
+    """
+
+    def __init__(self, response, conn, pool, key, priority=INTERACTIVE):
+        self._response = response
+        self._conn = conn
+        self._pool = pool
+        self._key = key
+        self._priority = priority
+        self.status = response.status
+        self.reason = response.reason
+
+    def getheader(self, name, default=None):
+        return self._response.getheader(name, default)
+
+    def read(self, size=None):
+        if size is None or size < 0:
+            data = self._response.read()
+        else:
+            data = self._response.read(size)
+        self._pool.metrics.incr('http_bytes', len(data))
+        self._pool._throttle(len(data), self._priority)
+        self._release_if_done()
+        return data
+
+    def readinto(self, b):
+        try:
+            count = self._response.readinto(b)
+        except AttributeError:
+            # Python 2 responses can only read into new strings
+            data = self._response.read(len(b))
+            count = len(data)
+            b[:count] = data
+        self._pool.metrics.incr('http_bytes', count)
+        self._pool._throttle(count, self._priority)
+        self._release_if_done()
+        return count
+
+    def _release_if_done(self):
+        if self._conn is not None and self._response.isclosed():
+            self.close()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        self._pool._release(self._key)
+        if self._response.isclosed() and not self._response.will_close:
+            self._pool._put(self._key, conn)
+        else:
+            # Unread body left on the wire: the socket can't be reused
+            self._response.close()
+            conn.close()
+
+    @property
+    def closed(self):
+        return self._conn is None
+
+
+class HTTPConnectionPool(object):
+    """A thread-safe pool of persistent HTTP(S) connections.
+
+    Idle connections are kept per ``(scheme, host, port)`` and reused
+    by later requests to the same host, which avoids a TCP and TLS
+    handshake for every range request.
+
+    Arguments:
+        maxsize (int): Maximum number of idle connections kept across
+            all hosts.
+        per_host (int): Maximum number of idle connections kept for a
+            single host.
+        idle_timeout (float): Seconds after which an idle connection is
+            closed instead of being reused.
+        timeout (float): Socket timeout of new connections.
+        metrics (Metrics, optional): Where request latencies, bytes read
+            and connection reuse are reported.
+        scheduler (~fs.youtube.shaping.TransferScheduler, optional):
+            Limits the requests in flight and the bandwidth of their
+            responses.
+
+    """
+
+    max_redirects = 5
+
+    def __init__(self, maxsize=16, per_host=4, idle_timeout=30.0,
+                 timeout=30.0, metrics=None, scheduler=None):
+        self.maxsize = maxsize
+        self.per_host = per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.metrics = metrics or NullMetrics()
+        self.scheduler = scheduler
+        self._idle = collections.OrderedDict()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        default = 443 if scheme == 'https' else 80
+        return (scheme, parts.hostname, parts.port or default)
+
+    def _new_conn(self, key):
+        scheme, host, port = key
+        if scheme == 'https':
+            conn = http_client.HTTPSConnection(host, port, timeout=self.timeout)
+        else:
+            conn = http_client.HTTPConnection(host, port, timeout=self.timeout)
+        conn.connect()
+        # Range requests are tiny: don't let Nagle delay them
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn
+
+    def _get(self, key):
+        """Return an idle connection for ``key``, or `None`.
+        """
+        with self._lock:
+            self._evict()
+            conns = self._idle.get(key)
+            if not conns:
+                return None
+            conn, _ = conns.pop()
+            self._count -= 1
+            if not conns:
+                del self._idle[key]
+            return conn
+
+    def _put(self, key, conn):
+        with self._lock:
+            conns = self._idle.setdefault(key, collections.deque())
+            if len(conns) >= self.per_host or self.maxsize <= 0:
+                conn.close()
+                return
+            conns.append((conn, time.time()))
+            self._count += 1
+            # Drop the least recently used connections over the budget
+            while self._count > self.maxsize:
+                oldest = min(self._idle, key=lambda k: self._idle[k][0][1])
+                self._idle[oldest].popleft()[0].close()
+                self._count -= 1
+                if not self._idle[oldest]:
+                    del self._idle[oldest]
+
+    def _evict(self):
+        deadline = time.time() - self.idle_timeout
+        for key in list(self._idle):
+            conns = self._idle[key]
+            while conns and conns[0][1] < deadline:
+                conns.popleft()[0].close()
+                self._count -= 1
+            if not conns:
+                del self._idle[key]
+
+    def _release(self, key):
+        if self.scheduler is not None:
+            self.scheduler.release(key)
+
+    def _throttle(self, amount, priority):
+        if self.scheduler is not None:
+            self.scheduler.throttle(amount, priority)
+
+    def _request(self, key, method, path, headers):
+        conn = self._get(key)
+        if conn is not None:
+            try:
+                conn.request(method, path, headers=headers)
+                response = conn.getresponse()
+                self.metrics.incr('http_connections_reused')
+                return conn, response
+            except socket.timeout:
+                # Not a dropped connection: sending again would only
+                # double the wait, and repeat the request
+                conn.close()
+                raise
+            except STALE_ERRORS:
+                # The server closed the keep-alive socket: retry once
+                conn.close()
+        conn = self._new_conn(key)
+        self.metrics.incr('http_connections_opened')
+        try:
+            conn.request(method, path, headers=headers)
+            return conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+    def urlopen(self, url, headers=None, method='GET', priority=INTERACTIVE):
+        """Issue a request over a pooled connection.
+
+        Redirects are followed. Any other status is returned as is, so
+        callers must check `PooledResponse.status`.
+
+        Arguments:
+            url (str): The URL to request.
+            headers (dict, optional): Extra request headers.
+            method (str): The HTTP method.
+            priority (int): `~fs.youtube.shaping.INTERACTIVE` if a reader
+                waits for the response, or
+                `~fs.youtube.shaping.BACKGROUND`.
+
+        Returns:
+            PooledResponse: The response, which must be read to the end
+            or closed to release its connection.
+
+        Raises:
+            http.client.HTTPException: On protocol errors.
+            socket.error: On network errors.
+
+        """
+        for _ in range(self.max_redirects + 1):
+            key = self._key(url)
+            parts = urlsplit(url)
+            path = parts.path or '/'
+            if parts.query:
+                path = '%s?%s' % (path, parts.query)
+            if self.scheduler is not None:
+                self.scheduler.acquire(key, priority)
+            try:
+                with self.metrics.timer('http_request_seconds'):
+                    conn, response = self._request(
+                        key, method, path, headers or {})
+            except Exception:
+                self._release(key)
+                raise
+            pooled = PooledResponse(response, conn, self, key, priority)
+            if response.status not in REDIRECT_CODES:
+                if method == 'HEAD':
+                    pooled.read()
+                return pooled
+            location = response.getheader('Location')
+            pooled.read()
+            pooled.close()
+            if not location:
+                return pooled
+            url = urljoin(url, location)
+        raise http_client.HTTPException('too many redirects: %s' % url)
+
+    def clear(self):
+        """Close every idle connection.
+        """
+        with self._lock:
+            for conns in self._idle.values():
+                for conn, _ in conns:
+                    conn.close()
+            self._idle.clear()
+            self._count = 0
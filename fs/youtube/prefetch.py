@@ -0,0 +1,145 @@
+# coding: utf-8
+"""Background prefetching of stream blocks on a worker thread.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+
+from six.moves import queue
+
+
+class Prefetcher(object):
+    """Fetch consecutive blocks ahead of the reader on a worker thread.
+
+    Fetched blocks are handed over through a queue bounded to ``depth``
+    items, so the worker blocks once it is ``depth`` blocks ahead of the
+    reader. Asking for a block other than the next one (after a seek)
+    cancels the worker and starts a new one at the requested index.
+
+    Arguments:
+        fetch (callable): Called with a block index, returns the block.
+            A falsy result marks the end of the stream.
+        depth (int): The number of blocks fetched ahead of the reader.
+
+    """
+
+    #: Seconds between checks for cancellation while the queue is full.
+    poll_interval = 0.1
+
+    def __init__(self, fetch, depth):
+        self._fetch = fetch
+        self.depth = max(depth, 1)
+        self._queue = None
+        self._thread = None
+        self._stop = None
+        self._next = None
+
+    def _run(self, index, stop, blocks):
+        while not stop.is_set():
+            try:
+                item = self._fetch(index)
+            except Exception as error:
+                item = error
+            while not stop.is_set():
+                try:
+                    blocks.put(item, timeout=self.poll_interval)
+                    break
+                except queue.Full:
+                    continue
+            if not item or isinstance(item, Exception):
+                return
+            index += 1
+
+    def start(self, index):
+        """Start fetching from block ``index``, cancelling the worker.
+        """
+        self.cancel()
+        self._stop = threading.Event()
+        self._queue = queue.Queue(maxsize=self.depth)
+        self._next = index
+        self._thread = threading.Thread(
+            target=self._run, args=(index, self._stop, self._queue))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def get(self, index):
+        """Return the block at ``index``, waiting for the worker.
+
+        Raises:
+            Exception: Any error raised by ``fetch`` for that block.
+
+        """
+        if self._thread is None or index != self._next:
+            self.start(index)
+        item = self._queue.get()
+        self._next = index + 1
+        if not item or isinstance(item, Exception):
+            # The worker has exited: the next call starts a new one
+            self._thread = None
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def seek(self, index):
+        """Cancel the worker unless block ``index`` is the next one.
+        """
+        if index != self._next:
+            self.cancel()
+
+    def cancel(self, wait=False):
+        """Stop the worker and drop the blocks it has fetched.
+
+        Arguments:
+            wait (bool): Wait for a fetch in progress to finish. By
+                default, it is left to finish in the background, and
+                its result is discarded.
+
+        """
+        thread = self._thread
+        if self._stop is not None:
+            self._stop.set()
+        if wait and thread is not None:
+            thread.join()
+        self._thread = None
+        self._queue = None
+        self._stop = None
+
+
+class PrefetchStream(object):
+    """A read-only stream reading ahead of its consumer.
+
+    Arguments:
+        fileobj (file): The stream to read from.
+        block_size (int): The size of each read from ``fileobj``.
+        depth (int): The number of blocks read ahead of the consumer.
+
+    """
+
+    def __init__(self, fileobj, block_size, depth):
+        self._fileobj = fileobj
+        self._prefetcher = Prefetcher(lambda _: fileobj.read(block_size), depth)
+        self._index = 0
+        self._buffer = b''
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            block = self._prefetcher.get(self._index)
+            if not block:
+                break
+            self._index += 1
+            chunks.append(block)
+            length += len(block)
+        data = b''.join(chunks)
+        if size < 0:
+            self._buffer = b''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+    def close(self):
+        # The worker may be reading from the stream: let it return first
+        self._prefetcher.cancel(wait=True)
+        self._fileobj.close()
@@ -0,0 +1,140 @@
+# coding: utf-8
+"""Download a stream as byte ranges fetched over parallel connections.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import socket
+from multiprocessing.pool import ThreadPool
+
+from six.moves import http_client
+
+from .. import errors
+from .shaping import BACKGROUND
+
+
+class SegmentedDownload(object):
+    """Fetch a stream of known size as concurrent range requests.
+
+    The stream is split into ranges of ``segment_size`` bytes, fetched
+    by ``segments`` threads sharing a connection pool, and reassembled
+    in order. A range which fails or comes back short is resumed from
+    where it stopped, up to ``retries`` times.
+
+    Arguments:
+        url (str): The URL of the stream.
+        size (int): The size of the stream in bytes.
+        pool (HTTPConnectionPool): The pool used for range requests.
+        segments (int): The number of ranges fetched concurrently.
+        segment_size (int): The size of a range in bytes.
+        retries (int): How many times a range is retried.
+        priority (int): The `~fs.youtube.shaping` priority of the range
+            requests, background by default since they copy whole files.
+
+    """
+
+    def __init__(self, url, size, pool, segments=4,
+                 segment_size=4 * 1024 * 1024, retries=3,
+                 priority=BACKGROUND):
+        self.url = url
+        self.size = size
+        self.segments = max(segments, 1)
+        self.segment_size = segment_size
+        self.retries = retries
+        self.priority = priority
+        self._pool = pool
+
+    def _ranges(self, start, end):
+        return [
+            (offset, min(offset + self.segment_size, end))
+            for offset in range(start, end, self.segment_size)
+        ]
+
+    def _fetch(self, start, view):
+        """Fill ``view`` with the stream bytes from ``start``.
+        """
+        error = 'incomplete read'
+        for attempt in range(self.retries + 1):
+            if not len(view):
+                return
+            if attempt:
+                self._pool.metrics.incr('segment_retries')
+            rangeheader = {
+                'Range': 'bytes=%s-%s' % (start, start + len(view) - 1)}
+            try:
+                res = self._pool.urlopen(
+                    self.url, headers=rangeheader, priority=self.priority)
+                try:
+                    if res.status != 206:
+                        error = 'HTTP Error %s: %s' % (res.status, res.reason)
+                        continue
+                    while len(view):
+                        count = res.readinto(view)
+                        if not count:
+                            break
+                        start += count
+                        view = view[count:]
+                finally:
+                    # Also gives back the connection slot of the request
+                    res.close()
+            except (http_client.HTTPException, socket.error) as err:
+                error = str(err)
+        if len(view):
+            raise errors.RemoteConnectionError(
+                msg='range %s-%s failed: %s' % (
+                    start, start + len(view) - 1, error))
+
+    def _fetch_all(self, workers, view, ranges, base):
+        workers.map(
+            lambda r: self._fetch(r[0], view[r[0] - base:r[1] - base]),
+            ranges,
+            chunksize=1,
+        )
+
+    def _workers(self):
+        count = -(-self.size // self.segment_size)
+        return ThreadPool(max(min(self.segments, count), 1))
+
+    def readinto(self, buffer):
+        """Read the whole stream into ``buffer``.
+
+        Arguments:
+            buffer (bytearray): A writable buffer of at least ``size``
+                bytes, e.g. a `bytearray` or a `memoryview`.
+
+        Returns:
+            int: The number of bytes read.
+
+        """
+        workers = self._workers()
+        try:
+            self._fetch_all(
+                workers, memoryview(buffer), self._ranges(0, self.size), 0)
+        finally:
+            workers.close()
+            workers.join()
+        return self.size
+
+    def download(self, file):
+        """Write the whole stream to ``file``.
+
+        At most ``segments * segment_size`` bytes are held in memory:
+        each batch of ranges is written out before the next is fetched.
+
+        Arguments:
+            file (io.IOBase): A file object open for writing in binary
+                mode.
+
+        """
+        window = self.segments * self.segment_size
+        view = memoryview(bytearray(min(window, self.size)))
+        workers = self._workers()
+        try:
+            for start in range(0, self.size, window):
+                end = min(start + window, self.size)
+                self._fetch_all(
+                    workers, view, self._ranges(start, end), start)
+                file.write(view[:end - start])
+        finally:
+            workers.close()
+            workers.join()
@@ -0,0 +1,165 @@
+# coding: utf-8
+"""Connection limits and bandwidth shaping of upstream requests.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import collections
+import threading
+import time
+
+from .metrics import NullMetrics
+
+#: Priority of requests a reader is waiting for.
+INTERACTIVE = 0
+
+#: Priority of prefetches and bulk downloads.
+BACKGROUND = 1
+
+
+class TokenBucket(object):
+    """A thread-safe token bucket limiting a byte rate.
+
+    While interactive consumers wait for tokens, background consumers
+    get none, so they only use the bandwidth left over.
+
+    Arguments:
+        rate (float): Bytes per second added to the bucket.
+        burst (float, optional): Capacity of the bucket in bytes,
+            defaults to one second of ``rate``.
+
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._stamp = time.time()
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.time()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def consume(self, amount, priority=INTERACTIVE):
+        """Take ``amount`` tokens, blocking until the bucket allows it.
+
+        Amounts over the capacity of the bucket are taken once it is
+        full, leaving it in debt.
+
+        Returns:
+            float: Seconds spent waiting.
+
+        """
+        start = time.time()
+        interactive = priority == INTERACTIVE
+        with self._cond:
+            if interactive:
+                self._waiting += 1
+            try:
+                while True:
+                    self._refill()
+                    needed = min(amount, self.burst)
+                    if self._tokens >= needed and (
+                            interactive or not self._waiting):
+                        self._tokens -= amount
+                        break
+                    deficit = max(needed - self._tokens, 0)
+                    self._cond.wait(max(deficit / self.rate, 0.001))
+            finally:
+                if interactive:
+                    self._waiting -= 1
+                    self._cond.notify_all()
+        return time.time() - start
+
+
+class TransferScheduler(object):
+    """Share connections and bandwidth between the requests of a `YoutubeFS`.
+
+    Requests hold a connection slot from the time they are sent until
+    their response is consumed or closed. Interactive requests are
+    served before waiting background ones, and the last ``reserve``
+    slots are kept for interactive requests, so that playback is not
+    stalled behind prefetches and bulk copies. Both kinds share the
+    bandwidth in the same way.
+
+    Arguments:
+        max_connections (int, optional): Maximum number of requests in
+            flight, `None` for no limit.
+        per_host (int, optional): Maximum number of requests in flight
+            to a single host, `None` for no limit.
+        rate (float, optional): Maximum bytes per second read from
+            responses, `None` for no limit.
+        burst (float, optional): Bytes which may be read at once above
+            ``rate``, defaults to one second of ``rate``.
+        reserve (int): Connection slots background requests may not use.
+            Ignored unless ``max_connections`` is above it, so that
+            background requests always get a slot.
+        metrics (Metrics, optional): Where time spent waiting for a slot
+            or for bandwidth is reported.
+
+    """
+
+    def __init__(self, max_connections=None, per_host=None, rate=None,
+                 burst=None, reserve=1, metrics=None):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.reserve = reserve
+        self.metrics = metrics or NullMetrics()
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self._active = 0
+        self._hosts = collections.Counter()
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    def _available(self, key, priority):
+        limit = self.max_connections
+        if priority != INTERACTIVE:
+            if self._waiting:
+                return False
+            if limit is not None and limit > self.reserve:
+                limit -= self.reserve
+        if limit is not None and self._active >= limit:
+            return False
+        if self.per_host is not None and self._hosts[key] >= self.per_host:
+            return False
+        return True
+
+    def acquire(self, key, priority=INTERACTIVE):
+        """Wait for a connection slot to the host ``key``.
+        """
+        start = time.time()
+        interactive = priority == INTERACTIVE
+        with self._cond:
+            if interactive:
+                self._waiting += 1
+            try:
+                while not self._available(key, priority):
+                    self._cond.wait()
+            finally:
+                if interactive:
+                    self._waiting -= 1
+                    self._cond.notify_all()
+            self._active += 1
+            self._hosts[key] += 1
+        self.metrics.observe('connection_wait_seconds', time.time() - start)
+
+    def release(self, key):
+        """Give back a slot taken with `acquire`.
+        """
+        with self._cond:
+            self._active -= 1
+            self._hosts[key] -= 1
+            if not self._hosts[key]:
+                del self._hosts[key]
+            self._cond.notify_all()
+
+    def throttle(self, amount, priority=INTERACTIVE):
+        """Wait until ``amount`` bytes may be read.
+        """
+        if self.bucket is not None and amount:
+            waited = self.bucket.consume(amount, priority)
+            self.metrics.observe('throttle_wait_seconds', waited)
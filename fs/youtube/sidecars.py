@@ -0,0 +1,64 @@
+# coding: utf-8
+"""Small files served next to each video: thumbnails and metadata.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import json
+import posixpath
+
+#: The suffix replacing the extension of the video, for each kind of
+#: sidecar a `YoutubeFS` can serve.
+SIDECARS = {
+    'thumbnail': '.jpg',
+    'info': '.info.json',
+}
+
+# In the order sidecars are listed after their video
+_ORDER = ['thumbnail', 'info']
+
+
+def check_sidecars(kinds):
+    """Check the kinds of sidecars asked for, in listing order.
+
+    Raises:
+        ValueError: If one of ``kinds`` is not in `SIDECARS`.
+
+    """
+    kinds = set(kinds)
+    unknown = kinds.difference(SIDECARS)
+    if unknown:
+        raise ValueError('Unknown sidecar: %s (expected one of %s)' % (
+            ', '.join(sorted(unknown)), ', '.join(_ORDER)))
+    return tuple(kind for kind in _ORDER if kind in kinds)
+
+
+def sidecar_names(name, kinds):
+    """Get the names of the sidecars of the video ``name``.
+
+    Returns:
+        list: ``(kind, name)`` tuples, in the order of ``kinds``.
+
+    """
+    stem = posixpath.splitext(name)[0]
+    return [(kind, stem + SIDECARS[kind]) for kind in kinds]
+
+
+def thumbnail_url(media):
+    """Get the URL of the largest thumbnail in ``media``, or `None`.
+    """
+    return media.get('bigthumb') or media.get('thumb')
+
+
+def info_json(media):
+    """Serialize the ``mediaproxy.media`` namespace of a video.
+
+    The signed stream URL is left out: it expires long before the rest.
+
+    Returns:
+        bytes: Indented JSON encoded as UTF-8.
+
+    """
+    info = {key: value for key, value in media.items() if key != 'url'}
+    text = json.dumps(info, indent=2, sort_keys=True, ensure_ascii=False)
+    return text.encode('utf-8')
@@ -0,0 +1,74 @@
+# coding: utf-8
+"""Deduplication of concurrent calls doing the same work.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import threading
+
+from .metrics import NullMetrics
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Run a function once for all the threads asking for the same key.
+
+    The first thread calling `do` with a key runs the function; threads
+    calling `do` with the same key before it returns wait for it and get
+    its result, or its exception. Nothing is cached: once the call
+    returns, the next `do` with that key runs the function again.
+
+    Arguments:
+        metrics (Metrics, optional): Where calls served by another
+            thread's call are counted.
+        name (str): The name of that counter.
+
+    """
+
+    def __init__(self, metrics=None, name='coalesced'):
+        self.metrics = metrics or NullMetrics()
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """Call ``func(*args, **kwargs)``, unless a call for ``key`` runs.
+
+        Returns:
+            object: The result of the call.
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self.metrics.incr(self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as error:
+            # Even KeyboardInterrupt: waiting threads must not get None
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def __len__(self):
+        return len(self._calls)
@@ -0,0 +1,73 @@
+# coding: utf-8
+"""Selection of the stream a video is served as.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import re
+
+#: Qualities accepted by `select_stream`, besides heights and itags.
+QUALITIES = ('best', 'worst', 'bestaudio', 'bestvideo')
+
+_HEIGHT = re.compile(r'^(\d+)p$')
+
+
+def check_quality(quality):
+    """Raise `ValueError` if ``quality`` is not a valid quality.
+    """
+    if quality in QUALITIES or _HEIGHT.match(quality) or quality.isdigit():
+        return
+    raise ValueError(
+        'Unrecognized quality: %s (expected one of %s, a height such as '
+        '360p, or an itag)' % (quality, ', '.join(QUALITIES)))
+
+
+def _height(stream):
+    try:
+        return int(stream.dimensions[1])
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return 0
+
+
+def select_stream(pafyobj, quality='best'):
+    """Select the stream of a video matching ``quality``.
+
+    Arguments:
+        pafyobj (pafy.backend_shared.BasePafy): The video.
+        quality (str): One of:
+
+            * ``best``: the best stream with audio and video.
+            * ``worst``: the smallest stream with audio and video.
+            * ``bestaudio``: the best audio-only stream.
+            * ``bestvideo``: the best video-only stream.
+            * a height such as ``360p``: the best stream with audio and
+              video at most that high, or the smallest one.
+            * an itag such as ``18``: the stream with that itag.
+
+            When no stream matches, the best stream is returned.
+
+    Returns:
+        pafy.backend_shared.BaseStream: The selected stream.
+
+    """
+    stream = None
+    if quality == 'bestaudio':
+        stream = pafyobj.getbestaudio()
+    elif quality == 'bestvideo':
+        stream = pafyobj.getbestvideo()
+    elif quality == 'worst':
+        if pafyobj.streams:
+            stream = min(pafyobj.streams, key=_height)
+    elif quality.isdigit():
+        for candidate in pafyobj.allstreams:
+            if str(candidate.itag) == quality:
+                stream = candidate
+                break
+    elif _HEIGHT.match(quality):
+        height = int(_HEIGHT.match(quality).group(1))
+        streams = [s for s in pafyobj.streams if _height(s) <= height]
+        if streams:
+            stream = max(streams, key=_height)
+        else:
+            return select_stream(pafyobj, 'worst')
+    return stream or pafyobj.getbest()
@@ -3,68 +3,451 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 from __future__ import with_statement
 
-import pafy
-from six.moves.urllib.request import BaseHandler
-from six.moves.urllib.request import Request
-from six.moves.urllib.request import build_opener
-from six.moves.urllib.request import install_opener
-from six.moves.urllib.request import urlopen
-from six.moves.urllib.error import URLError
-from six.moves.urllib.response import addinfourl
+import collections
+import functools
+import io
+import itertools
+import socket
+import threading
+import time
+
+import six
+from six.moves import http_client
 
 from .. import errors
 from ..base import FS
 from ..enums import ResourceType
 from ..info import Info
 from ..iotools import RawWrapper
+from .adaptive import AdaptiveHTTPFile
+from .adaptive import is_fragmented
+from .batch import BatchResolver
+from .cache import BlobCache
+from .cache import TTLCache
+from .cache import url_expiry
+from .chunkcache import ChunkCache
+from .extractors import PafyExtractor
+from .extractors import get_extractor
+from .index import MetadataIndex
+from .lazy import LazyDict
+from .lazy import LazyModule
+from .metrics import Metrics
+from .names import NameIndex
+from .pool import HTTPConnectionPool
+from .prefetch import Prefetcher
+from .prefetch import PrefetchStream
+from .segmented import SegmentedDownload
+from .shaping import BACKGROUND
+from .shaping import INTERACTIVE
+from .shaping import TransferScheduler
+from .sidecars import check_sidecars
+from .sidecars import info_json
+from .sidecars import sidecar_names
+from .sidecars import thumbnail_url
+from .singleflight import SingleFlight
+from .streams import check_quality
+from .streams import select_stream
 
+# Imports youtube-dl, so only on the first use of the default extractor
+pafy = LazyModule('pafy')
 
-class HTTPRangeHandler(BaseHandler):
+#: The paths `validatepath` may return for the root directory.
+_ROOT_PATHS = frozenset([u'', u'.', u'/', u'./'])
 
-    @classmethod
-    def http_error_206(self, req, fp, code, msg, hdrs):
-        # Range header supported
-        r = addinfourl(fp, hdrs, req.get_full_url())
-        r.code = code
-        r.msg = msg
-        return r
+#: The fields of the ``mediaproxy.media`` namespace taken from the video,
+#: and its attribute holding each of them.
+_MEDIA_FIELDS = collections.OrderedDict([
+    ("title", "title"),
+    ("rating", "rating"),
+    ("viewcount", "viewcount"),
+    ("author", "author"),
+    ("length", "length"),
+    ("duration", "duration"),
+    ("likes", "likes"),
+    ("dislikes", "dislikes"),
+    ("description", "description"),
+    ("thumb", "thumb"),
+    ("bigthumb", "bigthumbhd"),
+    ("category", "category"),
+    ("videoid", "videoid"),
+    ("keywords", "keywords"),
+])
 
-    @classmethod
-    def http_error_416(self, req, fp, code, msg, hdrs):
-        # Range header not supported
-        raise URLError('Requested Range Not Satisfiable')
+#: The fields taken from the stream.
+_STREAM_FIELDS = ("mediatype", "extension", "quality", "url")
+
+#: Fields which `pafy` may fetch with another request when first read.
+_LAZY_FIELDS = frozenset([
+    "likes", "dislikes", "description", "bigthumb", "category", "keywords",
+])
+
+
+class SeekableHTTPFile(io.RawIOBase):
+    """A read-only file over HTTP Range requests.
+
+    Data is fetched in blocks aligned on ``block_size`` and kept in a
+    small LRU cache, so short seeks back are served from memory. While
+    reads are sequential the read-ahead window doubles up to
+    ``readahead`` blocks per request. `readinto` calls spanning whole
+    blocks bypass the cache and read from the socket straight into the
+    caller's buffer.
+
+    The size of the stream is learned from the first response, so reads
+    stop at the end of the stream without a request past it, and `seek`
+    supports offsets relative to the end.
+
+    Signed stream URLs expire: given a ``refresh`` function, the file
+    replaces its URL shortly before the ``expire`` timestamp it carries,
+    and when the server answers 403 or 410, then resumes at the same
+    offset.
+
+    Arguments:
+        url (str): The URL of the stream.
+        pool (HTTPConnectionPool, optional): The connection pool used
+            for range requests.
+        block_size (int): The size of a cached block in bytes.
+        readahead (int): Maximum number of blocks fetched by a single
+            request.
+        cache_blocks (int, optional): Maximum number of blocks kept in
+            memory, defaults to twice ``readahead``.
+        prefetch (int): If positive, fetch this many blocks ahead of
+            the reader on a background thread, one block per request.
+        chunk_cache (ChunkCache, optional): A disk cache checked before
+            fetching a block, and filled with the blocks fetched. Its
+            chunk size must be ``block_size``.
+        cache_key (tuple, optional): The ``(videoid, itag)`` key of the
+            stream in ``chunk_cache``.
+        flights (SingleFlight, optional): Shared by the files reading
+            the same streams, so that concurrent fetches of the same
+            blocks of a stream are sent upstream once.
+        refresh (callable, optional): Called with the expired URL,
+            returns a new URL for the same stream.
+        refresh_margin (float): Seconds before the URL expires at which
+            it is refreshed.
+        size (int, optional): The size of the stream in bytes, if known
+            beforehand.
+
+    Raises:
+        fs.errors.RemoteConnectionError: If the stream can't be reached.
 
+    """
 
-class SeekableHTTPFile:
-    def __init__(self, url, *args, **kwargs):
+    def __init__(self, url, pool=None, block_size=1024 * 1024, readahead=4,
+                 cache_blocks=None, prefetch=0, chunk_cache=None,
+                 cache_key=None, flights=None, refresh=None,
+                 refresh_margin=60, size=None, *args, **kwargs):
+        super(SeekableHTTPFile, self).__init__()
         self.url = url
         self.pos = 0
-        self.fileobj = None
+        self.block_size = block_size
+        self.readahead = max(readahead, 1)
+        self.cache_blocks = max(cache_blocks or 2 * self.readahead, self.readahead)
+        self.requests = 0
+        self.size = None
+        self._pool = pool or HTTPConnectionPool()
+        self._blocks = collections.OrderedDict()
+        self._eof = None
+        if size is not None:
+            self._set_size(size)
+        self._window = 1
+        self._last = None
+        self._chunk_cache = chunk_cache if cache_key is not None else None
+        self._cache_key = cache_key
+        self._flights = flights
+        self._refresh = refresh
+        self.refresh_margin = refresh_margin
+        self._expires = url_expiry(url)
+        self._prefetcher = None
+        if prefetch > 0:
+            self.cache_blocks = max(self.cache_blocks, prefetch)
+            self._prefetcher = Prefetcher(self._prefetch, prefetch)
 
-        response = urlopen(url)
+        response = self._urlopen(method='HEAD')
         response.close()
+        self._learn_size(response)
 
-    def read(self, size=-1):
-        if self.fileobj:
-            self.fileobj.close()
-        opener = build_opener(HTTPRangeHandler)
-        install_opener(opener)
+    def _set_size(self, size):
+        self.size = size
+        self._eof = -(-size // self.block_size)
+
+    def _learn_size(self, res):
+        """Get the size of the stream from the headers of ``res``.
+        """
+        if self.size is not None:
+            return
+        content_range = res.getheader('Content-Range') or ''
+        total = content_range.rpartition('/')[2].strip()
+        if res.status == 200:
+            total = res.getheader('Content-Length') or ''
+        if total.isdigit():
+            self._set_size(int(total))
+
+    def _refresh_url(self):
+        try:
+            url = self._refresh(self.url)
+        except errors.FSError:
+            raise
+        except Exception as error:
+            raise errors.RemoteConnectionError(
+                msg='stream URL refresh failed: %s' % error)
+        self._pool.metrics.incr('url_refreshes')
+        self.url = url
+        self._expires = url_expiry(url)
+        if self._expires is not None and self._expired():
+            # The new URL is as close to expiry: don't refresh it again
+            self._expires = None
+
+    def _expired(self):
+        return time.time() >= self._expires - self.refresh_margin
+
+    def _urlopen(self, headers=None, method='GET', priority=INTERACTIVE):
+        """Request the stream, refreshing its URL when it expires.
+
+        Returns:
+            PooledResponse: A response with a status below 400, or 416.
+
+        Raises:
+            fs.errors.RemoteConnectionError: On network and HTTP errors.
+
+        """
+        if self._refresh is not None and self._expires is not None:
+            if self._expired():
+                self._refresh_url()
+        try:
+            res = self._pool.urlopen(
+                self.url, headers=headers, method=method, priority=priority)
+            if res.status in (403, 410) and self._refresh is not None:
+                # Expired or revoked signature: retry with a new URL
+                res.close()
+                self._refresh_url()
+                res = self._pool.urlopen(
+                    self.url, headers=headers, method=method,
+                    priority=priority)
+        except (http_client.HTTPException, socket.error) as error:
+            raise errors.RemoteConnectionError(msg=str(error))
+        if res.status >= 400 and res.status != 416:
+            res.close()
+            raise errors.RemoteConnectionError(
+                msg='HTTP Error %s: %s' % (res.status, res.reason))
+        return res
+
+    def _fetch(self, index, count, priority=INTERACTIVE):
+        """Return up to ``count`` blocks from ``index``.
+        """
+        start = index * self.block_size
+        end = (index + count) * self.block_size - 1
+        rangeheader = {'Range': 'bytes=%s-%s' % (start, end)}
+
+        self.requests += 1
+        res = self._urlopen(headers=rangeheader, priority=priority)
+        self._learn_size(res)
+        if res.status == 416:
+            res.close()
+            return []
+        try:
+            data = res.read()
+        except (http_client.HTTPException, socket.error) as error:
+            res.close()
+            raise errors.RemoteConnectionError(msg=str(error))
+
+        if res.status == 200:
+            # Range header ignored: the whole file was sent
+            data = data[start:end + 1]
+
+        return [
+            data[offset:offset + self.block_size]
+            for offset in range(0, len(data), self.block_size)
+        ]
+
+    def _get_blocks(self, index, count, priority=INTERACTIVE):
+        """Return ``(count, blocks)`` read from the disk cache or network.
+
+        Only the blocks missing from the disk cache are fetched, so the
+        returned ``count`` may be lower than requested.
+        """
+        if self._chunk_cache is None:
+            return count, self._fetch(index, count, priority)
+        metrics = self._pool.metrics
+        while True:
+            block = self._chunk_cache.get(self._cache_key, index)
+            if block is not None:
+                metrics.incr('chunk_cache_hits')
+                return 1, [block]
+            missing = self._chunk_cache.missing(self._cache_key, index, count)
+            if missing:
+                break
+            # Stored by another reader since `get`: read it from the cache
+        metrics.incr('chunk_cache_misses')
+        count = missing
+        blocks = self._fetch(index, count, priority)
+        for i, block in enumerate(blocks):
+            self._chunk_cache.put(self._cache_key, index + i, block)
+        return count, blocks
+
+    def _prefetch(self, index):
+        if self._eof is not None and index >= self._eof:
+            return []
+        # Blocks ahead of the reader yield to the requests of readers
+        priority = BACKGROUND
+        if index == self.pos // self.block_size:
+            priority = INTERACTIVE
+        return self._get_shared_blocks(index, 1, priority)[1]
 
-        if size < 0:
-            rangeheader = {'Range': 'bytes=%s-' % (self.pos)}
+    def _get_shared_blocks(self, index, count, priority=INTERACTIVE):
+        """Like `_get_blocks`, joining a fetch from ``index`` in flight.
+
+        A joined fetch may cover a different number of blocks: its
+        ``count`` is returned along with its blocks.
+        """
+        if self._flights is None:
+            return self._get_blocks(index, count, priority)
+        key = (self._cache_key or self.url, self.block_size, index)
+        return self._flights.do(
+            key, self._get_blocks, index, count, priority)
+
+    def _load(self, index, count, blocks):
+        for i, block in enumerate(blocks):
+            self._store(index + i, block)
+        if len(blocks) < count or len(blocks[-1]) < self.block_size:
+            self._eof = index + len(blocks)
+
+    def _store(self, index, block):
+        self._blocks.pop(index, None)
+        self._blocks[index] = block
+        while len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
+
+    def _block(self, index, sequential):
+        block = self._blocks.pop(index, None)
+        if block is not None:
+            self._blocks[index] = block
+            self._pool.metrics.incr('block_cache_hits')
+            return block
+        if self._eof is not None and index >= self._eof:
+            return b''
+        self._pool.metrics.incr('block_cache_misses')
+
+        if self._prefetcher is not None:
+            self._load(index, 1, self._prefetcher.get(index))
+            return self._blocks.get(index, b'')
+
+        if sequential:
+            self._window = min(self._window * 2, self.readahead)
         else:
-            rangeheader = {'Range': 'bytes=%s-%s' % (self.pos, self.pos + size - 1)}
+            self._window = 1
+        count = self._window
+        if self._eof is not None:
+            count = min(count, self._eof - index)
+        self._load(index, *self._get_shared_blocks(index, count))
+        return self._blocks.get(index, b'')
+
+    def _remaining(self, size):
+        """Clamp a read of ``size`` bytes to the end of the stream.
+        """
+        if self.size is None:
+            return size
+        remaining = max(self.size - self.pos, 0)
+        return remaining if size < 0 else min(size, remaining)
+
+    def read(self, size=-1):
+        size = self._remaining(size)
+        sequential = self.pos == self._last
+        chunks = []
+        while size != 0:
+            index, offset = divmod(self.pos, self.block_size)
+            block = self._block(index, sequential)
+            if offset >= len(block):
+                break
+            chunk = block[offset:] if size < 0 else block[offset:offset + size]
+            chunks.append(chunk)
+            self.pos += len(chunk)
+            if size > 0:
+                size -= len(chunk)
+            sequential = True
+
+        self._last = self.pos
+        return b''.join(chunks)
 
-        req = Request(self.url, headers=rangeheader)
+    def _read_direct(self, view):
+        """Read ``view`` from the network without going through the cache.
+
+        Returns:
+            int: The number of bytes read, or `None` if the server
+            ignored the range.
+
+        """
+        rangeheader = {
+            'Range': 'bytes=%s-%s' % (self.pos, self.pos + len(view) - 1)}
+
+        self.requests += 1
+        res = self._urlopen(headers=rangeheader)
+        self._learn_size(res)
+        if res.status != 206:
+            res.close()
+            if res.status == 416:
+                self._eof = -(-self.pos // self.block_size)
+                return 0
+            return None
+        count = 0
         try:
-            res = urlopen(req)
-        except URLError:
-            return ''
+            while count < len(view):
+                read = res.readinto(view[count:])
+                if not read:
+                    break
+                count += read
+        except (http_client.HTTPException, socket.error) as error:
+            raise errors.RemoteConnectionError(msg=str(error))
+        finally:
+            res.close()
 
-        self.pos += size
-        data = res.read()
+        if count < len(view):
+            end = self.pos + count
+            self._eof = -(-end // self.block_size)
+        return count
 
-        return data
+    def _readinto1(self, view, sequential):
+        view = view[:self._remaining(len(view))]
+        if not len(view):
+            return 0
+        index, offset = divmod(self.pos, self.block_size)
+        direct = (
+            len(view) >= self.block_size
+            and self._prefetcher is None
+            and self._chunk_cache is None
+            and index not in self._blocks
+            and (self._eof is None or index < self._eof)
+        )
+        count = self._read_direct(view) if direct else None
+        if count is None:
+            block = self._block(index, sequential)
+            count = max(min(len(block) - offset, len(view)), 0)
+            view[:count] = memoryview(block)[offset:offset + count]
+        self.pos += count
+        self._last = self.pos
+        return count
+
+    def readinto(self, b):
+        view = memoryview(b)
+        sequential = self.pos == self._last
+        total = 0
+        while total < len(view):
+            count = self._readinto1(view[total:], sequential)
+            if not count:
+                break
+            total += count
+            sequential = True
+        return total
+
+    def readinto1(self, b):
+        """Read into ``b`` with at most one network request.
+        """
+        return self._readinto1(memoryview(b), self.pos == self._last)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
 
     def tell(self):
         return self.pos
@@ -78,34 +461,163 @@ class SeekableHTTPFile:
         """
 
         if whence == 0:  # absolute seek
-            self.pos = offset
+            pos = offset
         elif whence == 1:  # relative seek
-            self.pos += offset
+            pos = self.pos + offset
         elif whence == 2:  # absolute from end of file
-            raise errors.Unsupported('seek from end of file not supported.')
+            if self.size is None:
+                raise errors.Unsupported('size of the stream is unknown.')
+            pos = self.size + offset
         else:
             raise errors.Unsupported('Whence must be 0, 1 or 2')
+        if pos < 0:
+            raise ValueError('negative seek position %s' % pos)
+        self.pos = pos
+
+        index = self.pos // self.block_size
+        if self._prefetcher is not None and index not in self._blocks:
+            self._prefetcher.seek(index)
+        return self.pos
 
     def close(self):
-        if self.fileobj:
-            self.fileobj.close()
+        if self._prefetcher is not None:
+            # The worker may still be using the pool and the disk cache
+            self._prefetcher.cancel(wait=True)
+        if self._chunk_cache is not None:
+            self._chunk_cache.flush(self._cache_key)
+        self._blocks.clear()
+        super(SeekableHTTPFile, self).close()
 
     @classmethod
     def writable(self):
         return False
 
 
+class _Video(object):
+    """The resolved metadata of a video: its extracted video and stream.
+    """
+
+    def __init__(self, pafyobj, quality='best'):
+        self.pafy = pafyobj
+        self.stream = select_stream(pafyobj, quality)
+        self._size = None
+        self.media = None
+
+    @property
+    def size(self):
+        """int: The size of the stream.
+
+        Taken from the format metadata of the extraction when it has
+        one, so that only streams without it cost a HEAD request.
+        """
+        if self._size is None:
+            info = getattr(self.stream, '_info', None) or {}
+            if info.get('filesize'):
+                self._size = int(info['filesize'])
+            else:
+                self._size = self.stream.get_filesize()
+        return self._size
+
+    @property
+    def expires(self):
+        return url_expiry(self.stream.url)
+
+    def find_stream(self, itag):
+        """Return the stream with the given ``itag``, or `None`.
+        """
+        if self.stream.itag == itag:
+            return self.stream
+        for stream in getattr(self.pafy, 'allstreams', ()):
+            if stream.itag == itag:
+                return stream
+        return None
+
+
 class YoutubeFS(FS):
     """A filesystem for reading Youtube Playlists and Videos.
 
     Arguments:
         url (str): The YouTube URL for a Playlist or a Video
+        playlist (bool): Set to `False` if ``url`` is a single Video.
+        seekable (bool): Open files with a seekable implementation.
+        pool_size (int): Maximum number of idle keep-alive connections
+            shared by all files opened from this filesystem.
+        pool_per_host (int): Maximum number of idle connections kept
+            per host.
+        pool_idle_timeout (float): Seconds after which an idle
+            connection is closed.
+        block_size (int): Size in bytes of the blocks fetched by
+            seekable files.
+        readahead (int): Maximum number of blocks a seekable file
+            fetches ahead while reading sequentially.
+        prefetch (int): Default number of blocks opened files fetch
+            ahead of the reader on a background thread, ``0`` to read
+            on the caller's thread. Can be overridden per file with the
+            ``prefetch`` argument of `openbin`.
+        segments (int): Number of ranges fetched concurrently by
+            `download` and `readbytes`, ``1`` to use one connection.
+        segment_size (int): Size in bytes of the ranges fetched by
+            `download` and `readbytes`.
+        segment_retries (int): How many times a failed range is retried.
+        cache_dir (str, optional): A directory where seekable files
+            keep the blocks they fetch, to serve them again from disk.
+        cache_size (int): The size budget of ``cache_dir`` in bytes.
+        metadata_cache_size (int): Maximum number of resolved videos
+            kept in memory.
+        metadata_ttl (float): Maximum lifetime of a resolved video in
+            seconds. Videos expire earlier if their signed stream URL
+            does.
+        resolve_workers (int): Number of videos resolved concurrently
+            when listing a playlist.
+        resolve_rate (float, optional): Maximum number of video
+            extractions started per second when listing a playlist.
+        metrics (Metrics, optional): Where extraction and request
+            latencies, bytes read, retries and cache hits are reported,
+            defaults to a new `Metrics` kept in memory.
+        quality (str): The stream each video is served as: ``best``,
+            ``worst``, ``bestaudio`` or ``bestvideo``, a maximum height
+            such as ``360p``, or an itag. See
+            `~fs.youtube.streams.select_stream`.
+        index_path (str, optional): The path of an SQLite database where
+            the playlist listing and video metadata are kept, so they
+            survive this filesystem and are shared with other processes
+            using the same file. Stream URLs are stored too, so files
+            resolved by another process open without an extraction.
+            Videos are extracted again once older than ``metadata_ttl``.
+        playlist_ttl (float): Maximum age in seconds of the listing
+            stored in the index, after which the playlist is fetched
+            again. Only the videos which are new or stale are extracted.
+        max_connections (int, optional): Maximum number of requests in
+            flight to the CDN, `None` for no limit. Above 1, the last
+            slot is kept for reads, so prefetches and downloads never
+            take all of them; with a single slot, reads only go first.
+        max_connections_per_host (int, optional): Maximum number of
+            requests in flight to a single host, `None` for no limit.
+        bandwidth (int, optional): Maximum bytes per second read from
+            the CDN, `None` for no limit. Reads go before prefetches,
+            `download` and `readbytes`, which use the rest.
+        extractor (str or Extractor, optional): The backend fetching
+            videos and playlists: ``pafy`` (the default), ``youtube-dl``
+            or ``yt-dlp`` to use their API directly and list playlists
+            without extracting every video, or an
+            `~fs.youtube.extractors.Extractor` instance.
+        sidecars (list): Small files to list next to each video:
+            ``thumbnail`` for ``<title>.jpg`` and ``info`` for
+            ``<title>.info.json``, holding its ``mediaproxy.media``
+            namespace. They are fetched concurrently while the root is
+            listed and served from memory, at the cost of resolving the
+            metadata of every video.
+        sidecar_cache_size (int): Maximum total size in bytes of the
+            sidecars kept in memory.
 
     """
 
+    #: Seconds before a stream URL expires at which it is re-resolved.
+    expiry_margin = 60
+
     _meta = {
         'case_insensitive': False,
-        'invalid_path_chars': '\0"\[]+|<>=;?*":',
+        'invalid_path_chars': '\0"\\[]+|<>=;?*":',
         'network': True,
         'read_only': True,
         'thread_safe': True,
@@ -113,57 +625,362 @@ class YoutubeFS(FS):
         'virtual': False,
     }
 
-    def __init__(self, url, playlist=True, seekable=True):
+    def __init__(self, url, playlist=True, seekable=True, pool_size=16,
+                 pool_per_host=4, pool_idle_timeout=30.0,
+                 block_size=1024 * 1024, readahead=4, prefetch=0,
+                 segments=4, segment_size=4 * 1024 * 1024, segment_retries=3,
+                 cache_dir=None, cache_size=1024 ** 3, metadata_cache_size=256,
+                 metadata_ttl=3600.0, resolve_workers=8, resolve_rate=None,
+                 metrics=None, quality='best', index_path=None,
+                 playlist_ttl=600.0, max_connections=None,
+                 max_connections_per_host=None, bandwidth=None,
+                 extractor=None, sidecars=(),
+                 sidecar_cache_size=32 * 1024 * 1024):
         super(YoutubeFS, self).__init__()
+        # Check the arguments before opening the pool, caches and index:
+        # close (also called on garbage collection) skips those unset
+        self._pool = None
+        self._chunk_cache = None
+        self._index = None
+        check_quality(quality)
+        self.sidecars = check_sidecars(sidecars)
+        if extractor is None:
+            extractor = PafyExtractor(pafy)
+        elif isinstance(extractor, six.string_types):
+            extractor = get_extractor(extractor)
+        self.extractor = extractor
+        # Only check the URL here: the playlist or video is fetched on
+        # first access, so opening the filesystem is instant
+        if playlist:
+            if not self.extractor.playlist_id(url):
+                raise ValueError('Unrecognized playlist url: %s' % url)
+        else:
+            self.extractor.video_id(url)
         self.playlist = playlist
         self.seekable = seekable
+        self.quality = quality
         self.url = url
-        self._cache = {}
-        if playlist:
-            self._title = pafy.get_playlist(self.url)['title']
+        self.block_size = block_size
+        self.readahead = readahead
+        self.prefetch = prefetch
+        self.segments = segments
+        self.segment_size = segment_size
+        self.segment_retries = segment_retries
+        self.resolve_workers = resolve_workers
+        self.resolve_rate = resolve_rate
+        self.metadata_ttl = metadata_ttl
+        self.playlist_ttl = playlist_ttl
+        self.metrics = metrics or Metrics()
+        self._extractions = SingleFlight(self.metrics, 'coalesced_extractions')
+        self._fetches = SingleFlight(self.metrics, 'coalesced_fetches')
+        self._refreshes = SingleFlight(self.metrics, 'coalesced_refreshes')
+        self._sidecar_fetches = SingleFlight(
+            self.metrics, 'coalesced_sidecar_fetches')
+        self._names = NameIndex(self._meta['invalid_path_chars'])
+        self._videos = TTLCache(maxsize=metadata_cache_size, ttl=metadata_ttl)
+        self._scheduler = None
+        if max_connections or max_connections_per_host or bandwidth:
+            self._scheduler = TransferScheduler(
+                max_connections=max_connections,
+                per_host=max_connections_per_host,
+                rate=bandwidth,
+                metrics=self.metrics,
+            )
+        self._pool = HTTPConnectionPool(
+            maxsize=pool_size,
+            per_host=pool_per_host,
+            idle_timeout=pool_idle_timeout,
+            metrics=self.metrics,
+            scheduler=self._scheduler,
+        )
+        if cache_dir is not None:
+            self._chunk_cache = ChunkCache(
+                cache_dir, max_size=cache_size, chunk_size=block_size)
+        self._playlist = None
+        self._playlist_lock = threading.Lock()
+        self._listed_names = {}
+        self._sidecar_paths = {}
+        self._blobs = BlobCache(sidecar_cache_size)
+        self._index_updated = None
+        self._unnamed = ()
+        if index_path is not None:
+            self._index = MetadataIndex(index_path)
+        if self._index is not None:
+            self._load_index()
+
+    def _load_index(self):
+        """Register the paths of the last listing stored in the index.
+
+        Known paths can then be opened before the root is listed. The
+        listing is only read again once it is stored anew; until then,
+        only the names of its refs not stored yet are looked up.
+        """
+        updated = self._index.get_updated(self.url, self.quality)
+        if updated is None:
+            return
+        if updated != self._index_updated:
+            refs = self._index.get_listing(self.url, self.quality) or ()
+        elif self._unnamed:
+            refs = self._unnamed
         else:
-            self._title = pafy.new(self.url).title
+            return
+        names = self._index.get_names(refs, self.quality)
+        for ref in refs:
+            if ref in names:
+                self._register(ref, names[ref])
+        self._index_updated = updated
+        self._unnamed = [ref for ref in refs if ref not in names]
+
+    def _register(self, ref, name):
+        """Register the path of a video and of its sidecars.
+
+        Returns:
+            list: The unique name of the video, then the names of its
+            sidecars.
+
+        """
+        name = self._names.add(ref, name)
+        names = [name]
+        for kind, sidecar in sidecar_names(name, self.sidecars):
+            path = u'/%s' % sidecar
+            # A video of that name hides the sidecar
+            if path not in self._names:
+                self._sidecar_paths[path] = (ref, kind)
+                names.append(sidecar)
+        return names
+
+    @property
+    def title(self):
+        """str: The title of the playlist or video.
+        """
+        if self.playlist:
+            return self._get_playlist().title
+        return self._resolve(self.url).pafy.title
 
     def __str__(self):
-        return 'YoutubeFS: %s' % self._title
+        return 'YoutubeFS: %s' % self.title
 
-    @classmethod
-    def _get_name(self, pafyobj):
-        name = '%s.%s' % (pafyobj.title, pafyobj.getbest().extension)
+    def _get_playlist(self):
+        # Not the FS lock: this runs on the thread iterating `_entries`
+        # for the resolver, while the caller of `listdir` may hold it
+        with self._playlist_lock:
+            if self._playlist is None:
+                self._playlist = self.extractor.playlist(self.url)
+            return self._playlist
 
-        for char in self._meta['invalid_path_chars']:
-            name = name.replace(char, '')
+    def close(self):
+        if self._pool is not None:
+            self._pool.clear()
+        if self._chunk_cache is not None:
+            self._chunk_cache.flush()
+        if self._index is not None:
+            self._index.close()
+        super(YoutubeFS, self).close()
 
-        return name
+    def _resolve(self, ref):
+        """Get the cached metadata of a video, extracting it if needed.
 
-    def listdir(self, path):
-        _path = self.validatepath(path)
+        Arguments:
+            ref (str): A video ID or URL.
 
-        if _path in [u'.', u'/', u'./']:
-            if self.playlist:
-                parser = pafy.get_playlist(self.url)
-                outlist = []
-                for entry in parser['items']:
-                    name = self._get_name(entry['pafy'])
-                    self._cache[self.validatepath(u'/%s' % name)] = entry['playlist_meta']['encrypted_id']
-                    outlist.append(u'%s' % name)
-                return outlist
-            else:
-                parser = pafy.new(self.url)
-                name = self._get_name(parser)
-                self._cache[self.validatepath(u'/%s' % name)] = self.url
-                return [name]
+        Returns:
+            _Video: The resolved video.
+
+        """
+        video = self._videos.get(ref)
+        if video is not None:
+            self.metrics.incr('metadata_cache_hits')
+            return video
+        self.metrics.incr('metadata_cache_misses')
+        # Concurrent callers resolving the same video share one extraction
+        return self._extractions.do(ref, self._extract, ref)
+
+    def _extract(self, ref):
+        video = self._videos.get(ref)
+        if video is not None:
+            # Extracted by a call which returned since the cache lookup
+            return video
+        with self.metrics.timer('extraction_seconds'):
+            video = _Video(self.extractor.video(ref), self.quality)
+        expires = video.expires
+        if expires is not None:
+            expires -= self.expiry_margin
+        self._videos.set(ref, video, expires=expires)
+        self._store(ref, video)
+        return video
+
+    def _store(self, ref, video):
+        """Write the metadata of ``video`` to the index, if any.
+        """
+        if self._index is None:
+            return
+        expires = time.time() + self.metadata_ttl
+        if video.expires is not None:
+            expires = min(expires, video.expires - self.expiry_margin)
+        # Only the fields read already: the others may cost a request
+        self._index.set_video(
+            ref, self.quality, self._get_name(video), video._size,
+            self._media(video).computed(), expires)
+        if not is_fragmented(getattr(video.stream, '_info', None)):
+            self._index.set_stream(
+                ref, self.quality, video.pafy.videoid, video.stream.itag,
+                video.stream.url, video._size, expires)
+
+    def _lookup(self, ref):
+        """Get the name of a video and, if it was resolved, the video.
+
+        Videos whose metadata is still fresh in the index, or whose name
+        was given by a flat playlist listing, are not extracted.
+
+        Returns:
+            tuple: ``(name, video)``, where ``video`` may be `None`.
+
+        """
+        if self._index is not None:
+            record = self._index.get_video(ref, self.quality)
+            if record is not None:
+                return record['name'], None
+        name = self._listed_names.get(ref)
+        if name is not None:
+            return name, None
+        video = self._resolve(ref)
+        return self._get_name(video), video
+
+    def _refresh_url(self, ref, itag, url):
+        """Get a new URL for a stream whose URL ``url`` expired.
+
+        Files refreshing the same stream concurrently share one call.
+
+        Raises:
+            fs.errors.RemoteConnectionError: If the video no longer has
+                that stream.
+
+        """
+        return self._refreshes.do(
+            (ref, itag), self._refresh_stream, ref, itag, url)
+
+    def _refresh_stream(self, ref, itag, url):
+        video = self._videos.get(ref)
+        stream = video and video.find_stream(itag)
+        if stream is None or stream.url == url:
+            # Not refreshed by another file yet
+            self._videos.pop(ref)
+            stream = self._resolve(ref).find_stream(itag)
+        if stream is None:
+            raise errors.RemoteConnectionError(
+                msg='stream %s of %s is no longer available' % (itag, ref))
+        return stream.url
+
+    @staticmethod
+    def _get_name(video):
+        """Get the name of ``video``, before it is sanitized.
+        """
+        return '%s.%s' % (video.pafy.title, video.stream.extension)
+
+    def _entries(self):
+        """Iterate over the video refs of the root directory.
+
+        Playlist pages are only fetched as the iteration reaches them,
+        and not at all while the listing stored in the index is fresh.
+        """
+        if self._index is not None:
+            refs = self._index.get_listing(
+                self.url, self.quality, max_age=self.playlist_ttl)
+            if refs is not None:
+                for ref in refs:
+                    yield ref
+                return
+            # The stored listing is stale: fetch the playlist again
+            with self._playlist_lock:
+                self._playlist = None
+        refs = []
+        if self.playlist:
+            for entry in self._get_playlist():
+                name = self.extractor.entry_name(entry, self.quality)
+                if name is not None:
+                    self._listed_names[entry.videoid] = name
+                refs.append(entry.videoid)
+                yield entry.videoid
         else:
-            if _path in self._cache:
+            refs.append(self.url)
+            yield self.url
+        if self._index is not None:
+            self._index.set_listing(self.url, self.quality, refs)
+
+    def _resolve_entries(self, entries):
+        """Resolve ``entries`` concurrently and register their paths.
+
+        Paths are registered in the order of ``entries``, which decides
+        how duplicate titles are numbered. Playlist entries which fail
+        to resolve are skipped. Sidecars are fetched in the same batch.
+
+        Yields:
+            tuple: ``(name, ref, video, kind)`` for each entry, in order,
+            followed by its sidecars. ``kind`` is `None` for videos.
+
+        """
+        resolver = BatchResolver(
+            self._lookup_entry,
+            workers=self.resolve_workers,
+            rate=self.resolve_rate,
+        )
+        for ref, result, error in resolver.map(entries, ordered=True):
+            if error is not None:
+                if not self.playlist:
+                    raise error
+                continue
+            name, video = result
+            names = self._register(ref, name)
+            yield names[0], ref, video, None
+            for kind, sidecar in zip(self.sidecars, names[1:]):
+                yield sidecar, ref, video, kind
+
+    def _lookup_entry(self, ref):
+        """Like `_lookup`, also fetching the sidecars of the video.
+        """
+        name, video = self._lookup(ref)
+        for kind in self.sidecars:
+            try:
+                self._get_sidecar(ref, kind, video, BACKGROUND)
+            except Exception:
+                # Fetched again when opened
+                self.metrics.incr('sidecar_errors')
+        return name, video
+
+    def _check_root(self, path):
+        _path = self.validatepath(path)
+        if _path not in _ROOT_PATHS:
+            if _path in self._names or _path in self._sidecar_paths:
                 raise errors.DirectoryExpected(path)
             else:
                 raise errors.ResourceNotFound(path)
 
+    def listdir(self, path):
+        self._check_root(path)
+        entries = self._resolve_entries(self._entries())
+        return [u'%s' % name for name, _, _, _ in entries]
+
+    def scandir(self, path, namespaces=None, page=None):
+        """Get an iterator of resource info, resolved concurrently.
+
+        Entries are yielded in the playlist order, so that videos with
+        the same title are always told apart the same way.
+        """
+        self._check_root(path)
+        entries = self._entries()
+        if page is not None:
+            entries = itertools.islice(entries, *page)
+        return (
+            self._make_sidecar_info(name, ref, kind, namespaces, video)
+            if kind is not None else
+            self._make_info(name, ref, namespaces, video)
+            for name, ref, video, kind in self._resolve_entries(entries)
+        )
+
     def getinfo(self, path, namespaces=None):
         _path = self.validatepath(path)
-        namespaces = namespaces or ('basic')
 
-        if _path in [u'', u'.', u'/', u'./']:
+        if _path in _ROOT_PATHS:
 
             info = Info({
                 "basic":
@@ -177,59 +994,284 @@ class YoutubeFS(FS):
                 }
                 })
             return info
+        elif _path in self._sidecar_paths:
+            ref, kind = self._sidecar_paths[_path]
+            return self._make_sidecar_info(_path[1:], ref, kind, namespaces)
         else:
-            if _path in self._cache:
-                info_dict = {}
-                name = _path[1:]
+            return self._make_info(_path[1:], self._get_ref(path), namespaces)
 
-                info_dict['basic'] = {
-                    "name": name,
-                    "is_dir": False
-                }
-                pafyobj = None
-                stream = None
-                if 'details' in namespaces:
-                    pafyobj = pafy.new(self._cache[_path])
-                    stream = pafyobj.getbest()
-                    info_dict['details'] = {
-                        "type": int(ResourceType.file),
-                        "size": stream.get_filesize(),
-                    }
-
-                if 'mediaproxy.media' in namespaces:
-                    if not pafyobj:
-                        pafyobj = pafy.new(self._cache[_path])
-                        stream = pafyobj.getbest()
-                    info_dict['mediaproxy.media'] = {
-                        "type": 'video',
-                        "title": pafyobj.title,
-                        "rating": pafyobj.rating,
-                        "viewcount": pafyobj.viewcount,
-                        "author": pafyobj.author,
-                        "length": pafyobj.length,
-                        "duration": pafyobj.duration,
-                        "likes": pafyobj.likes,
-                        "dislikes": pafyobj.dislikes,
-                        "description": pafyobj.description,
-                        "thumb": pafyobj.thumb,
-                        "bigthumb": pafyobj.bigthumbhd,
-                        "category": pafyobj.category,
-                        "videoid": pafyobj.videoid,
-                        "keywords": pafyobj.keywords,
-                        # Streamdata
-                        "mediatype": stream.mediatype,
-                        "extension": stream.extension,
-                        "quality": stream.quality,
-                        "url": stream.url,
-                    }
-
-                return Info(info_dict)
+    def _make_info(self, name, ref, namespaces, video=None):
+        namespaces = namespaces or ('basic')
+        info_dict = {}
+
+        info_dict['basic'] = {
+            "name": name,
+            "is_dir": False
+        }
+        record = None
+        if video is None and self._index is not None:
+            if 'details' in namespaces or 'mediaproxy.media' in namespaces:
+                record = self._index.get_video(ref, self.quality)
+
+        if 'details' in namespaces:
+            if record is not None and record['size'] is not None:
+                size = record['size']
             else:
-                raise errors.ResourceNotFound(path)
+                video = video or self._resolve(ref)
+                size = video.size
+                if self._index is not None:
+                    self._index.set_size(ref, self.quality, size)
+            info_dict['details'] = {
+                "type": int(ResourceType.file),
+                "size": size,
+            }
+
+        if 'mediaproxy.media' in namespaces:
+            if record is not None:
+                info_dict['mediaproxy.media'] = self._record_media(
+                    ref, record)
+            else:
+                video = video or self._resolve(ref)
+                info_dict['mediaproxy.media'] = self._media(video)
+
+        return Info(info_dict)
+
+    def _make_sidecar_info(self, name, ref, kind, namespaces, video=None):
+        namespaces = namespaces or ('basic')
+        info_dict = {
+            'basic': {
+                "name": name,
+                "is_dir": False
+            }
+        }
+        if 'details' in namespaces:
+            info_dict['details'] = {
+                "type": int(ResourceType.file),
+                "size": len(self._get_sidecar(ref, kind, video)),
+            }
+        return Info(info_dict)
+
+    def _get_media(self, ref, video=None):
+        """Get the ``mediaproxy.media`` namespace of the video ``ref``.
+        """
+        if video is None and self._index is not None:
+            record = self._index.get_video(ref, self.quality)
+            if record is not None:
+                return self._record_media(ref, record)
+        return self._media(video or self._resolve(ref))
+
+    def _record_media(self, ref, record):
+        """Get the ``mediaproxy.media`` namespace of an index record.
+
+        The fields which were not stored resolve the video when read.
+        """
+        getters = {
+            key: functools.partial(self._media_field, ref, key)
+            for key in itertools.chain(_MEDIA_FIELDS, _STREAM_FIELDS)
+        }
+        return LazyDict(getters, record['media'])
+
+    def _media_field(self, ref, key):
+        return self._media(self._resolve(ref))[key]
+
+    def _get_sidecar(self, ref, kind, video=None, priority=INTERACTIVE):
+        """Get the contents of a sidecar, from memory if possible.
+
+        Concurrent calls for the same sidecar share one fetch.
+
+        Arguments:
+            ref (str): The ref of the video.
+            kind (str): The kind of sidecar, see `YoutubeFS`.
+            video (_Video, optional): The video, if already resolved.
+            priority (int): The priority of the request of a thumbnail.
+
+        Returns:
+            bytes: The contents of the sidecar.
+
+        """
+        data = self._blobs.get((ref, kind))
+        if data is not None:
+            self.metrics.incr('sidecar_cache_hits')
+            return data
+        self.metrics.incr('sidecar_cache_misses')
+        return self._sidecar_fetches.do(
+            (ref, kind), self._fetch_sidecar, ref, kind, video, priority)
+
+    def _fetch_sidecar(self, ref, kind, video, priority):
+        data = self._blobs.get((ref, kind))
+        if data is not None:
+            # Fetched by a call which returned since the cache lookup
+            return data
+        media = self._get_media(ref, video)
+        if kind == 'info':
+            data = info_json(media)
+        else:
+            url = thumbnail_url(media)
+            if not url:
+                raise errors.ResourceNotFound(
+                    self._names.path(ref) or ref,
+                    msg='video %s has no thumbnail' % ref)
+            res = self._pool.urlopen(url, priority=priority)
+            try:
+                data = res.read()
+            finally:
+                res.close()
+            if res.status != 200:
+                raise errors.RemoteConnectionError(
+                    msg='HTTP Error %s: %s' % (res.status, res.reason))
+        self._blobs.set((ref, kind), data)
+        return data
+
+    @staticmethod
+    def _media(video):
+        """Get the ``mediaproxy.media`` namespace of ``video``.
+
+        The fields which may cost a request are only computed when read,
+        and kept with the video.
+        """
+        if video.media is not None:
+            return video.media
+        pafyobj, stream = video.pafy, video.stream
+        getters = {}
+        values = {"type": 'video'}
+        for key, attr in _MEDIA_FIELDS.items():
+            if key in _LAZY_FIELDS:
+                getters[key] = functools.partial(getattr, pafyobj, attr)
+            else:
+                values[key] = getattr(pafyobj, attr)
+        # Streamdata
+        for key in _STREAM_FIELDS:
+            values[key] = getattr(stream, key)
+        video.media = LazyDict(getters, values)
+        return video.media
+
+    def _get_ref(self, path):
+        """Return the video ref of ``path``.
+
+        Paths listed by another process sharing the index are found
+        without listing the root.
+        """
+        _path = self.validatepath(path)
+        ref = self._names.get(_path)
+        if ref is None and self._index is not None:
+            self._load_index()
+            ref = self._names.get(_path)
+        if ref is None:
+            raise errors.ResourceNotFound(path)
+        return ref
+
+    def _get_video(self, path):
+        """Return the resolved video of ``path``.
+        """
+        ref = self._get_ref(path)
+        try:
+            return self._resolve(ref)
+        except:
+            raise errors.ResourceNotFound(path)
+
+    def _get_stream(self, path):
+        """Return what ``path`` is opened with, as a dict.
+
+        A stream resolved by another process sharing the index is used
+        without extracting the video again.
+
+        Returns:
+            dict: The ``ref`` and ``videoid`` of the video, and the
+            ``itag``, ``url``, ``size`` and format ``info`` of its
+            stream. The size may be `None` if unknown. The resolved
+            ``video`` is `None` if the stream came from the index.
+
+        """
+        ref = self._get_ref(path)
+        if self._index is not None and self._videos.get(ref) is None:
+            stream = self._index.get_stream(ref, self.quality)
+            if stream is not None:
+                self.metrics.incr('index_stream_hits')
+                stream.update(ref=ref, info=None, video=None)
+                return stream
+        video = self._get_video(path)
+        return {
+            'ref': ref,
+            'videoid': video.pafy.videoid,
+            'itag': video.stream.itag,
+            'url': video.stream.url,
+            'size': video._size,
+            'info': getattr(video.stream, '_info', None),
+            'video': video,
+        }
+
+    def _segmented(self, path, segments=None, segment_size=None):
+        """Return a `SegmentedDownload` of ``path``, or `None`.
+
+        `None` means the file should be read over a single connection.
+        """
+        segments = self.segments if segments is None else segments
+        if segments <= 1 or self.validatepath(path) in self._sidecar_paths:
+            return None
+        stream = self._get_stream(path)
+        if is_fragmented(stream['info']):
+            return None
+        size = stream['size']
+        if size is None:
+            size = (stream['video'] or self._get_video(path)).size
+        if not size:
+            return None
+        return SegmentedDownload(
+            stream['url'],
+            size,
+            self._pool,
+            segments=segments,
+            segment_size=segment_size or self.segment_size,
+            retries=self.segment_retries,
+        )
+
+    def download(self, path, file, chunk_size=None, segments=None,
+                 segment_size=None, **options):
+        """Copy a file to a file-like object over parallel connections.
+
+        Arguments:
+            path (str): Path to a resource.
+            file (file-like): A file-like object open for writing in
+                binary mode.
+            chunk_size (int, optional): Number of bytes to read at a
+                time, if the file is read over a single connection.
+            segments (int, optional): Number of ranges fetched
+                concurrently, defaults to the filesystem setting.
+            segment_size (int, optional): Size of a range in bytes.
+            **options: Implementation specific options passed to
+                `openbin` when reading over a single connection.
+
+        """
+        download = self._segmented(path, segments, segment_size)
+        if download is not None:
+            download.download(file)
+            return
+
+        # Reuse one buffer for the whole copy instead of a bytes per chunk
+        view = memoryview(bytearray(chunk_size or self.block_size))
+        with self.openbin(path, **options) as read_file:
+            while True:
+                count = read_file.readinto(view)
+                if not count:
+                    break
+                file.write(view[:count])
+
+    def readbytes(self, path):
+        """Get the contents of a file, fetched over parallel connections.
+        """
+        download = self._segmented(path)
+        if download is None:
+            return super(YoutubeFS, self).readbytes(path)
+        data = bytearray(download.size)
+        download.readinto(data)
+        return bytes(data)
 
     def openbin(self, path, mode=u'r', *args, **kwargs):
 
         _path = self.validatepath(path)
+        prefetch = kwargs.pop('prefetch', self.prefetch)
+        # Files do their own buffering, `RawWrapper` takes no such argument
+        kwargs.pop('buffering', None)
 
         if mode == 'rt':
             raise ValueError('rt mode not supported in openbin')
@@ -239,11 +1281,12 @@ class YoutubeFS(FS):
 
         if not 'r' in mode:
             raise errors.Unsupported()
-        try:
-            pafyobj = pafy.new(self._cache[_path])
-            url = pafyobj.getbest().url
-        except:
-            raise errors.ResourceNotFound(path)
+        if _path in self._sidecar_paths:
+            data = self._get_sidecar(*self._sidecar_paths[_path])
+            return RawWrapper(io.BytesIO(data), mode=mode, *args, **kwargs)
+        stream = self._get_stream(path)
+        url = stream['url']
+        itag = stream['itag']
 
         class HTTPFile(RawWrapper):
 
@@ -263,11 +1306,60 @@ class YoutubeFS(FS):
             def seek(self, *args):
                 raise errors.Unsupported()
 
+        info = stream['info']
+        if is_fragmented(info):
+            # HLS and DASH streams have no single URL to read ranges of
+            response = AdaptiveHTTPFile.from_format(
+                info, pool=self._pool, prefetch=max(prefetch, 2))
+            return RawWrapper(response, mode=mode, *args, **kwargs)
         if self.seekable:
-            response = SeekableHTTPFile(url)
+            response = SeekableHTTPFile(
+                url,
+                pool=self._pool,
+                block_size=self.block_size,
+                readahead=self.readahead,
+                prefetch=prefetch,
+                chunk_cache=self._chunk_cache,
+                cache_key=(stream['videoid'], itag),
+                flights=self._fetches,
+                refresh=functools.partial(
+                    self._refresh_url, stream['ref'], itag),
+                refresh_margin=self.expiry_margin,
+                # Only if known: the HEAD request of the file gets it too
+                size=stream['size'],
+            )
             return RawWrapper(response, mode=mode, *args, **kwargs)
         else:
-            return HTTPFile(urlopen(url), mode=mode, *args, **kwargs)
+            response = self._open_stream(path, stream['ref'], itag, url)
+            if prefetch > 0:
+                response = PrefetchStream(response, self.block_size, prefetch)
+            return HTTPFile(response, mode=mode, *args, **kwargs)
+
+    def _open_stream(self, path, ref, itag, url):
+        """Request the whole stream of ``path``, for a non-seekable file.
+
+        An expired or revoked URL is refreshed once.
+
+        Raises:
+            fs.errors.ResourceNotFound: If the stream is not found.
+            fs.errors.RemoteConnectionError: On network and HTTP errors.
+
+        """
+        try:
+            res = self._pool.urlopen(url)
+            if res.status in (403, 410):
+                res.close()
+                url = self._refresh_url(ref, itag, url)
+                res = self._pool.urlopen(url)
+        except (http_client.HTTPException, socket.error) as error:
+            raise errors.RemoteConnectionError(msg=str(error))
+        if res.status >= 400:
+            res.close()
+            if res.status == 404:
+                raise errors.ResourceNotFound(path)
+            raise errors.RemoteConnectionError(
+                msg='HTTP Error %s: %s' % (res.status, res.reason))
+        return res
 
     @classmethod
     def makedir(self, *args, **kwargs):
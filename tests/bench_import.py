@@ -0,0 +1,90 @@
+# coding: utf-8
+"""Import time of the youtube opener and filesystem.
+
+Each import is timed in a new interpreter, after `fs` itself is
+imported. Run with ``python -m tests.bench_import``, results are
+printed as JSON, or written to the file given with ``--output``.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.realpath(os.path.join(__file__, '..', '..'))
+
+#: Modules whose import is measured, and what is imported to get them.
+TARGETS = [
+    ('fs.opener.youtubefs', 'import fs.opener.youtubefs'),
+    ('fs.youtube', 'import fs.youtube'),
+    ('pafy', 'import fs.youtube; import pafy'),
+]
+
+#: Slow dependencies reported as loaded or not after each import.
+HEAVY = ['pafy', 'youtube_dl', 'pkg_resources', 'sqlite3', 'asyncio']
+
+_SCRIPT = """
+import json, os, sys, time
+import fs
+import fs.opener
+fs.__path__.insert(0, os.path.join({root!r}, 'fs'))
+fs.opener.__path__.insert(0, os.path.join({root!r}, 'fs', 'opener'))
+before = set(sys.modules)
+start = time.time()
+{statement}
+elapsed = time.time() - start
+print(json.dumps({{
+    'seconds': elapsed,
+    'loaded': sorted(m for m in {heavy!r} if m in sys.modules),
+    'preloaded': sorted(m for m in {heavy!r} if m in before),
+}}))
+"""
+
+
+def measure(statement):
+    script = _SCRIPT.format(root=ROOT, statement=statement, heavy=HEAVY)
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--output', help='write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, statement in TARGETS:
+        runs = [measure(statement) for _ in range(args.repeat)]
+        seconds = sorted(run['seconds'] for run in runs)
+        results[name] = {
+            'median_ms': seconds[len(seconds) // 2] * 1000,
+            'min_ms': seconds[0] * 1000,
+            # Only what the import itself pulled in
+            'loaded': sorted(
+                set(runs[-1]['loaded']) - set(runs[-1]['preloaded'])),
+        }
+
+    report = {
+        'time': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
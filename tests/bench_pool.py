@@ -0,0 +1,56 @@
+# coding: utf-8
+"""Range requests per second with and without the connection pool.
+
+Run with ``python -m tests.bench_pool``.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import time
+
+from six.moves.urllib.request import Request
+from six.moves.urllib.request import urlopen
+
+from fs.youtube.pool import HTTPConnectionPool
+
+from .rangeserver import RangeServer
+
+REQUESTS = 500
+CHUNK = 8192
+
+
+def _ranges():
+    for i in range(REQUESTS):
+        start = (i * 7919 * CHUNK) % (len(DATA) - CHUNK)
+        yield {'Range': 'bytes=%s-%s' % (start, start + CHUNK - 1)}
+
+
+def bench_urlopen(url):
+    for headers in _ranges():
+        urlopen(Request(url, headers=headers)).read()
+
+
+def bench_pool(url):
+    pool = HTTPConnectionPool()
+    for headers in _ranges():
+        pool.urlopen(url, headers).read()
+    pool.clear()
+
+
+DATA = os.urandom(4 * 1024 * 1024)
+
+
+def main():
+    for name, bench in [('urlopen', bench_urlopen), ('pool', bench_pool)]:
+        with RangeServer(DATA) as server:
+            start = time.time()
+            bench(server.url)
+            elapsed = time.time() - start
+            print('%-8s %8.1f req/s  %4d connections' % (
+                name, REQUESTS / elapsed, server.connections))
+
+
+if __name__ == '__main__':
+    main()
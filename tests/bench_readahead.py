@@ -0,0 +1,47 @@
+# coding: utf-8
+"""Sequential read throughput and requests per MB of `SeekableHTTPFile`.
+
+Run with ``python -m tests.bench_readahead``.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+import time
+
+from fs.iotools import RawWrapper
+from fs.youtube.pool import HTTPConnectionPool
+from fs.youtube.youtubefs import SeekableHTTPFile
+
+from .rangeserver import RangeServer
+
+DATA = os.urandom(16 * 1024 * 1024)
+LATENCY = 0.002
+CONFIGS = [
+    # One range request per 8 KiB read, as before block caching
+    ('unbuffered', dict(block_size=8192, readahead=1)),
+    ('1MiB', dict(block_size=1024 * 1024, readahead=1)),
+    ('1MiB x4', dict(block_size=1024 * 1024, readahead=4)),
+]
+
+
+def main():
+    megabytes = len(DATA) / (1024.0 * 1024)
+    for name, options in CONFIGS:
+        with RangeServer(DATA, latency=LATENCY) as server:
+            pool = HTTPConnectionPool()
+            raw = SeekableHTTPFile(server.url, pool=pool, **options)
+            reader = io.BufferedReader(RawWrapper(raw, mode='rb'), 8192)
+            start = time.time()
+            while reader.read(8192):
+                pass
+            elapsed = time.time() - start
+            pool.clear()
+            print('%-12s %8.1f MB/s  %7.2f requests/MB' % (
+                name, megabytes / elapsed, raw.requests / megabytes))
+
+
+if __name__ == '__main__':
+    main()
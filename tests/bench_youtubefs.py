@@ -0,0 +1,200 @@
+# coding: utf-8
+"""End to end benchmarks of `YoutubeFS` against a local fake CDN.
+
+Run with ``python -m tests.bench_youtubefs``, results are printed as
+JSON, or written to the file given with ``--output`` to be compared
+between revisions. See ``--help`` for the network conditions.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import json
+import platform
+import random
+import threading
+import time
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.youtube import YoutubeFS
+
+from .fakecdn import CDNPafyModule
+from .fakecdn import FakeCDN
+
+CHUNK = 64 * 1024
+SEEKS = 100
+
+
+def bench_listdir(yt_fs, cdn):
+    return lambda: yt_fs.listdir('/')
+
+
+def bench_getinfo(yt_fs, cdn):
+    names = yt_fs.listdir('/')
+
+    def run():
+        for name in names:
+            yt_fs.getinfo(name, namespaces=['details'])
+    return run
+
+
+def bench_sequential_read(yt_fs, cdn):
+    name = yt_fs.listdir('/')[0]
+
+    def run():
+        with yt_fs.openbin(name) as f:
+            while f.read(CHUNK):
+                pass
+    return run
+
+
+def bench_random_seek(yt_fs, cdn):
+    name = yt_fs.listdir('/')[0]
+    offsets = random.Random(0).sample(range(cdn.size - 4096), SEEKS)
+
+    def run():
+        with yt_fs.openbin(name) as f:
+            for offset in offsets:
+                f.seek(offset)
+                f.read(4096)
+    return run
+
+
+def bench_concurrent_open(yt_fs, cdn):
+    names = yt_fs.listdir('/')
+
+    def read(name):
+        with yt_fs.openbin(name) as f:
+            f.read(256 * 1024)
+
+    def run():
+        threads = [
+            threading.Thread(target=read, args=(name,)) for name in names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return run
+
+
+def bench_expired_url(yt_fs, cdn):
+    name = yt_fs.listdir('/')[0]
+
+    def run():
+        with yt_fs.openbin(name) as f:
+            f.read(CHUNK)
+            cdn.revoke()
+            f.seek(cdn.size // 2)
+            f.read(CHUNK)
+    return run
+
+
+BENCHMARKS = [
+    ('listdir', bench_listdir),
+    ('getinfo', bench_getinfo),
+    ('sequential_read', bench_sequential_read),
+    ('random_seek', bench_random_seek),
+    ('concurrent_open', bench_concurrent_open),
+    ('expired_url', bench_expired_url),
+]
+
+
+def _counters(yt_fs, cdn):
+    metrics = yt_fs.metrics
+    return {
+        'requests': cdn.requests,
+        'bytes': metrics.counter('http_bytes'),
+        'extractions': metrics.histogram('extraction_seconds')['count'],
+    }
+
+
+def run_benchmark(bench, args):
+    """Time one run of ``bench`` on a new server and filesystem.
+    """
+    cdn = FakeCDN(
+        videos=args.videos,
+        size=args.size,
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        page_size=args.page_size,
+    )
+    with cdn, mock.patch('fs.youtube.youtubefs.pafy',
+                         CDNPafyModule(cdn.base_url)):
+        yt_fs = YoutubeFS('PLbench')
+        try:
+            run = bench(yt_fs, cdn)
+            before = _counters(yt_fs, cdn)
+            start = time.time()
+            run()
+            elapsed = time.time() - start
+            after = _counters(yt_fs, cdn)
+            result = {k: after[k] - before[k] for k in after}
+            result['seconds'] = elapsed
+            return result
+        finally:
+            yt_fs.close()
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--videos', type=int, default=20)
+    parser.add_argument('--size', type=int, default=8 * 1024 * 1024)
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='seconds before each response')
+    parser.add_argument('--bandwidth', type=int, default=None,
+                        help='bytes per second of each response')
+    parser.add_argument('--only', action='append', default=None,
+                        help='name of a benchmark to run, can be repeated')
+    parser.add_argument('--output', help='write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, bench in BENCHMARKS:
+        if args.only and name not in args.only:
+            continue
+        runs = [run_benchmark(bench, args) for _ in range(args.repeat)]
+        seconds = [run['seconds'] for run in runs]
+        result = {'median': _median(seconds), 'min': min(seconds)}
+        for key in ('requests', 'bytes', 'extractions'):
+            result[key] = _median([run[key] for run in runs])
+        results[name] = result
+
+    report = {
+        'time': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'repeat': args.repeat,
+            'videos': args.videos,
+            'size': args.size,
+            'page_size': args.page_size,
+            'latency': args.latency,
+            'bandwidth': args.bandwidth,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
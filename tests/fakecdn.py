@@ -0,0 +1,204 @@
+# coding: utf-8
+"""A local server standing in for YouTube and its video CDN.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import json
+import os
+import time
+
+from six.moves import http_client
+from six.moves.urllib.parse import parse_qs
+from six.moves.urllib.parse import urlsplit
+from six.moves.urllib.request import urlopen
+
+from .fakepafy import FakePafy
+from .fakepafy import FakeStream
+from .fakepafy import _FakePlaylistModule
+from .rangeserver import RangeRequestHandler
+from .rangeserver import RangeServer
+
+
+class CDNRequestHandler(RangeRequestHandler):
+
+    def _send_status(self, status, body=b'', content_type=None):
+        self.send_response(status)
+        if content_type is not None:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_json(self, document):
+        self.server.count(self.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if document is None:
+            self._send_status(404)
+            return
+        body = json.dumps(document).encode('utf-8')
+        self._send_status(200, body, 'application/json')
+
+    def _handle(self, send_body):
+        path, _, query = self.path.partition('?')
+        params = parse_qs(query)
+        if path == '/playlist':
+            self._send_json(self.server.playlist_page(
+                int(params.get('page', ['0'])[0])))
+        elif path.startswith('/watch/'):
+            self._send_json(self.server.watch(path[len('/watch/'):]))
+        elif self.server.expired(params):
+            self.server.count(self.path)
+            self._send_status(403)
+        else:
+            self._send_body(send_body)
+
+    def do_GET(self):
+        self._handle(True)
+
+    def do_HEAD(self):
+        self._handle(False)
+
+
+class FakeCDN(RangeServer):
+    """Serve a playlist, video metadata and signed stream URLs.
+
+    ``/playlist?page=N`` lists the video IDs of a page of the playlist,
+    ``/watch/<id>`` gives the title, size and a signed stream URL of a
+    video, and ``/videoplayback/<id>?expire=T`` serves its bytes until
+    ``T`` passes or `revoke` is called, then answers with a 403 error.
+
+    Arguments:
+        videos (int): Number of videos in the playlist.
+        size (int): Size in bytes of each video.
+        latency (float): Delay in seconds before each response.
+        bandwidth (int, optional): Bytes per second of each response.
+        url_ttl (float): Lifetime in seconds of the stream URLs.
+        page_size (int): Number of videos per playlist page.
+
+    """
+
+    handler = CDNRequestHandler
+
+    def __init__(self, videos=10, size=4 * 1024 * 1024, latency=0,
+                 bandwidth=None, url_ttl=3600.0, page_size=50):
+        RangeServer.__init__(self, b'', latency=latency)
+        self.bandwidth = bandwidth
+        self.url_ttl = url_ttl
+        self.page_size = page_size
+        self.size = size
+        self.videoids = ['vid%s' % i for i in range(videos)]
+        self.revoked = 0
+        # Every video serves the same bytes, to spare memory
+        data = os.urandom(size)
+        for videoid in self.videoids:
+            self.routes['/videoplayback/%s' % videoid] = data
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:%s' % self.server_address[1]
+
+    def stream_url(self, videoid):
+        return '%s/videoplayback/%s?expire=%.3f&issued=%.6f' % (
+            self.base_url, videoid, time.time() + self.url_ttl, time.time())
+
+    def revoke(self):
+        """Make every stream URL issued so far expire.
+        """
+        self.revoked = time.time()
+
+    def expired(self, params):
+        try:
+            expire = float(params['expire'][0])
+            issued = float(params['issued'][0])
+        except (KeyError, IndexError, ValueError):
+            return False
+        return expire <= time.time() or issued <= self.revoked
+
+    def playlist_page(self, page):
+        start = page * self.page_size
+        return {
+            'title': 'Playlist',
+            'entries': self.videoids[start:start + self.page_size],
+            'next': start + self.page_size < len(self.videoids),
+        }
+
+    def watch(self, videoid):
+        if videoid not in self.videoids:
+            return None
+        return {
+            'videoid': videoid,
+            'title': 'Video %s' % videoid[3:],
+            'size': self.size,
+            'url': self.stream_url(videoid),
+        }
+
+
+class CDNStream(FakeStream):
+    """A stream whose size is fetched with a HEAD request, like pafy's.
+    """
+
+    def get_filesize(self):
+        self.filesize_calls += 1
+        url = urlsplit(self.url)
+        conn = http_client.HTTPConnection(url.netloc)
+        try:
+            conn.request('HEAD', '%s?%s' % (url.path, url.query))
+            return int(conn.getresponse().getheader('Content-Length'))
+        finally:
+            conn.close()
+
+
+class CDNPlaylist(object):
+    """A lazy playlist fetching its pages from a `FakeCDN`.
+    """
+
+    def __init__(self, module):
+        self._module = module
+        self.pages = 0
+
+    @property
+    def title(self):
+        return self._module.get('/playlist?page=0')['title']
+
+    def __iter__(self):
+        page = 0
+        while True:
+            document = self._module.get('/playlist?page=%s' % page)
+            self.pages += 1
+            for videoid in document['entries']:
+                yield FakePafy(videoid, None, None)
+            if not document['next']:
+                return
+            page += 1
+
+
+class CDNPafyModule(object):
+    """A stand-in for the `pafy` module, extracting videos from a `FakeCDN`.
+
+    Arguments:
+        base_url (str): The `FakeCDN.base_url` of the server.
+
+    """
+
+    playlist = _FakePlaylistModule()
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def get(self, path):
+        response = urlopen(self.base_url + path)
+        try:
+            return json.loads(response.read().decode('utf-8'))
+        finally:
+            response.close()
+
+    def new(self, ref, basic=True):
+        document = self.get('/watch/%s' % ref.rsplit('v=', 1)[-1])
+        stream = CDNStream(document['url'], document['size'])
+        return FakePafy(document['videoid'], document['title'], stream)
+
+    def get_playlist2(self, url):
+        return CDNPlaylist(self)
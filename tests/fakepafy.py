@@ -0,0 +1,166 @@
+# coding: utf-8
+"""A stand-in for the `pafy` module, serving videos from a local server.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import collections
+import time
+
+
+class FakeStream(object):
+
+    def __init__(self, url, size, extension='mp4', itag='22',
+                 dimensions=(1280, 720), mediatype='normal'):
+        self.url = url
+        self.size = size
+        self.extension = extension
+        self.itag = itag
+        self.dimensions = dimensions
+        self.quality = '%sx%s' % dimensions
+        self.mediatype = mediatype
+        self.filesize_calls = 0
+
+    def get_filesize(self):
+        self.filesize_calls += 1
+        return self.size
+
+
+class FakePafy(object):
+
+    author = 'media-proxy'
+    rating = 5.0
+    viewcount = 1000
+    length = 60
+    duration = '00:01:00'
+    likes = 10
+    dislikes = 1
+    description = 'A video'
+    thumb = 'http://i.ytimg.com/vi/default.jpg'
+    bigthumbhd = 'http://i.ytimg.com/vi/hqdefault.jpg'
+    category = 'Music'
+    keywords = ['test']
+
+    #: Seconds `getbest` takes, standing in for a youtube-dl extraction.
+    delay = 0
+
+    def __init__(self, videoid, title, stream, streams=()):
+        self.videoid = videoid
+        self.title = title
+        self.stream = stream
+        self.extra_streams = list(streams)
+
+    def _of_type(self, mediatype):
+        streams = [self.stream] + self.extra_streams
+        return [s for s in streams if s.mediatype == mediatype]
+
+    @property
+    def streams(self):
+        return self._of_type('normal')
+
+    @property
+    def audiostreams(self):
+        return self._of_type('audio')
+
+    @property
+    def videostreams(self):
+        return self._of_type('video')
+
+    @property
+    def allstreams(self):
+        return self.streams + self.audiostreams + self.videostreams
+
+    def getbest(self):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.stream
+
+    def getbestaudio(self):
+        return (self.audiostreams or [None])[-1]
+
+    def getbestvideo(self):
+        return (self.videostreams or [None])[-1]
+
+
+class FakePlaylist(object):
+    """A lazy playlist fetching ``page_size`` videos per page.
+    """
+
+    def __init__(self, module, page_size):
+        self._module = module
+        self.page_size = page_size
+        self.pages = 0
+
+    @property
+    def title(self):
+        self._module.calls['playlist_title'] += 1
+        return self._module.title
+
+    def __iter__(self):
+        videos = list(self._module.videos.values())
+        for start in range(0, len(videos), self.page_size):
+            self.pages += 1
+            if self._module.page_delay:
+                time.sleep(self._module.page_delay)
+            for video in videos[start:start + self.page_size]:
+                yield video
+
+
+class _FakePlaylistModule(object):
+
+    @staticmethod
+    def extract_playlist_id(url):
+        return url if url.startswith('PL') else None
+
+
+class FakePafyModule(object):
+    """Resolve video IDs to `FakePafy` objects, counting extractions.
+
+    Arguments:
+        videos (list): The `FakePafy` objects of the playlist.
+        title (str): The title of the playlist.
+
+    """
+
+    playlist = _FakePlaylistModule()
+
+    #: Seconds each playlist page takes to fetch.
+    page_delay = 0
+
+    def __init__(self, videos, title='Playlist', page_size=50):
+        self.videos = collections.OrderedDict((v.videoid, v) for v in videos)
+        self.title = title
+        self.page_size = page_size
+        self.calls = collections.Counter()
+
+    def new(self, ref, basic=True):
+        videoid = ref.rsplit('v=', 1)[-1]
+        if not basic:
+            return FakePafy(videoid, None, None)
+        self.calls['new'] += 1
+        try:
+            return self.videos[videoid]
+        except KeyError:
+            raise IOError('no such video: %s' % ref)
+
+    def get_playlist2(self, url):
+        self.calls['get_playlist2'] += 1
+        return FakePlaylist(self, self.page_size)
+
+
+def make_videos(url, sizes, prefix='vid'):
+    """Make one `FakePafy` per size, all streaming from ``url``.
+
+    Videos are given the IDs ``prefix + index``: single videos must be
+    opened from a URL with a valid, 11 character ID.
+    """
+    return [
+        FakePafy('%s%s' % (prefix, i), 'Video %s' % i, FakeStream(url, size))
+        for i, size in enumerate(sizes)
+    ]
+
+
+#: The prefix of `make_videos` giving valid video IDs, and the URL of
+#: the first video.
+SINGLE_PREFIX = 'video-id-0'
+SINGLE_URL = 'https://www.youtube.com/watch?v=video-id-00'
@@ -0,0 +1,145 @@
+# coding: utf-8
+"""A local HTTP/1.1 server answering byte range requests.
+"""
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import collections
+import re
+import threading
+import time
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+_RANGE = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+class RangeRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _send_body(self, send_body):
+        data = self.server.routes.get(self.path.split('?')[0], self.server.data)
+        self.server.count(self.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.path in self.server.forbidden:
+            self.send_response(403)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.server.fail():
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        match = _RANGE.match(self.headers.get('Range') or '')
+        if not match:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            if send_body:
+                self._write(data)
+            return
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else len(data) - 1
+        end = min(end, len(data) - 1)
+        if start >= len(data):
+            self.send_response(416)
+            self.send_header('Content-Range', 'bytes */%s' % len(data))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(206)
+        self.send_header('Content-Range', 'bytes %s-%s/%s' % (start, end, len(data)))
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if send_body:
+            self._write(data[start:end + 1])
+
+    def _write(self, data):
+        bandwidth = self.server.bandwidth
+        if not bandwidth:
+            self.wfile.write(data)
+            return
+        # Throttle each response to ``bandwidth`` bytes per second
+        chunk = max(1, bandwidth // 100)
+        for start in range(0, len(data), chunk):
+            self.wfile.write(data[start:start + chunk])
+            time.sleep(len(data[start:start + chunk]) / float(bandwidth))
+
+    def do_GET(self):
+        self._send_body(True)
+
+    def do_HEAD(self):
+        self._send_body(False)
+
+
+class RangeServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """Serve ``data`` on ``127.0.0.1`` in a background thread.
+
+    Keeps count of the TCP connections accepted and of the requests
+    answered, so tests can check connection reuse. ``latency`` adds a
+    delay in seconds before each response, and the next ``failures``
+    requests are answered with a 503 error. Requests for the paths in
+    ``forbidden`` are answered with a 403 error, like expired URLs.
+    ``routes`` maps paths to the data served for them instead of
+    ``data``. ``bandwidth`` limits each response to that many bytes
+    per second.
+    """
+
+    daemon_threads = True
+    handler = RangeRequestHandler
+
+    def __init__(self, data, latency=0):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), self.handler)
+        self.data = data
+        self.latency = latency
+        self.bandwidth = None
+        self.failures = 0
+        self.forbidden = set()
+        self.routes = {}
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.paths = collections.Counter()
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s/video.mp4' % self.server_address[1]
+
+    def count(self, path):
+        with self.lock:
+            self.requests += 1
+            self.paths[path] += 1
+
+    def handle_error(self, request, client_address):
+        # Clients dropping connections mid-response are expected
+        pass
+
+    def fail(self):
+        with self.lock:
+            if self.failures > 0:
+                self.failures -= 1
+                return True
+            return False
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,214 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.youtube import YoutubeFS
+from fs.youtube.adaptive import AdaptiveHTTPFile
+from fs.youtube.adaptive import Segment
+from fs.youtube.adaptive import parse_m3u8
+from fs.youtube.adaptive import parse_mpd
+from fs.youtube.pool import HTTPConnectionPool
+
+from .fakepafy import FakePafy
+from .fakepafy import FakePafyModule
+from .fakepafy import FakeStream
+from .rangeserver import RangeServer
+
+MEDIA_PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:4
+#EXT-X-MEDIA-SEQUENCE:0
+#EXT-X-MAP:URI="init.mp4"
+#EXTINF:5.0,
+seg0.ts
+#EXT-X-BYTERANGE:100@0
+#EXTINF:5.0,
+all.ts
+#EXT-X-BYTERANGE:50
+#EXTINF:5.0,
+all.ts
+#EXT-X-ENDLIST
+"""
+
+MASTER_PLAYLIST = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=1280000,RESOLUTION=640x360
+low/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=2560000,RESOLUTION=1280x720
+high/index.m3u8
+"""
+
+MPD = """<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011">
+  <BaseURL>http://cdn/base/</BaseURL>
+  <Period>
+    <AdaptationSet mimeType="audio/mp4">
+      <Representation id="140">
+        <BaseURL>audio/</BaseURL>
+        <SegmentList>
+          <Initialization sourceURL="init.mp4"/>
+          <SegmentURL media="sq/1"/>
+          <SegmentURL media="sq/2"/>
+        </SegmentList>
+      </Representation>
+      <Representation id="141">
+        <BaseURL>file.mp4</BaseURL>
+        <SegmentList>
+          <Initialization range="0-99"/>
+          <SegmentURL mediaRange="100-199"/>
+        </SegmentList>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+"""
+
+
+class TestManifests(unittest.TestCase):
+
+    def test_m3u8(self):
+        segments, ended = parse_m3u8(MEDIA_PLAYLIST, 'http://cdn/live/index.m3u8')
+        self.assertTrue(ended)
+        self.assertEqual(segments, [
+            Segment('http://cdn/live/init.mp4'),
+            Segment('http://cdn/live/seg0.ts'),
+            Segment('http://cdn/live/all.ts', 0),
+            Segment('http://cdn/live/all.ts', 100),
+        ])
+        self.assertEqual([s.length for s in segments], [None, None, 100, 50])
+
+    def test_m3u8_live(self):
+        text = MEDIA_PLAYLIST.replace('#EXT-X-ENDLIST\n', '')
+        self.assertFalse(parse_m3u8(text, 'http://cdn/')[1])
+
+    def test_m3u8_master(self):
+        segments, ended = parse_m3u8(MASTER_PLAYLIST, 'http://cdn/master.m3u8')
+        self.assertIsNone(ended)
+        self.assertEqual(segments, [Segment('http://cdn/high/index.m3u8')])
+
+    def test_m3u8_invalid(self):
+        self.assertRaises(ValueError, parse_m3u8, '<html>', 'http://cdn/')
+
+    def test_mpd(self):
+        self.assertEqual(parse_mpd(MPD, 'http://cdn/manifest.mpd'), [
+            Segment('http://cdn/base/audio/init.mp4'),
+            Segment('http://cdn/base/audio/sq/1'),
+            Segment('http://cdn/base/audio/sq/2'),
+        ])
+        segments = parse_mpd(MPD, 'http://cdn/manifest.mpd', '141')
+        self.assertEqual(segments, [
+            Segment('http://cdn/base/file.mp4', 0),
+            Segment('http://cdn/base/file.mp4', 100),
+        ])
+        self.assertEqual([s.length for s in segments], [100, 100])
+        self.assertRaises(ValueError, parse_mpd, MPD, 'http://cdn/', '999')
+
+
+class TestAdaptiveHTTPFile(unittest.TestCase):
+
+    def setUp(self):
+        self.server = RangeServer(b'').__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.pool = HTTPConnectionPool()
+        self.addCleanup(self.pool.clear)
+        self.base = self.server.url.rpartition('/')[0]
+        self.chunks = [os.urandom(1000 + 100 * i) for i in range(10)]
+        self.data = b''.join(self.chunks)
+        for i, chunk in enumerate(self.chunks):
+            self.server.routes['/seg%s.ts' % i] = chunk
+
+    def playlist(self, count, ended=True):
+        lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:5']
+        for i in range(count):
+            lines.extend(['#EXTINF:5.0,', 'seg%s.ts' % i])
+        if ended:
+            lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines).encode('utf-8')
+
+    def open(self, **kwargs):
+        segments = [
+            Segment('%s/seg%s.ts' % (self.base, i)) for i in range(10)]
+        f = AdaptiveHTTPFile(segments, pool=self.pool, **kwargs)
+        self.addCleanup(f.close)
+        return f
+
+    def test_sequential(self):
+        f = self.open(prefetch=3)
+        data = b''
+        while True:
+            chunk = f.read(700)
+            if not chunk:
+                break
+            data += chunk
+        self.assertEqual(data, self.data)
+        # No HEAD request is needed to read from the start
+        self.assertEqual(self.server.requests, 10)
+        self.assertEqual(f.size, len(self.data))
+
+    def test_seek(self):
+        f = self.open()
+        f.seek(5000)
+        self.assertEqual(f.read(3000), self.data[5000:8000])
+        f.seek(-500, 2)
+        self.assertEqual(f.tell(), len(self.data) - 500)
+        self.assertEqual(f.read(), self.data[-500:])
+        self.assertEqual(f.read(), b'')
+        f.seek(10)
+        self.assertEqual(f.read(10), self.data[10:20])
+        f.seek(len(self.data) + 10)
+        self.assertEqual(f.read(10), b'')
+
+    def test_readinto(self):
+        f = self.open()
+        buffer = bytearray(2500)
+        self.assertEqual(f.readinto(buffer), 2500)
+        self.assertEqual(bytes(buffer), self.data[:2500])
+
+    def test_hls(self):
+        self.server.routes['/index.m3u8'] = self.playlist(10)
+        info = {'protocol': 'm3u8_native', 'url': self.base + '/index.m3u8'}
+        f = AdaptiveHTTPFile.from_format(info, pool=self.pool)
+        self.addCleanup(f.close)
+        self.assertEqual(f.read(), self.data)
+
+    def test_hls_live(self):
+        self.server.routes['/index.m3u8'] = self.playlist(4, ended=False)
+        info = {'protocol': 'm3u8', 'url': self.base + '/index.m3u8'}
+        f = AdaptiveHTTPFile.from_format(info, pool=self.pool)
+        self.addCleanup(f.close)
+        self.assertIsNone(f.size)
+        live = sum(len(c) for c in self.chunks[:4])
+        self.assertEqual(f.read(live), self.data[:live])
+        self.server.routes['/index.m3u8'] = self.playlist(10)
+        self.assertEqual(f.read(), self.data[live:])
+        self.assertEqual(f.size, len(self.data))
+
+    def test_fragments(self):
+        info = {
+            'protocol': 'http_dash_segments',
+            'fragment_base_url': self.base + '/',
+            'fragments': [{'path': 'seg%s.ts' % i} for i in range(10)],
+        }
+        f = AdaptiveHTTPFile.from_format(info, pool=self.pool)
+        self.addCleanup(f.close)
+        f.seek(-100, 2)
+        self.assertEqual(f.read(), self.data[-100:])
+
+    def test_youtubefs(self):
+        self.server.routes['/index.m3u8'] = self.playlist(10)
+        stream = FakeStream(self.base + '/index.m3u8', 1234)
+        stream._info = {'protocol': 'm3u8_native', 'url': stream.url}
+        fake = FakePafyModule([FakePafy('vid0', 'Live', stream)])
+        with mock.patch('fs.youtube.youtubefs.pafy', fake):
+            yt_fs = YoutubeFS('PLtest')
+            self.assertEqual(yt_fs.listdir('/'), ['Live.mp4'])
+            self.assertEqual(yt_fs.readbytes('Live.mp4'), self.data)
+            with yt_fs.openbin('Live.mp4') as f:
+                f.seek(4000)
+                self.assertEqual(f.read(100), self.data[4000:4100])
@@ -0,0 +1,201 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import sys
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs import errors
+
+from .fakepafy import FakePafyModule
+from .fakepafy import FakeStream
+from .fakepafy import make_videos
+from .rangeserver import RangeServer
+
+if sys.version_info < (3, 5):
+    raise unittest.SkipTest('asyncio front-end requires Python 3.5+')
+
+import asyncio
+
+from fs.youtube.aio import AsyncHTTPConnectionPool
+from fs.youtube.aio import AsyncSeekableHTTPFile
+from fs.youtube.aio import AsyncYoutubeFS
+
+
+class AsyncTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        self.addCleanup(self.loop.close)
+        self.data = os.urandom(64 * 1024)
+        self.server = RangeServer(self.data).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+
+class TestAsyncHTTPConnectionPool(AsyncTestCase):
+
+    def test_keep_alive(self):
+        pool = AsyncHTTPConnectionPool()
+        for start in range(0, 4096 * 4, 4096):
+            headers = {'Range': 'bytes=%s-%s' % (start, start + 4095)}
+            res = self.run_async(pool.urlopen(self.server.url, headers=headers))
+            self.assertEqual(res.status, 206)
+            self.assertEqual(self.run_async(res.read()), self.data[start:start + 4096])
+        pool.clear()
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.requests, 4)
+
+    def test_unread_body_not_reused(self):
+        pool = AsyncHTTPConnectionPool()
+        res = self.run_async(pool.urlopen(self.server.url))
+        self.run_async(res.read(10))
+        res.close()
+        res = self.run_async(pool.urlopen(self.server.url))
+        self.assertEqual(self.run_async(res.read()), self.data)
+        pool.clear()
+        self.assertEqual(self.server.connections, 2)
+
+
+class TestAsyncSeekableHTTPFile(AsyncTestCase):
+
+    def open(self, **kwargs):
+        pool = AsyncHTTPConnectionPool()
+        self.addCleanup(pool.clear)
+        f = AsyncSeekableHTTPFile(self.server.url, pool, block_size=4096, **kwargs)
+        return self.run_async(f.open())
+
+    def test_read_seek(self):
+        f = self.open()
+        self.assertEqual(self.run_async(f.read(100)), self.data[:100])
+        f.seek(10000)
+        self.assertEqual(self.run_async(f.read(5000)), self.data[10000:15000])
+        f.seek(-100, 1)
+        self.assertEqual(f.tell(), 14900)
+        self.assertEqual(self.run_async(f.read()), self.data[14900:])
+        self.assertEqual(self.run_async(f.read(10)), b'')
+        self.assertEqual(f.size, len(self.data))
+        self.assertEqual(f.seek(-100, 2), len(self.data) - 100)
+        self.assertEqual(self.run_async(f.read()), self.data[-100:])
+        self.assertRaises(ValueError, f.seek, -1)
+
+    def test_errors(self):
+        self.server.failures = 1
+        self.assertRaises(errors.RemoteConnectionError, self.open)
+        f = self.open()
+        self.server.failures = 1
+        with self.assertRaises(errors.RemoteConnectionError):
+            self.run_async(f.read(10))
+
+    def test_refresh_errors(self):
+        pool = AsyncHTTPConnectionPool()
+        self.addCleanup(pool.clear)
+
+        async def refresh(url):
+            raise ValueError('video removed')
+
+        self.server.forbidden.add('/video.mp4?sig=0')
+        f = AsyncSeekableHTTPFile(
+            self.server.url + '?sig=0', pool, refresh=refresh)
+        with self.assertRaises(errors.RemoteConnectionError):
+            self.run_async(f.open())
+
+    def test_refresh_near_expiry(self):
+        pool = AsyncHTTPConnectionPool()
+        self.addCleanup(pool.clear)
+        url = self.server.url + '?expire=%d' % (time.time() + 30)
+        urls = []
+
+        async def refresh(old):
+            # The new URL expires as soon as the old one
+            urls.append(old)
+            return url
+
+        f = AsyncSeekableHTTPFile(url, pool, block_size=4096, refresh=refresh)
+        self.run_async(f.open())
+        f.seek(20000)
+        self.assertEqual(self.run_async(f.read(10)), self.data[20000:20010])
+        self.assertEqual(urls, [url])
+
+    def test_concurrent_streams(self):
+        pool = AsyncHTTPConnectionPool(maxsize=64, per_host=64)
+        self.addCleanup(pool.clear)
+
+        starts = list(range(0, len(self.data), 1024))
+        files = [
+            AsyncSeekableHTTPFile(self.server.url, pool, block_size=4096)
+            for _ in starts
+        ]
+        self.run_async(asyncio.gather(*[f.open() for f in files]))
+        for f, start in zip(files, starts):
+            f.seek(start)
+        results = self.run_async(asyncio.gather(*[f.read(8192) for f in files]))
+        for start, result in zip(starts, results):
+            self.assertEqual(result, self.data[start:start + 8192])
+
+
+class TestAsyncYoutubeFS(AsyncTestCase):
+
+    def setUp(self):
+        super(TestAsyncYoutubeFS, self).setUp()
+        self.pafy = FakePafyModule(make_videos(self.server.url, [len(self.data)] * 3))
+        patcher = mock.patch('fs.youtube.youtubefs.pafy', self.pafy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fs(self):
+        yt_fs = self.run_async(AsyncYoutubeFS.create('PLtest', block_size=4096))
+        names = self.run_async(yt_fs.listdir('/'))
+        self.assertEqual(len(names), 3)
+        infos = self.run_async(yt_fs.scandir('/', namespaces=['details']))
+        self.assertEqual(sorted(info.name for info in infos), sorted(names))
+        info = self.run_async(yt_fs.getinfo(names[0], namespaces=['details']))
+        self.assertEqual(info.size, len(self.data))
+
+        f = self.run_async(yt_fs.openbin(names[0]))
+        f.seek(5000)
+        self.assertEqual(self.run_async(f.read(100)), self.data[5000:5100])
+        f.close()
+        self.assertEqual(self.run_async(yt_fs.readbytes(names[1])), self.data)
+
+        with self.assertRaises(errors.ResourceNotFound):
+            self.run_async(yt_fs.openbin('/missing.mp4'))
+        with self.assertRaises(errors.Unsupported):
+            self.run_async(yt_fs.openbin(names[0], 'w'))
+        self.run_async(yt_fs.close())
+
+    def test_sidecars(self):
+        yt_fs = self.run_async(AsyncYoutubeFS.create('PLtest', sidecars=['info']))
+        names = self.run_async(yt_fs.listdir('/'))
+        self.assertEqual(names[1], 'Video 0.info.json')
+        f = self.run_async(yt_fs.openbin(names[1]))
+        self.assertIn(b'"videoid": "vid0"', self.run_async(f.read()))
+        f.seek(0)
+        self.assertEqual(self.run_async(f.read(1)), b'{')
+        f.close()
+        self.run_async(yt_fs.close())
+
+    def test_url_refresh(self):
+        video = self.pafy.videos['vid0']
+        video.stream = FakeStream(self.server.url + '?sig=0', len(self.data))
+        yt_fs = self.run_async(AsyncYoutubeFS.create('PLtest', block_size=4096))
+        name = self.run_async(yt_fs.listdir('/'))[0]
+        f = self.run_async(yt_fs.openbin(name))
+        self.server.forbidden.add('/video.mp4?sig=0')
+        video.stream = FakeStream(self.server.url + '?sig=1', len(self.data))
+        f.seek(8192)
+        self.assertEqual(self.run_async(f.read(10)), self.data[8192:8202])
+        self.assertEqual(f.url, self.server.url + '?sig=1')
+        f.close()
+        self.run_async(yt_fs.close())
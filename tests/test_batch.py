@@ -0,0 +1,120 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs import errors
+from fs.youtube import YoutubeFS
+from fs.youtube.batch import BatchResolver
+from fs.youtube.batch import RateLimiter
+
+from .fakepafy import FakePafyModule
+from .fakepafy import make_videos
+
+
+class TestBatchResolver(unittest.TestCase):
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(rate=50)
+        start = time.time()
+        for _ in range(6):
+            limiter.wait()
+        self.assertGreaterEqual(time.time() - start, 0.09)
+
+    def test_unordered(self):
+        def resolve(delay):
+            time.sleep(delay)
+            return delay
+
+        resolver = BatchResolver(resolve, workers=3)
+        results = [r for _, r, _ in resolver.map([0.2, 0.1, 0.0])]
+        self.assertEqual(results, [0.0, 0.1, 0.2])
+        results = [r for _, r, _ in resolver.map([0.2, 0.1, 0.0], ordered=True)]
+        self.assertEqual(results, [0.2, 0.1, 0.0])
+
+    def test_errors(self):
+        def resolve(item):
+            if item == 2:
+                raise IOError('unavailable')
+            return item
+
+        results = list(BatchResolver(resolve).map([1, 2, 3], ordered=True))
+        self.assertEqual([r[1] for r in results], [1, None, 3])
+        self.assertIsInstance(results[1][2], IOError)
+
+
+class TestScandir(unittest.TestCase):
+
+    def setUp(self):
+        videos = make_videos('http://127.0.0.1:1/video.mp4', range(1, 21))
+        for video in videos:
+            video.delay = 0.05
+        self.pafy = FakePafyModule(videos)
+        patcher = mock.patch('fs.youtube.youtubefs.pafy', self.pafy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_concurrent(self):
+        yt_fs = YoutubeFS('PLtest', resolve_workers=10)
+        start = time.time()
+        infos = list(yt_fs.scandir('/', namespaces=['details']))
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(len(infos), 20)
+        self.assertEqual(
+            sorted(info.size for info in infos), list(range(1, 21)))
+        self.assertTrue(yt_fs.isfile(infos[0].name))
+
+    def test_listdir_order(self):
+        yt_fs = YoutubeFS('PLtest', resolve_workers=10)
+        self.assertEqual(
+            yt_fs.listdir('/'), ['Video %s.mp4' % i for i in range(20)])
+
+    def test_page(self):
+        yt_fs = YoutubeFS('PLtest')
+        names = sorted(info.name for info in yt_fs.scandir('/', page=(2, 4)))
+        self.assertEqual(names, ['Video 2.mp4', 'Video 3.mp4'])
+
+    def test_errors(self):
+        yt_fs = YoutubeFS('PLtest')
+        with self.assertRaises(errors.ResourceNotFound):
+            yt_fs.scandir('/foo')
+        name = yt_fs.listdir('/')[0]
+        with self.assertRaises(errors.DirectoryExpected):
+            yt_fs.scandir(name)
+
+
+class TestLazyPlaylist(unittest.TestCase):
+
+    def setUp(self):
+        videos = make_videos('http://127.0.0.1:1/video.mp4', range(1, 101))
+        self.pafy = FakePafyModule(videos, page_size=10)
+        self.pafy.page_delay = 0.05
+        patcher = mock.patch('fs.youtube.youtubefs.pafy', self.pafy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_construction(self):
+        yt_fs = YoutubeFS('PLtest')
+        self.assertEqual(sum(self.pafy.calls.values()), 0)
+        self.assertEqual(str(yt_fs), 'YoutubeFS: Playlist')
+        self.assertEqual(self.pafy.calls['playlist_title'], 1)
+        with self.assertRaises(ValueError):
+            YoutubeFS('12345')
+
+    def test_incremental(self):
+        yt_fs = YoutubeFS('PLtest')
+        start = time.time()
+        next(iter(yt_fs.scandir('/')))
+        self.assertLess(time.time() - start, 0.3)
+
+    def test_page_stops_fetching(self):
+        yt_fs = YoutubeFS('PLtest')
+        self.assertEqual(len(list(yt_fs.scandir('/', page=(0, 5)))), 5)
+        self.assertLessEqual(yt_fs._playlist.pages, 2)
@@ -0,0 +1,87 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.youtube import YoutubeFS
+from fs.youtube.cache import TTLCache
+from fs.youtube.cache import url_expiry
+
+from .fakepafy import SINGLE_PREFIX
+from .fakepafy import SINGLE_URL
+from .fakepafy import FakePafyModule
+from .fakepafy import make_videos
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_expiry(self):
+        cache = TTLCache(ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2, expires=time.time() - 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+
+    def test_lru(self):
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(len(cache), 2)
+
+    def test_url_expiry(self):
+        url = 'https://r1.googlevideo.com/videoplayback?expire=1571234567&id=x'
+        self.assertEqual(url_expiry(url), 1571234567)
+        self.assertIsNone(url_expiry('https://r1.googlevideo.com/videoplayback'))
+
+
+class TestMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.url = 'http://127.0.0.1:1/video.mp4?expire=%d' % (
+            time.time() + 3600)
+        self.pafy = FakePafyModule(make_videos(self.url, [100, 200, 300]))
+        patcher = mock.patch('fs.youtube.youtubefs.pafy', self.pafy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_playlist(self):
+        yt_fs = YoutubeFS('PLtest')
+        names = yt_fs.listdir('/')
+        for _ in range(3):
+            for name in names:
+                yt_fs.getinfo(name, namespaces=['details', 'mediaproxy.media'])
+        self.assertEqual(self.pafy.calls['new'], 3)
+        self.assertEqual(self.pafy.calls['get_playlist2'], 1)
+        self.assertEqual(yt_fs.getdetails(names[1]).size, 200)
+        self.assertEqual(self.pafy.videos['vid1'].stream.filesize_calls, 1)
+
+    def add_single(self):
+        video, = make_videos(self.url, [100], prefix=SINGLE_PREFIX)
+        self.pafy.videos[video.videoid] = video
+        return video
+
+    def test_single(self):
+        self.add_single()
+        yt_fs = YoutubeFS(SINGLE_URL, playlist=False)
+        name = yt_fs.listdir('/')[0]
+        yt_fs.getinfo(name, namespaces=['details', 'mediaproxy.media'])
+        self.assertEqual(self.pafy.calls['new'], 1)
+
+    def test_expired_stream_url(self):
+        self.add_single().stream.url = (
+            'http://127.0.0.1:1/?expire=%d' % (time.time() + 30))
+        yt_fs = YoutubeFS(SINGLE_URL, playlist=False)
+        name = yt_fs.listdir('/')[0]
+        yt_fs.getinfo(name, namespaces=['details'])
+        self.assertEqual(self.pafy.calls['new'], 2)
@@ -0,0 +1,147 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.youtube.chunkcache import ChunkCache
+from fs.youtube.pool import HTTPConnectionPool
+from fs.youtube.youtubefs import SeekableHTTPFile
+
+from .rangeserver import RangeServer
+
+
+class TestChunkCache(unittest.TestCase):
+
+    chunk_size = 4096
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def make_cache(self, max_size=10 * 4096):
+        return ChunkCache(self.root, max_size=max_size, chunk_size=self.chunk_size)
+
+    def test_put_get(self):
+        cache = self.make_cache()
+        chunk = os.urandom(self.chunk_size)
+        cache.put(('vid', '22'), 3, chunk)
+        cache.put(('vid', '22'), 4, b'end')
+        self.assertEqual(cache.get(('vid', '22'), 3), chunk)
+        self.assertEqual(cache.get(('vid', '22'), 4), b'end')
+        self.assertIsNone(cache.get(('vid', '22'), 0))
+        self.assertIsNone(cache.get(('vid', '18'), 3))
+        self.assertEqual(cache.size, self.chunk_size + 3)
+        self.assertEqual(cache.missing(('vid', '22'), 0, 10), 3)
+        self.assertEqual(cache.missing(('vid', '22'), 5, 10), 10)
+
+    def test_persistent(self):
+        chunk = os.urandom(self.chunk_size)
+        cache = self.make_cache()
+        cache.put(('vid', '22'), 7, chunk)
+        # Indexes are written in batches, and when flushed
+        self.assertEqual(self.make_cache().size, 0)
+        cache.flush()
+        cache = self.make_cache()
+        self.assertEqual(cache.get(('vid', '22'), 7), chunk)
+        self.assertEqual(cache.size, self.chunk_size)
+
+    def test_lru_eviction(self):
+        cache = self.make_cache(max_size=3 * self.chunk_size)
+        chunk = b'x' * self.chunk_size
+        cache.put(('a', '22'), 0, chunk)
+        cache.put(('b', '22'), 0, chunk)
+        cache.get(('a', '22'), 0)
+        cache.put(('c', '22'), 0, chunk)
+        cache.put(('c', '22'), 1, chunk)
+        self.assertIsNone(cache.get(('b', '22'), 0))
+        self.assertIsNotNone(cache.get(('a', '22'), 0))
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'b.22.data')))
+        self.assertEqual(cache.size, 3 * self.chunk_size)
+
+    def test_batched_index_writes(self):
+        cache = self.make_cache(max_size=1000 * self.chunk_size)
+        cache.save_every = 10
+        with mock.patch.object(cache, '_save', wraps=cache._save) as save:
+            for i in range(100):
+                cache.put(('vid', '22'), i, b'x')
+            self.assertEqual(save.call_count, 10)
+            cache.flush()
+            self.assertEqual(save.call_count, 10)
+            cache.put(('vid', '22'), 100, b'x')
+            cache.flush()
+            self.assertEqual(save.call_count, 11)
+
+    def test_stream_over_budget(self):
+        cache = self.make_cache(max_size=3 * self.chunk_size)
+        chunk = b'x' * self.chunk_size
+        for i in range(5):
+            cache.put(('vid', '22'), i, chunk)
+        # The chunks over the budget are dropped, not the whole stream
+        self.assertEqual(cache.size, 3 * self.chunk_size)
+        self.assertEqual(cache.missing(('vid', '22'), 0, 5), 0)
+        self.assertIsNone(cache.get(('vid', '22'), 3))
+
+    def test_integrity(self):
+        cache = self.make_cache()
+        cache.put(('vid', '22'), 0, b'x' * self.chunk_size)
+        with open(os.path.join(self.root, 'vid.22.data'), 'r+b') as f:
+            f.write(b'y')
+        self.assertIsNone(cache.get(('vid', '22'), 0))
+        self.assertEqual(cache.size, 0)
+
+    def test_seekable_file(self):
+        data = os.urandom(10 * self.chunk_size)
+        cache = self.make_cache()
+        with RangeServer(data) as server:
+            pool = HTTPConnectionPool()
+
+            def read(start, size):
+                f = SeekableHTTPFile(
+                    server.url, pool=pool, block_size=self.chunk_size,
+                    chunk_cache=cache, cache_key=('vid', '22'))
+                f.seek(start)
+                try:
+                    return f.read(size), f.requests
+                finally:
+                    f.close()
+
+            self.assertEqual(read(2 * self.chunk_size, 10),
+                             (data[2 * self.chunk_size:][:10], 1))
+            # Only the chunks around the cached one are fetched
+            self.assertEqual(read(0, len(data)), (data, 4))
+            self.assertEqual(read(0, len(data)), (data, 0))
+            pool.clear()
+
+    def test_stored_meanwhile(self):
+        data = os.urandom(4 * self.chunk_size)
+        cache = self.make_cache()
+        get = cache.get
+
+        def racing_get(key, index):
+            # Another reader stores the chunk right after the lookup
+            block = get(key, index)
+            if block is None:
+                cache.put(key, index, data[:self.chunk_size])
+            return block
+
+        with RangeServer(data) as server:
+            pool = HTTPConnectionPool()
+            f = SeekableHTTPFile(
+                server.url, pool=pool, block_size=self.chunk_size,
+                chunk_cache=cache, cache_key=('vid', '22'))
+            with mock.patch.object(cache, 'get', side_effect=racing_get):
+                self.assertEqual(f.read(10), data[:10])
+            self.assertEqual(f.requests, 0)
+            f.close()
+            pool.clear()
@@ -0,0 +1,199 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import unittest
+
+from fs.opener.parse import parse_fs_url
+from fs.opener.youtubefs import YouTubeOpener
+from fs.youtube import YoutubeFS
+from fs.youtube.extractors import Extractor
+from fs.youtube.extractors import PafyExtractor
+from fs.youtube.extractors import StaticExtractor
+from fs.youtube.extractors import Video
+from fs.youtube.extractors import YoutubeDLExtractor
+from fs.youtube.extractors import extract_playlist_id
+from fs.youtube.extractors import extract_video_id
+from fs.youtube.extractors import get_extractor
+from fs.youtube.streams import select_stream
+
+from .rangeserver import RangeServer
+
+
+def make_info(videoid, url, size):
+    return {
+        'id': videoid,
+        'title': 'Video %s' % videoid,
+        'uploader': 'media-proxy',
+        'duration': 61,
+        'view_count': 1000,
+        'tags': ['test'],
+        'categories': ['Music'],
+        'formats': [
+            {'format_id': '140', 'url': url + '?140', 'ext': 'm4a',
+             'vcodec': 'none', 'acodec': 'mp4a', 'abr': 128, 'filesize': 7},
+            {'format_id': '43', 'url': url + '?43', 'ext': 'webm',
+             'width': 640, 'height': 360, 'vcodec': 'vp8',
+             'acodec': 'vorbis', 'tbr': 1000, 'filesize': 8},
+            {'format_id': '18', 'url': url, 'ext': 'mp4', 'width': 640,
+             'height': 360, 'vcodec': 'avc1', 'acodec': 'mp4a',
+             'filesize': size},
+            {'format_id': '137', 'url': url + '?137', 'ext': 'mp4',
+             'width': 1920, 'height': 1080, 'vcodec': 'avc1',
+             'acodec': 'none', 'filesize': 9},
+        ],
+    }
+
+
+class FakeYoutubeDL(object):
+
+    instances = []
+
+    def __init__(self, options):
+        self.options = options
+        self.urls = []
+        self.instances.append(self)
+
+    def extract_info(self, url, download=True):
+        self.urls.append(url)
+        if 'list=' in url:
+            return {'title': 'Playlist', 'entries': [
+                {'_type': 'url', 'id': 'vid0', 'title': 'A'},
+                {'_type': 'url', 'id': 'vid1', 'title': 'B'},
+            ]}
+        return make_info(url.rsplit('=', 1)[-1], 'http://127.0.0.1:1/', 10)
+
+
+class FakeYoutubeDLModule(object):
+    YoutubeDL = FakeYoutubeDL
+
+
+class TestIds(unittest.TestCase):
+
+    def test_playlist_id(self):
+        self.assertEqual(extract_playlist_id('PLabc_-1'), 'PLabc_-1')
+        self.assertEqual(extract_playlist_id(
+            'https://www.youtube.com/playlist?list=PLabc'), 'PLabc')
+        self.assertIsNone(extract_playlist_id('12345'))
+
+    def test_video_id(self):
+        self.assertEqual(extract_video_id('dQw4w9WgXcQ'), 'dQw4w9WgXcQ')
+        self.assertEqual(extract_video_id(
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ'), 'dQw4w9WgXcQ')
+        self.assertRaises(ValueError, extract_video_id, 'short')
+        for url in ('youtu.be/dQw4w9WgXcQ',
+                    'https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ',
+                    'https://www.youtube.com/embed/dQw4w9WgXcQ',
+                    'https://www.youtube.com/shorts/dQw4w9WgXcQ'):
+            self.assertEqual(extract_video_id(url), 'dQw4w9WgXcQ')
+        # Only IDs and the URLs of YouTube videos are accepted
+        for url in ('https://example.com/dQw4w9WgXcQ',
+                    'https://example.com/watch?v=dQw4w9WgXcQ',
+                    'https://www.youtube.com/watch?v=dQw4w9WgXc',
+                    'https://www.youtube.com/user/dQw4w9WgXcQ',
+                    'https://youtu.be/dQw4w9WgXcQ/extra',
+                    'dQw4w9WgXcQ extra'):
+            self.assertRaises(ValueError, extract_video_id, url)
+
+    def test_no_import(self):
+        extractor = PafyExtractor()
+        self.assertEqual(extractor.playlist_id('PLtest'), 'PLtest')
+        self.assertEqual(
+            extractor.video_id('https://youtu.be/dQw4w9WgXcQ'), 'dQw4w9WgXcQ')
+        YoutubeFS('PLtest', extractor=extractor)
+        self.assertIn('not loaded', repr(extractor.module))
+
+    def test_abstract(self):
+        self.assertRaises(TypeError, Extractor)
+
+
+class TestVideo(unittest.TestCase):
+
+    def test_streams(self):
+        video = Video(make_info('vid0', 'http://127.0.0.1:1/', 10))
+        self.assertEqual(video.duration, '00:01:01')
+        self.assertEqual(video.category, 'Music')
+        self.assertEqual(select_stream(video, 'best').itag, '18')
+        self.assertEqual(select_stream(video, 'worst').itag, '43')
+        video = Video(make_info('vid0', 'http://127.0.0.1:1/', 10), 'mp4')
+        self.assertEqual(select_stream(video, 'worst').itag, '18')
+        self.assertEqual(select_stream(video, 'bestaudio').itag, '140')
+        self.assertEqual(select_stream(video, 'bestvideo').itag, '137')
+        self.assertEqual(select_stream(video, '137').mediatype, 'video')
+        self.assertEqual(video.getbest().quality, '640x360')
+        self.assertEqual(video.getbest().get_filesize(), 10)
+
+
+class TestYoutubeDLExtractor(unittest.TestCase):
+
+    def setUp(self):
+        del FakeYoutubeDL.instances[:]
+        self.extractor = YoutubeDLExtractor(extension='mp4')
+        self.extractor.module = FakeYoutubeDLModule
+
+    def test_flat_playlist(self):
+        playlist = self.extractor.playlist('PLtest')
+        self.assertEqual([e.videoid for e in playlist], ['vid0', 'vid1'])
+        ydl, = FakeYoutubeDL.instances
+        self.assertEqual(ydl.options['extract_flat'], 'in_playlist')
+        self.assertEqual(
+            ydl.urls, ['https://www.youtube.com/playlist?list=PLtest'])
+
+    def test_reuse(self):
+        for _ in range(3):
+            self.extractor.video('dQw4w9WgXcQ')
+        ydl, = FakeYoutubeDL.instances
+        self.assertNotIn('extract_flat', ydl.options)
+        self.assertEqual(len(ydl.urls), 3)
+
+    def test_listdir_without_extraction(self):
+        yt_fs = YoutubeFS('PLtest', extractor=self.extractor)
+        self.assertEqual(yt_fs.listdir('/'), ['A.mp4', 'B.mp4'])
+        self.assertEqual(len(FakeYoutubeDL.instances), 1)
+
+    def test_unknown_extension(self):
+        # Without an extension, names are only known from the streams
+        self.extractor.extension = None
+        yt_fs = YoutubeFS('PLtest', extractor=self.extractor)
+        self.assertEqual(yt_fs.listdir('/'), ['Video vid0.mp4',
+                                              'Video vid1.mp4'])
+        self.assertEqual(len(FakeYoutubeDL.instances), 2)
+
+    def test_names(self):
+        self.assertRaises(ValueError, get_extractor, 'nope')
+        self.assertRaises(ValueError, YoutubeFS, 'PLtest', extractor='nope')
+        url = 'youtube://PLtest?extractor=yt-dlp'
+        yt_fs = YouTubeOpener.open_fs(url, parse_fs_url(url), False, False, '.')
+        self.assertEqual(yt_fs.extractor.module._name, 'yt_dlp')
+
+
+class TestStaticExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(5000)
+        self.server = RangeServer(self.data).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.extractor = StaticExtractor([
+            make_info('vid%s' % i, self.server.url, len(self.data))
+            for i in range(3)
+        ], extension='mp4')
+
+    def test_listing(self):
+        yt_fs = YoutubeFS('PLtest', extractor=self.extractor)
+        names = yt_fs.listdir('/')
+        self.assertEqual(names, ['Video vid0.mp4', 'Video vid1.mp4',
+                                 'Video vid2.mp4'])
+        self.assertEqual(self.extractor.calls, {'playlist': 1, 'video': 0})
+        info = yt_fs.getinfo(names[1], ['details', 'mediaproxy.media'])
+        self.assertEqual(info.size, len(self.data))
+        self.assertEqual(info.get('mediaproxy.media', 'author'), 'media-proxy')
+        self.assertEqual(self.extractor.calls['video'], 1)
+        self.assertEqual(yt_fs.readbytes(names[0]), self.data)
+
+    def test_audio(self):
+        yt_fs = YoutubeFS(
+            'PLtest', extractor=self.extractor, quality='bestaudio')
+        # The extension depends on the stream: videos are extracted
+        self.assertEqual(yt_fs.listdir('/')[0], 'Video vid0.m4a')
+        self.assertEqual(self.extractor.calls['video'], 3)
@@ -0,0 +1,283 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import io
+import os
+import threading
+import time
+import unittest
+
+from fs import errors
+from fs.youtube.pool import HTTPConnectionPool
+from fs.youtube.prefetch import Prefetcher
+from fs.youtube.prefetch import PrefetchStream
+from fs.youtube.youtubefs import SeekableHTTPFile
+
+from .rangeserver import RangeServer
+
+
+class TestSeekableHTTPFile(unittest.TestCase):
+
+    block_size = 1024
+
+    def setUp(self):
+        self.data = os.urandom(10 * self.block_size + 100)
+        self.server = RangeServer(self.data).__enter__()
+        self.pool = HTTPConnectionPool()
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.__exit__()
+
+    def open(self, **kwargs):
+        kwargs.setdefault('block_size', self.block_size)
+        return SeekableHTTPFile(self.server.url, pool=self.pool, **kwargs)
+
+    def test_sequential_readahead(self):
+        f = self.open(readahead=4)
+        data = b''
+        while True:
+            chunk = f.read(100)
+            if not chunk:
+                break
+            data += chunk
+        self.assertEqual(data, self.data)
+        self.assertEqual(f.tell(), len(self.data))
+        # blocks 0, 1-2, 3-6, 7-10
+        self.assertEqual(f.requests, 4)
+
+    def test_seek_back_from_cache(self):
+        f = self.open()
+        self.assertEqual(f.read(100), self.data[:100])
+        requests = f.requests
+        f.seek(10)
+        self.assertEqual(f.read(90), self.data[10:100])
+        f.seek(-50, 1)
+        self.assertEqual(f.read(50), self.data[50:100])
+        self.assertEqual(f.requests, requests)
+
+    def test_random_access_window(self):
+        f = self.open(readahead=4)
+        f.seek(5 * self.block_size)
+        self.assertEqual(f.read(10), self.data[5 * self.block_size:][:10])
+        f.seek(2 * self.block_size)
+        self.assertEqual(f.read(10), self.data[2 * self.block_size:][:10])
+        self.assertEqual(f._window, 1)
+        self.assertEqual(len(f._blocks), 2)
+
+    def test_read_all(self):
+        f = self.open()
+        f.seek(500)
+        self.assertEqual(f.read(), self.data[500:])
+        self.assertEqual(f.read(), b'')
+        self.assertEqual(f.read(10), b'')
+
+    def test_read_across_blocks(self):
+        f = self.open()
+        f.seek(self.block_size - 10)
+        self.assertEqual(f.read(20), self.data[self.block_size - 10:][:20])
+
+    def test_cache_bounded(self):
+        f = self.open(readahead=2, cache_blocks=3)
+        f.read()
+        self.assertEqual(len(f._blocks), 3)
+
+    def test_prefetch(self):
+        f = self.open(prefetch=3)
+        self.assertEqual(f.read(3000), self.data[:3000])
+        f.seek(8 * self.block_size + 5)
+        self.assertEqual(f.read(), self.data[8 * self.block_size + 5:])
+        f.seek(10)
+        self.assertEqual(f.read(10), self.data[10:20])
+        f.close()
+        self.assertIsNone(f._prefetcher._thread)
+
+    def test_close_waits_for_prefetch(self):
+        with RangeServer(self.data, latency=0.2) as server:
+            f = SeekableHTTPFile(server.url, pool=self.pool,
+                                 block_size=self.block_size, prefetch=3)
+            self.assertEqual(f.read(10), self.data[:10])
+            thread = f._prefetcher._thread
+            f.close()
+            # Fetching ahead is done before the pool can be cleared
+            self.assertFalse(thread.is_alive())
+
+    def test_readinto_direct(self):
+        f = self.open()
+        buffer = bytearray(3 * self.block_size)
+        self.assertEqual(f.readinto(buffer), len(buffer))
+        self.assertEqual(bytes(buffer), self.data[:len(buffer)])
+        self.assertEqual(f.requests, 1)
+        self.assertEqual(len(f._blocks), 0)
+        f.seek(9 * self.block_size)
+        self.assertEqual(f.readinto(buffer), self.block_size + 100)
+        self.assertEqual(bytes(buffer[:self.block_size + 100]),
+                         self.data[9 * self.block_size:])
+        self.assertEqual(f.readinto(buffer), 0)
+
+    def test_readinto_cached(self):
+        f = self.open()
+        f.read(10)
+        requests = f.requests
+        buffer = bytearray(100)
+        self.assertEqual(f.readinto(memoryview(buffer)), 100)
+        self.assertEqual(bytes(buffer), self.data[10:110])
+        self.assertEqual(f.requests, requests)
+
+    def test_readinto1(self):
+        f = self.open()
+        f.seek(self.block_size - 10)
+        buffer = bytearray(100)
+        self.assertEqual(f.readinto1(buffer), 10)
+        self.assertEqual(f.readinto1(buffer), 100)
+        self.assertEqual(bytes(buffer), self.data[self.block_size:][:100])
+
+    def test_buffered_reader(self):
+        f = io.BufferedReader(self.open(), 4 * self.block_size)
+        self.assertEqual(f.read(), self.data)
+        f.seek(100)
+        self.assertEqual(f.read(50), self.data[100:150])
+
+    def test_size(self):
+        f = self.open()
+        self.assertEqual(f.size, len(self.data))
+        self.assertEqual(f.seek(-100, 2), len(self.data) - 100)
+        self.assertEqual(f.read(1000), self.data[-100:])
+        requests = f.requests
+        f.seek(50, 2)
+        self.assertEqual(f.read(10), b'')
+        self.assertEqual(f.readinto(bytearray(10)), 0)
+        self.assertEqual(f.requests, requests)
+        self.assertRaises(ValueError, f.seek, -1)
+
+    def test_size_from_content_range(self):
+        f = self.open()
+        # As if the HEAD response had no Content-Length
+        f.size = f._eof = None
+        f.seek(10 * self.block_size)
+        self.assertEqual(f.read(), self.data[10 * self.block_size:])
+        self.assertEqual(f.size, len(self.data))
+
+    def test_probe_end(self):
+        f = self.open(readahead=4)
+        f.seek(-8, 2)
+        self.assertEqual(f.read(8), self.data[-8:])
+        f.seek(0)
+        self.assertEqual(f.read(8), self.data[:8])
+        self.assertEqual(f.requests, 2)
+
+    def test_errors_raised(self):
+        f = self.open()
+        self.server.failures = 1
+        self.assertRaises(errors.RemoteConnectionError, f.read, 10)
+        self.assertEqual(f.tell(), 0)
+        self.assertEqual(f.read(10), self.data[:10])
+        self.server.failures = 1
+        f.seek(5 * self.block_size)
+        buffer = bytearray(2 * self.block_size)
+        self.assertRaises(errors.RemoteConnectionError, f.readinto, buffer)
+
+    def test_refresh_on_forbidden(self):
+        paths = ['/video.mp4?expire=%d&sig=%s' % (time.time() + 3600, i)
+                 for i in range(2)]
+        urls = [self.server.url.replace('/video.mp4', p) for p in paths]
+        f = SeekableHTTPFile(urls[0], pool=self.pool, block_size=self.block_size,
+                             refresh=lambda url: urls[1])
+        self.assertEqual(f.read(10), self.data[:10])
+        self.server.forbidden.add(paths[0])
+        f.seek(5 * self.block_size)
+        self.assertEqual(f.read(10), self.data[5 * self.block_size:][:10])
+        self.assertEqual(f.url, urls[1])
+
+    def test_refresh_before_expiry(self):
+        stale = '/video.mp4?expire=%d' % (time.time() + 30)
+        fresh = self.server.url.replace(
+            '/video.mp4', '/video.mp4?expire=%d' % (time.time() + 3600))
+        f = SeekableHTTPFile(self.server.url.replace('/video.mp4', stale),
+                             pool=self.pool, block_size=self.block_size,
+                             refresh=lambda url: fresh, refresh_margin=60)
+        self.assertEqual(f.read(10), self.data[:10])
+        self.assertEqual(f.url, fresh)
+        self.assertEqual(self.server.paths[stale], 0)
+
+    def test_refresh_failure(self):
+        url = '%s?sig=0' % self.server.url
+        self.server.forbidden.add('/video.mp4?sig=0')
+
+        def refresh(url):
+            raise IOError('video removed')
+
+        with self.assertRaises(errors.RemoteConnectionError):
+            SeekableHTTPFile(url, pool=self.pool, refresh=refresh)
+
+
+class TestPrefetcher(unittest.TestCase):
+
+    def test_backpressure(self):
+        fetched = []
+
+        def fetch(index):
+            fetched.append(index)
+            return b'x' if index < 100 else b''
+
+        prefetcher = Prefetcher(fetch, 2)
+        self.assertEqual(prefetcher.get(0), b'x')
+        time.sleep(0.1)
+        # One block handed over, two queued and one waiting to be queued
+        self.assertEqual(fetched, [0, 1, 2, 3])
+        prefetcher.cancel()
+
+    def test_seek_restarts(self):
+        prefetcher = Prefetcher(lambda index: index + 1, 2)
+        self.assertEqual(prefetcher.get(0), 1)
+        self.assertEqual(prefetcher.get(1), 2)
+        prefetcher.seek(2)
+        self.assertIsNotNone(prefetcher._thread)
+        prefetcher.seek(10)
+        self.assertIsNone(prefetcher._thread)
+        self.assertEqual(prefetcher.get(10), 11)
+        prefetcher.cancel()
+
+    def test_error(self):
+        def fetch(index):
+            raise IOError('boom')
+
+        prefetcher = Prefetcher(fetch, 2)
+        with self.assertRaises(IOError):
+            prefetcher.get(0)
+        self.assertIsNone(prefetcher._thread)
+
+    def test_stream(self):
+        data = os.urandom(10000)
+        stream = PrefetchStream(io.BytesIO(data), 1024, 2)
+        self.assertEqual(stream.read(100), data[:100])
+        self.assertEqual(stream.read(2000), data[100:2100])
+        self.assertEqual(stream.read(), data[2100:])
+        self.assertEqual(stream.read(10), b'')
+        stream.close()
+
+    def test_close_waits_for_reads(self):
+        reading = threading.Event()
+        active = []
+
+        class SlowFile(io.BytesIO):
+
+            def read(self, size=-1):
+                active.append(size)
+                reading.set()
+                time.sleep(0.2)
+                data = super(SlowFile, self).read(size)
+                active.pop()
+                return data
+
+            def close(self):
+                if active:
+                    raise AssertionError('closed during a read')
+                super(SlowFile, self).close()
+
+        stream = PrefetchStream(SlowFile(os.urandom(10000)), 1024, 2)
+        stream._prefetcher.start(0)
+        reading.wait()
+        stream.close()
+        self.assertIsNone(stream._prefetcher._thread)
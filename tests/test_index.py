@@ -0,0 +1,242 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.youtube import YoutubeFS
+from fs.youtube.index import MetadataIndex
+
+from .fakepafy import FakePafyModule
+from .fakepafy import make_videos
+from .rangeserver import RangeServer
+
+
+class TestMetadataIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'index.db')
+
+    def test_wal(self):
+        index = MetadataIndex(self.path)
+        self.addCleanup(index.close)
+        mode = index._connect().execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_shared(self):
+        writer = MetadataIndex(self.path)
+        reader = MetadataIndex(self.path)
+        self.addCleanup(writer.close)
+        self.addCleanup(reader.close)
+        self.assertIsNone(reader.get_listing('PLtest', 'best'))
+        writer.set_listing('PLtest', 'best', ['vid0', 'vid1'])
+        writer.set_video('vid0', 'best', 'Video 0.mp4', 10, {'a': 1},
+                         time.time() + 60)
+        writer.set_video('vid1', 'best', 'Video 1.mp4', None, {},
+                         time.time() - 1)
+        self.assertEqual(reader.get_listing('PLtest', 'best'), ['vid0', 'vid1'])
+        self.assertIsNone(reader.get_listing('PLtest', 'best', max_age=0))
+        self.assertIsNone(reader.get_listing('PLtest', 'worst'))
+        self.assertEqual(reader.get_video('vid0', 'best'), {
+            'name': 'Video 0.mp4', 'size': 10, 'media': {'a': 1}})
+        self.assertIsNone(reader.get_video('vid1', 'best'))
+        self.assertEqual(reader.get_names(['vid0', 'vid1', 'vid2'], 'best'), {
+            'vid0': 'Video 0.mp4', 'vid1': 'Video 1.mp4'})
+        reader.purge()
+        self.assertEqual(writer.get_names(['vid1'], 'best'), {})
+
+    def test_many_names(self):
+        index = MetadataIndex(self.path)
+        self.addCleanup(index.close)
+        refs = ['vid%d' % i for i in range(2000)]
+        for ref in refs[::2]:
+            index.set_video(ref, 'best', ref + '.mp4', None, {}, 0)
+        names = index.get_names(refs, 'best')
+        self.assertEqual(len(names), 1000)
+        self.assertEqual(names['vid1998'], 'vid1998.mp4')
+        self.assertEqual(index.get_updated('PLtest', 'best'), None)
+        index.set_listing('PLtest', 'best', refs)
+        self.assertIsNotNone(index.get_updated('PLtest', 'best'))
+
+    def test_streams(self):
+        index = MetadataIndex(self.path)
+        self.addCleanup(index.close)
+        index.set_stream('vid0', 'best', 'vid0', '22', 'http://cdn/0', 10,
+                         time.time() + 60)
+        index.set_stream('vid1', 'best', 'vid1', '22', 'http://cdn/1', None,
+                         time.time() - 1)
+        self.assertEqual(index.get_stream('vid0', 'best'), {
+            'videoid': 'vid0', 'itag': '22', 'url': 'http://cdn/0',
+            'size': 10})
+        self.assertIsNone(index.get_stream('vid0', 'worst'))
+        self.assertIsNone(index.get_stream('vid1', 'best'))
+
+    def test_fork(self):
+        index = MetadataIndex(self.path)
+        self.addCleanup(index.close)
+        conn = index._connect()
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            child = index._connect()
+            self.assertIsNot(child, conn)
+            self.assertIs(index._connect(), child)
+            child.close()
+
+
+class TestYoutubeFSIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'index.db')
+        self.pafy = FakePafyModule(
+            make_videos('http://127.0.0.1:1/', [10, 20, 30]))
+        patcher = mock.patch('fs.youtube.youtubefs.pafy', self.pafy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_fs(self, **kwargs):
+        yt_fs = YoutubeFS('PLtest', index_path=self.path, **kwargs)
+        self.addCleanup(yt_fs.close)
+        return yt_fs
+
+    def test_persisted(self):
+        yt_fs = self.open_fs()
+        names = yt_fs.listdir('/')
+        for name in names:
+            yt_fs.getinfo(name, namespaces=['details', 'mediaproxy.media'])
+        self.pafy.calls.clear()
+
+        # A new filesystem knows the paths without listing the root
+        other = self.open_fs()
+        info = other.getinfo(
+            'Video 1.mp4', namespaces=['details', 'mediaproxy.media'])
+        self.assertEqual(info.size, 20)
+        self.assertEqual(info.get('mediaproxy.media', 'videoid'), 'vid1')
+        self.assertEqual(other.listdir('/'), names)
+        self.assertEqual(
+            [i.size for i in other.scandir('/', namespaces=['details'])],
+            [10, 20, 30])
+        self.assertEqual(self.pafy.calls['new'], 0)
+        self.assertEqual(self.pafy.calls['get_playlist2'], 0)
+
+    def test_missing_paths(self):
+        self.open_fs().listdir('/')
+        other = self.open_fs()
+        index = other._index
+        with mock.patch.object(index, 'get_names', wraps=index.get_names):
+            for _ in range(5):
+                self.assertFalse(other.exists('Missing.mp4'))
+            # The listing has not changed: it is not read again
+            self.assertEqual(index.get_names.call_count, 0)
+            with mock.patch('time.time', return_value=time.time() + 1):
+                self.open_fs(playlist_ttl=0).listdir('/')
+            self.assertFalse(other.exists('Missing.mp4'))
+            self.assertEqual(index.get_names.call_count, 1)
+
+    def test_lazy_fields(self):
+        counts = []
+
+        class Video(type(self.pafy.videos['vid1'])):
+
+            @property
+            def description(self):
+                counts.append(self.videoid)
+                return 'A video'
+
+        old = self.pafy.videos['vid1']
+        self.pafy.videos['vid1'] = Video('vid1', old.title, old.stream)
+        yt_fs = self.open_fs()
+        yt_fs.listdir('/')
+        self.assertEqual(yt_fs.getsize('Video 1.mp4'), 20)
+        # Storing the video in the index read no field costing a request
+        self.assertEqual(counts, [])
+        self.pafy.calls.clear()
+
+        other = self.open_fs()
+        info = other.getinfo('Video 1.mp4', ['details', 'mediaproxy.media'])
+        self.assertEqual(info.size, 20)
+        self.assertEqual(info.get('mediaproxy.media', 'author'), 'media-proxy')
+        self.assertEqual(self.pafy.calls['new'], 0)
+        # Fields missing from the index resolve the video when read
+        self.assertEqual(
+            info.get('mediaproxy.media', 'description'), 'A video')
+        self.assertEqual(self.pafy.calls['new'], 1)
+        self.assertEqual(counts, ['vid1'])
+
+    def test_incremental_refresh(self):
+        self.open_fs(playlist_ttl=60).listdir('/')
+        self.pafy.calls.clear()
+        videos = make_videos('http://127.0.0.1:1/', [10, 20, 30, 40])
+        self.pafy.videos[videos[3].videoid] = videos[3]
+
+        # The stale listing is fetched again, but only the new video
+        # is extracted
+        with mock.patch('time.time', return_value=time.time() + 120):
+            other = self.open_fs(playlist_ttl=60)
+            self.assertEqual(other.listdir('/'), [
+                'Video 0.mp4', 'Video 1.mp4', 'Video 2.mp4', 'Video 3.mp4'])
+        self.assertEqual(self.pafy.calls['get_playlist2'], 1)
+        self.assertEqual(self.pafy.calls['new'], 1)
+
+    def test_stale_videos(self):
+        self.open_fs(metadata_ttl=0, playlist_ttl=0).listdir('/')
+        self.pafy.calls.clear()
+        other = self.open_fs(metadata_ttl=0, playlist_ttl=0)
+        self.assertEqual(len(other.listdir('/')), 3)
+        self.assertEqual(self.pafy.calls['get_playlist2'], 1)
+        self.assertEqual(self.pafy.calls['new'], 3)
+
+
+class TestSharedWorkers(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'index.db')
+        self.data = os.urandom(5000)
+        self.server = RangeServer(self.data).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.pafy = FakePafyModule(
+            make_videos(self.server.url, [len(self.data)] * 2))
+        patcher = mock.patch('fs.youtube.youtubefs.pafy', self.pafy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_fs(self, **kwargs):
+        yt_fs = YoutubeFS('PLtest', index_path=self.path, **kwargs)
+        self.addCleanup(yt_fs.close)
+        return yt_fs
+
+    def test_resolved_by_another_worker(self):
+        # Both workers start before anything is listed
+        first, second = self.open_fs(), self.open_fs()
+        for name in first.listdir('/'):
+            first.getinfo(name, namespaces=['details'])
+        self.pafy.calls.clear()
+
+        self.assertEqual(second.readbytes('Video 1.mp4'), self.data)
+        with second.openbin('Video 0.mp4') as f:
+            f.seek(100)
+            self.assertEqual(f.read(10), self.data[100:110])
+        self.assertEqual(self.pafy.calls['new'], 0)
+        self.assertEqual(self.pafy.calls['get_playlist2'], 0)
+        self.assertEqual(second.metrics.counter('index_stream_hits'), 2)
+
+    def test_expired_stream(self):
+        first = self.open_fs(metadata_ttl=0)
+        first.listdir('/')
+        self.pafy.calls.clear()
+        second = self.open_fs(metadata_ttl=0)
+        self.assertEqual(second.readbytes('Video 0.mp4'), self.data)
+        self.assertEqual(self.pafy.calls['new'], 1)
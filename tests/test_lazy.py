@@ -0,0 +1,116 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import copy
+import json
+import pickle
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.youtube import YoutubeFS
+from fs.youtube.lazy import LazyDict
+from fs.youtube.lazy import LazyModule
+
+from .bench_import import measure
+from .fakepafy import FakePafy
+from .fakepafy import FakePafyModule
+from .fakepafy import make_videos
+
+
+class TestLazyModule(unittest.TestCase):
+
+    def test_lazy(self):
+        module = LazyModule('json')
+        self.assertIn('not loaded', repr(module))
+        self.assertIs(module.dumps, json.dumps)
+        self.assertIn('(loaded)', repr(module))
+        with self.assertRaises(AttributeError):
+            module.missing
+
+    def test_missing_module(self):
+        module = LazyModule('fs.youtube.no_such_module')
+        with self.assertRaises(ImportError):
+            module.anything
+
+    def test_imports(self):
+        for statement in ('import fs.youtube', 'import fs.opener.youtubefs'):
+            loaded = measure(statement)['loaded']
+            self.assertNotIn('pafy', loaded, statement)
+            self.assertNotIn('youtube_dl', loaded, statement)
+
+
+class TestLazyDict(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def getter(key):
+            self.calls.append(key)
+            return key.upper()
+
+        self.lazy = LazyDict(
+            {key: lambda key=key: getter(key) for key in 'ab'}, {'c': 'C'})
+
+    def test_lazy(self):
+        self.assertEqual(len(self.lazy), 3)
+        self.assertIn('a', self.lazy)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.lazy['a'], 'A')
+        self.assertEqual(self.lazy.get('a'), 'A')
+        self.assertEqual(self.lazy.get('d', 'D'), 'D')
+        self.assertEqual(self.calls, ['a'])
+
+    def test_all_values(self):
+        for dump in (json.dumps, pickle.dumps, copy.deepcopy):
+            self.assertTrue(dump(self.lazy))
+        self.assertEqual(json.loads(json.dumps(self.lazy)),
+                         {'a': 'A', 'b': 'B', 'c': 'C'})
+        self.assertEqual(self.lazy, {'a': 'A', 'b': 'B', 'c': 'C'})
+        self.assertEqual(sorted(self.calls), ['a', 'b'])
+
+
+class CountingPafy(FakePafy):
+
+    description_calls = 0
+
+    @property
+    def description(self):
+        # pafy fetches the description on first access
+        self.description_calls += 1
+        return 'A video'
+
+
+class TestLazyInfo(unittest.TestCase):
+
+    def setUp(self):
+        videos = make_videos('http://127.0.0.1:1/', [100, 200])
+        videos[0] = CountingPafy('vid0', 'Video 0', videos[0].stream)
+        # Sizes from the format metadata, as youtube-dl streams have
+        videos[1].stream._info = {'filesize': 200}
+        self.videos = videos
+        self.fake = FakePafyModule(videos)
+        patcher = mock.patch('fs.youtube.youtubefs.pafy', self.fake)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fs = YoutubeFS('PLtest')
+        self.fs.listdir('/')
+
+    def test_media_fields(self):
+        info = self.fs.getinfo('Video 0.mp4', ['mediaproxy.media'])
+        self.assertEqual(info.get('mediaproxy.media', 'author'), 'media-proxy')
+        self.assertEqual(self.videos[0].description_calls, 0)
+        self.assertEqual(
+            info.get('mediaproxy.media', 'description'), 'A video')
+        self.assertEqual(self.videos[0].description_calls, 1)
+
+    def test_size_from_format(self):
+        info = self.fs.getinfo('Video 1.mp4', ['details'])
+        self.assertEqual(info.size, 200)
+        self.assertEqual(self.videos[1].stream.filesize_calls, 0)
+        self.assertEqual(self.fs.getinfo('Video 0.mp4', ['details']).size, 100)
+        self.assertEqual(self.videos[0].stream.filesize_calls, 1)
@@ -0,0 +1,128 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import socket
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.youtube import YoutubeFS
+from fs.youtube.metrics import Metrics
+from fs.youtube.metrics import NullMetrics
+from fs.youtube.metrics import StatsdMetrics
+from fs.youtube.pool import HTTPConnectionPool
+from fs.youtube.segmented import SegmentedDownload
+from fs.youtube.youtubefs import SeekableHTTPFile
+
+from .fakepafy import FakePafyModule
+from .fakepafy import make_videos
+from .rangeserver import RangeServer
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_counters(self):
+        metrics = Metrics()
+        metrics.incr('hits')
+        metrics.incr('hits', 2)
+        self.assertEqual(metrics.counter('hits'), 3)
+        self.assertEqual(metrics.counter('misses'), 0)
+
+    def test_histogram(self):
+        metrics = Metrics(buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.5, 0.7, 5):
+            metrics.observe('latency', seconds)
+        with metrics.timer('latency'):
+            pass
+        histogram = metrics.histogram('latency')
+        self.assertEqual(histogram['buckets'], [2, 2, 1])
+        self.assertEqual(histogram['count'], 5)
+        self.assertGreaterEqual(histogram['sum'], 6.25)
+
+    def test_custom_backend(self):
+        observed = []
+
+        class Backend(NullMetrics):
+
+            def observe(self, name, seconds):
+                observed.append(name)
+
+        with Backend().timer('latency'):
+            pass
+        self.assertEqual(observed, ['latency'])
+
+    def test_prometheus(self):
+        metrics = Metrics(prefix='yt', buckets=(0.1, 1.0))
+        metrics.incr('http_bytes', 42)
+        metrics.observe('extraction_seconds', 0.5)
+        text = metrics.to_prometheus()
+        self.assertIn('# TYPE yt_http_bytes_total counter\nyt_http_bytes_total 42\n', text)
+        self.assertIn('# TYPE yt_extraction_seconds histogram\n', text)
+        self.assertIn('yt_extraction_seconds_bucket{le="0.1"} 0\n', text)
+        self.assertIn('yt_extraction_seconds_bucket{le="1"} 1\n', text)
+        self.assertIn('yt_extraction_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn('yt_extraction_seconds_count 1\n', text)
+
+    def test_statsd(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        self.addCleanup(server.close)
+        metrics = StatsdMetrics(port=server.getsockname()[1], prefix='yt')
+        metrics.incr('http_bytes', 42)
+        metrics.observe('extraction_seconds', 0.25)
+        self.assertEqual(server.recv(512), b'yt.http_bytes:42|c')
+        self.assertEqual(server.recv(512), b'yt.extraction_seconds:250|ms')
+        self.assertEqual(metrics.counter('http_bytes'), 42)
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(64 * 1024)
+        self.server = RangeServer(self.data).__enter__()
+        self.metrics = Metrics()
+        self.pool = HTTPConnectionPool(metrics=self.metrics)
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.__exit__(None, None, None)
+
+    def test_http(self):
+        f = SeekableHTTPFile(self.server.url, pool=self.pool, block_size=4096)
+        f.read(4096)
+        f.seek(0)
+        f.read(4096)
+        self.assertEqual(self.metrics.counter('http_bytes'), 4096)
+        self.assertEqual(self.metrics.counter('http_connections_opened'), 1)
+        self.assertEqual(self.metrics.counter('http_connections_reused'), 1)
+        self.assertEqual(self.metrics.histogram('http_request_seconds')['count'], 2)
+        self.assertEqual(self.metrics.counter('block_cache_misses'), 1)
+        self.assertEqual(self.metrics.counter('block_cache_hits'), 1)
+
+    def test_segment_retries(self):
+        self.server.failures = 2
+        download = SegmentedDownload(
+            self.server.url, len(self.data), self.pool,
+            segments=1, segment_size=len(self.data))
+        data = bytearray(len(self.data))
+        download.readinto(data)
+        self.assertEqual(bytes(data), self.data)
+        self.assertEqual(self.metrics.counter('segment_retries'), 2)
+
+    def test_extraction(self):
+        fake = FakePafyModule(make_videos(self.server.url, [len(self.data)] * 3))
+        with mock.patch('fs.youtube.youtubefs.pafy', fake):
+            yt_fs = YoutubeFS('PLtest', metrics=self.metrics)
+            names = yt_fs.listdir('/')
+            for name in names:
+                yt_fs.getinfo(name, namespaces=['details'])
+        self.assertEqual(self.metrics.histogram('extraction_seconds')['count'], 3)
+        self.assertEqual(self.metrics.counter('metadata_cache_misses'), 3)
+        self.assertEqual(self.metrics.counter('metadata_cache_hits'), 3)
+        self.assertIs(yt_fs.metrics, self.metrics)
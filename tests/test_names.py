@@ -0,0 +1,86 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.youtube import YoutubeFS
+from fs.youtube.names import NameIndex
+
+from .fakepafy import FakePafy
+from .fakepafy import FakePafyModule
+from .fakepafy import FakeStream
+
+
+class TestNameIndex(unittest.TestCase):
+
+    def test_sanitize(self):
+        names = NameIndex('<>\\|')
+        self.assertEqual(names.sanitize('a<b>c\\d|e.mp4'), 'abcde.mp4')
+        self.assertEqual(names.add('vid0', 'a|b.mp4'), 'ab.mp4')
+        self.assertEqual(names.get('/ab.mp4'), 'vid0')
+        self.assertEqual(names.path('vid0'), '/ab.mp4')
+        self.assertIn('/ab.mp4', names)
+        self.assertNotIn('/a|b.mp4', names)
+
+    def test_duplicates(self):
+        names = NameIndex('')
+        self.assertEqual(names.add('vid0', 'Title.mp4'), 'Title.mp4')
+        self.assertEqual(names.add('vid1', 'Title.mp4'), 'Title (2).mp4')
+        self.assertEqual(names.add('vid2', 'Title.mp4'), 'Title (3).mp4')
+        # Registering a video again keeps its name
+        self.assertEqual(names.add('vid1', 'Title.mp4'), 'Title (2).mp4')
+        self.assertEqual(len(names), 3)
+
+    def test_renamed(self):
+        names = NameIndex('')
+        names.add('vid0', 'Old.mp4')
+        self.assertEqual(names.add('vid0', 'New.mp4'), 'New.mp4')
+        self.assertIsNone(names.get('/Old.mp4'))
+        self.assertEqual(names.add('vid1', 'Old.mp4'), 'Old.mp4')
+
+    def test_normalized(self):
+        names = NameIndex('')
+        name = names.add('vid0', 'Artist // Song.mp4')
+        self.assertEqual(name, 'Artist / Song.mp4')
+        self.assertEqual(names.get('/Artist / Song.mp4'), 'vid0')
+
+
+class TestDuplicateTitles(unittest.TestCase):
+
+    def setUp(self):
+        url = 'http://127.0.0.1:1/'
+        videos = [
+            FakePafy('vid%s' % i, title, FakeStream(url, i + 1))
+            for i, title in enumerate(['Song', 'Other', 'Song', 'Song'])
+        ]
+        videos[0].delay = 0.2
+        self.pafy = FakePafyModule(videos)
+        patcher = mock.patch('fs.youtube.youtubefs.pafy', self.pafy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_deterministic(self):
+        expected = ['Song.mp4', 'Other.mp4', 'Song (2).mp4', 'Song (3).mp4']
+        yt_fs = YoutubeFS('PLtest')
+        # The first video resolves last, but keeps the plain name
+        infos = list(yt_fs.scandir('/', namespaces=['details']))
+        self.assertEqual([info.name for info in infos], expected)
+        self.assertEqual([info.size for info in infos], [1, 2, 3, 4])
+        self.assertEqual(yt_fs.listdir('/'), expected)
+        self.assertEqual(yt_fs.getsize('Song (3).mp4'), 4)
+        self.assertTrue(yt_fs.isfile('Song (2).mp4'))
+        self.assertFalse(yt_fs.exists('Song (4).mp4'))
+
+    def test_slashes(self):
+        self.pafy.videos['vid1'].title = 'Artist // Song'
+        yt_fs = YoutubeFS('PLtest')
+        name = yt_fs.listdir('/')[1]
+        self.assertEqual(name, 'Artist / Song.mp4')
+        self.assertTrue(yt_fs.exists(name))
+        self.assertEqual(yt_fs.getsize(name), 2)
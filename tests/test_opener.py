@@ -27,8 +27,10 @@ class TestYoutubeOpener(unittest.TestCase):
         y.close()
 
     def test_open_not_exist(self):
+        # The video is only fetched on first access
+        y = fs.open_fs('youtube://https://www.youtube.com/watch?v=cpPG1bKHYKc')
         with self.assertRaises(IOError):
-            y = fs.open_fs('youtube://https://www.youtube.com/watch?v=cpPG1bKHYKc')
+            y.listdir('/')
 
     def test_open_wrongid(self):
         with self.assertRaises(ValueError):
@@ -0,0 +1,134 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import socket
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs import errors
+from fs.copy import copy_fs
+from fs.memoryfs import MemoryFS
+from fs.youtube import YoutubeFS
+from fs.youtube.pool import HTTPConnectionPool
+from fs.youtube.youtubefs import SeekableHTTPFile
+
+from .fakepafy import FakePafyModule
+from .fakepafy import make_videos
+from .rangeserver import RangeServer
+
+
+class TestHTTPConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(64 * 1024)
+        self.server = RangeServer(self.data).__enter__()
+        self.pool = HTTPConnectionPool(maxsize=4, per_host=2)
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.__exit__()
+
+    def test_reuse(self):
+        for _ in range(10):
+            res = self.pool.urlopen(self.server.url, {'Range': 'bytes=0-9'})
+            self.assertEqual(res.status, 206)
+            self.assertEqual(res.read(), self.data[:10])
+        self.assertEqual(self.server.requests, 10)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_unread_response_not_reused(self):
+        res = self.pool.urlopen(self.server.url)
+        res.read(10)
+        res.close()
+        self.pool.urlopen(self.server.url, {'Range': 'bytes=0-0'}).read()
+        self.assertEqual(self.server.connections, 2)
+
+    def test_per_host_limit(self):
+        responses = [self.pool.urlopen(self.server.url) for _ in range(3)]
+        for res in responses:
+            res.read()
+        self.assertEqual(self.server.connections, 3)
+        self.assertEqual(len(self.pool._idle[self.pool._key(self.server.url)]), 2)
+
+    def test_idle_eviction(self):
+        self.pool.idle_timeout = 0.05
+        self.pool.urlopen(self.server.url).read()
+        time.sleep(0.1)
+        self.pool.urlopen(self.server.url).read()
+        self.assertEqual(self.server.connections, 2)
+
+    def test_seekable_file(self):
+        f = SeekableHTTPFile(self.server.url, pool=self.pool)
+        self.assertEqual(f.read(100), self.data[:100])
+        f.seek(1000)
+        self.assertEqual(f.read(10), self.data[1000:1010])
+        f.close()
+        self.assertEqual(self.server.connections, 1)
+
+    def test_timeout_not_retried(self):
+        pool = HTTPConnectionPool(timeout=0.2)
+        self.addCleanup(pool.clear)
+        res = pool.urlopen(self.server.url, {'Range': 'bytes=0-9'})
+        self.assertEqual(res.read(), self.data[:10])
+        self.server.latency = 0.5
+        with self.assertRaises(socket.timeout):
+            pool.urlopen(self.server.url, {'Range': 'bytes=0-9'})
+        # The request was sent once, on the reused connection
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_seekable_file_unreachable(self):
+        url = self.server.url
+        self.server.__exit__()
+        with self.assertRaises(errors.RemoteConnectionError):
+            SeekableHTTPFile(url, pool=self.pool)
+        self.server = RangeServer(self.data).__enter__()
+
+    def test_stream_errors(self):
+        fake = FakePafyModule(make_videos(self.server.url, [len(self.data)]))
+        with mock.patch('fs.youtube.youtubefs.pafy', fake):
+            yt_fs = YoutubeFS('PLtest', seekable=False)
+            name, = yt_fs.listdir('/')
+            self.assertEqual(yt_fs.readbytes(name), self.data)
+            # Error pages are not served as the contents of the file
+            self.server.failures = 1
+            with self.assertRaises(errors.RemoteConnectionError):
+                yt_fs.openbin(name)
+            self.server.forbidden.add('/video.mp4')
+            with self.assertRaises(errors.RemoteConnectionError):
+                yt_fs.openbin(name)
+            # The URL was refreshed once before giving up
+            self.assertEqual(fake.calls['new'], 2)
+
+    def _run(self, func):
+        # A deadlock would hang the suite: give up after a few seconds
+        thread = threading.Thread(target=func)
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive(), 'deadlocked')
+
+    def test_list_while_locked(self):
+        fake = FakePafyModule(make_videos(self.server.url, [len(self.data)] * 3))
+        with mock.patch('fs.youtube.youtubefs.pafy', fake):
+            yt_fs = YoutubeFS('PLtest')
+            names = []
+
+            def listdir():
+                with yt_fs.lock():
+                    names.extend(yt_fs.listdir('/'))
+
+            self._run(listdir)
+            self.assertEqual(len(names), 3)
+            mem_fs = MemoryFS()
+            self._run(lambda: copy_fs(YoutubeFS('PLtest'), mem_fs))
+            self.assertEqual(sorted(mem_fs.listdir('/')), sorted(names))
+            self.assertEqual(mem_fs.readbytes(names[0]), self.data)
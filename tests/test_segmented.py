@@ -0,0 +1,84 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import io
+import os
+import socket
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs import errors
+from fs.youtube.pool import HTTPConnectionPool
+from fs.youtube.pool import PooledResponse
+from fs.youtube.segmented import SegmentedDownload
+from fs.youtube.shaping import TransferScheduler
+
+from .rangeserver import RangeServer
+
+
+class TestSegmentedDownload(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(100 * 1024 + 7)
+        self.server = RangeServer(self.data).__enter__()
+        self.pool = HTTPConnectionPool()
+
+    def tearDown(self):
+        self.pool.clear()
+        self.server.__exit__()
+
+    def make_download(self, **kwargs):
+        kwargs.setdefault('segment_size', 8 * 1024)
+        return SegmentedDownload(
+            self.server.url, len(self.data), self.pool, **kwargs)
+
+    def test_readinto(self):
+        buffer = bytearray(len(self.data))
+        self.assertEqual(self.make_download().readinto(buffer), len(self.data))
+        self.assertEqual(bytes(buffer), self.data)
+        self.assertEqual(self.server.requests, 13)
+
+    def test_readinto_memoryview(self):
+        buffer = bytearray(len(self.data) + 10)
+        self.make_download().readinto(memoryview(buffer)[10:])
+        self.assertEqual(bytes(buffer[10:]), self.data)
+
+    def test_download(self):
+        out = io.BytesIO()
+        self.make_download(segments=3).download(out)
+        self.assertEqual(out.getvalue(), self.data)
+
+    def test_single_segment(self):
+        out = io.BytesIO()
+        self.make_download(segments=1, segment_size=len(self.data)).download(out)
+        self.assertEqual(out.getvalue(), self.data)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_retry(self):
+        self.server.failures = 2
+        out = io.BytesIO()
+        self.make_download(segments=1, retries=2).download(out)
+        self.assertEqual(out.getvalue(), self.data)
+
+    def test_retries_exhausted(self):
+        self.server.failures = 3
+        with self.assertRaises(errors.RemoteConnectionError):
+            self.make_download(segments=1, retries=2).download(io.BytesIO())
+
+    def test_failed_reads_release_connections(self):
+        scheduler = TransferScheduler(max_connections=2)
+        self.pool = HTTPConnectionPool(scheduler=scheduler)
+        error = socket.error('connection reset')
+        with mock.patch.object(PooledResponse, 'readinto', side_effect=error):
+            with self.assertRaises(errors.RemoteConnectionError):
+                self.make_download(segments=4, retries=2).download(
+                    io.BytesIO())
+        self.assertEqual(scheduler._active, 0)
+        out = io.BytesIO()
+        self.make_download().download(out)
+        self.assertEqual(out.getvalue(), self.data)
@@ -0,0 +1,191 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.youtube import YoutubeFS
+from fs.youtube.pool import HTTPConnectionPool
+from fs.youtube.shaping import BACKGROUND
+from fs.youtube.shaping import INTERACTIVE
+from fs.youtube.shaping import TokenBucket
+from fs.youtube.shaping import TransferScheduler
+
+from .fakepafy import FakePafyModule
+from .fakepafy import make_videos
+from .rangeserver import RangeServer
+
+KEY = ('http', '127.0.0.1', 80)
+
+
+def start(target, *args):
+    thread = threading.Thread(target=target, args=args)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_rate(self):
+        bucket = TokenBucket(100000, burst=10000)
+        begin = time.time()
+        for _ in range(5):
+            bucket.consume(10000)
+        # The first 10000 bytes are the burst
+        self.assertGreaterEqual(time.time() - begin, 0.35)
+
+    def test_large_amount(self):
+        bucket = TokenBucket(100000, burst=1000)
+        bucket.consume(50000)
+        begin = time.time()
+        bucket.consume(1000)
+        self.assertGreaterEqual(time.time() - begin, 0.4)
+
+    def test_priority(self):
+        bucket = TokenBucket(10000, burst=1000)
+        bucket.consume(1000)
+        order = []
+
+        def consume(priority):
+            bucket.consume(1000, priority)
+            order.append(priority)
+
+        background = start(consume, BACKGROUND)
+        interactive = [start(consume, INTERACTIVE) for _ in range(2)]
+        for thread in [background] + interactive:
+            thread.join()
+        self.assertEqual(order, [INTERACTIVE, INTERACTIVE, BACKGROUND])
+
+
+class TestTransferScheduler(unittest.TestCase):
+
+    def test_max_connections(self):
+        scheduler = TransferScheduler(max_connections=2, reserve=0)
+        scheduler.acquire(KEY)
+        scheduler.acquire(KEY, BACKGROUND)
+        waiter = start(scheduler.acquire, KEY)
+        waiter.join(0.1)
+        self.assertTrue(waiter.is_alive())
+        scheduler.release(KEY)
+        waiter.join(1)
+        self.assertFalse(waiter.is_alive())
+
+    def test_reserve(self):
+        scheduler = TransferScheduler(max_connections=2)
+        scheduler.acquire(KEY, BACKGROUND)
+        background = start(scheduler.acquire, KEY, BACKGROUND)
+        background.join(0.1)
+        # The last slot is kept for interactive requests
+        self.assertTrue(background.is_alive())
+        scheduler.acquire(KEY, INTERACTIVE)
+        scheduler.release(KEY)
+        scheduler.release(KEY)
+        background.join(1)
+        self.assertFalse(background.is_alive())
+
+    def test_reserve_over_limit(self):
+        scheduler = TransferScheduler(max_connections=1)
+        # A single slot is not reserved: background requests may take it
+        background = start(scheduler.acquire, KEY, BACKGROUND)
+        background.join(1)
+        self.assertFalse(background.is_alive())
+        interactive = start(scheduler.acquire, KEY)
+        interactive.join(0.1)
+        self.assertTrue(interactive.is_alive())
+        scheduler.release(KEY)
+        interactive.join(1)
+        self.assertFalse(interactive.is_alive())
+
+    def test_interactive_first(self):
+        scheduler = TransferScheduler(max_connections=1)
+        scheduler.acquire(KEY)
+        order = []
+
+        def acquire(priority):
+            scheduler.acquire(KEY, priority)
+            order.append(priority)
+            scheduler.release(KEY)
+
+        background = start(acquire, BACKGROUND)
+        time.sleep(0.05)
+        interactive = start(acquire, INTERACTIVE)
+        time.sleep(0.05)
+        scheduler.release(KEY)
+        for thread in (background, interactive):
+            thread.join(1)
+        self.assertEqual(order, [INTERACTIVE, BACKGROUND])
+
+    def test_per_host(self):
+        scheduler = TransferScheduler(per_host=1)
+        other = ('http', 'example.com', 80)
+        scheduler.acquire(KEY)
+        scheduler.acquire(other)
+        waiter = start(scheduler.acquire, KEY)
+        waiter.join(0.1)
+        self.assertTrue(waiter.is_alive())
+        scheduler.release(KEY)
+        waiter.join(1)
+        self.assertFalse(waiter.is_alive())
+
+
+class TestPoolScheduling(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(50000)
+        self.server = RangeServer(self.data, latency=0.1).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+
+    def test_connection_limit(self):
+        scheduler = TransferScheduler(max_connections=2)
+        pool = HTTPConnectionPool(scheduler=scheduler)
+        self.addCleanup(pool.clear)
+        begin = time.time()
+        threads = [
+            start(lambda: pool.urlopen(self.server.url).read())
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.time() - begin, 0.3)
+        # HEAD requests and closed responses give their slot back
+        pool.urlopen(self.server.url, method='HEAD')
+        pool.urlopen(self.server.url).close()
+        self.assertEqual(scheduler._active, 0)
+
+    def test_bandwidth(self):
+        scheduler = TransferScheduler(rate=100000, burst=10000)
+        pool = HTTPConnectionPool(scheduler=scheduler)
+        self.addCleanup(pool.clear)
+        res = pool.urlopen(self.server.url)
+        begin = time.time()
+        data = b''
+        while True:
+            chunk = res.read(10000)
+            if not chunk:
+                break
+            data += chunk
+        self.assertEqual(data, self.data)
+        self.assertGreaterEqual(time.time() - begin, 0.35)
+
+    def test_youtubefs(self):
+        fake = FakePafyModule(make_videos(self.server.url, [50000] * 3))
+        with mock.patch('fs.youtube.youtubefs.pafy', fake):
+            yt_fs = YoutubeFS('PLtest', max_connections=1, bandwidth=10 ** 6)
+            self.addCleanup(yt_fs.close)
+            for name in yt_fs.listdir('/'):
+                self.assertEqual(yt_fs.readbytes(name), self.data)
+                with yt_fs.openbin(name) as f:
+                    f.seek(1000)
+                    self.assertEqual(f.read(100), self.data[1000:1100])
+            self.assertEqual(yt_fs._scheduler._active, 0)
+            self.assertGreater(
+                yt_fs.metrics.histogram('connection_wait_seconds')['count'], 0)
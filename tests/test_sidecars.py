@@ -0,0 +1,116 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import json
+import os
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs import errors
+from fs.opener.parse import parse_fs_url
+from fs.opener.youtubefs import YouTubeOpener
+from fs.youtube import YoutubeFS
+from fs.youtube.cache import BlobCache
+from fs.youtube.sidecars import check_sidecars
+from fs.youtube.sidecars import sidecar_names
+
+from .fakepafy import FakePafyModule
+from .fakepafy import make_videos
+from .rangeserver import RangeServer
+
+
+class TestBlobCache(unittest.TestCase):
+
+    def test_size(self):
+        cache = BlobCache(max_size=10)
+        cache.set('a', b'1234')
+        cache.set('b', b'1234')
+        self.assertEqual(cache.get('a'), b'1234')
+        cache.set('c', b'1234')
+        # The least recently used item is dropped
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.size, 8)
+        cache.set('d', b'x' * 11)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(len(cache), 2)
+
+
+class TestNames(unittest.TestCase):
+
+    def test_names(self):
+        self.assertEqual(check_sidecars(['info', 'thumbnail']),
+                         ('thumbnail', 'info'))
+        self.assertRaises(ValueError, check_sidecars, ['subtitles'])
+        self.assertEqual(sidecar_names('A (2).mp4', ('thumbnail', 'info')), [
+            ('thumbnail', 'A (2).jpg'), ('info', 'A (2).info.json')])
+
+
+class TestSidecars(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(5000)
+        self.server = RangeServer(self.data).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        base = self.server.url.rsplit('/', 1)[0]
+        videos = make_videos(self.server.url, [len(self.data)] * 3)
+        for video in videos:
+            path = '/%s.jpg' % video.videoid
+            self.server.routes[path] = video.videoid.encode('ascii') * 10
+            video.bigthumbhd = base + path
+        self.pafy = FakePafyModule(videos)
+        patcher = mock.patch('fs.youtube.youtubefs.pafy', self.pafy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fs = YoutubeFS('PLtest', sidecars=['thumbnail', 'info'])
+        self.addCleanup(self.fs.close)
+
+    def test_listing(self):
+        self.assertEqual(self.fs.listdir('/')[:3], [
+            'Video 0.mp4', 'Video 0.jpg', 'Video 0.info.json'])
+        self.assertEqual(len(self.fs.listdir('/')), 9)
+        # Fetched once, during the first listing
+        self.assertEqual(self.server.paths['/vid1.jpg'], 1)
+        requests = self.server.requests
+        self.assertEqual(self.fs.readbytes('Video 1.jpg'), b'vid1' * 10)
+        self.assertEqual(self.fs.getsize('Video 2.jpg'), 40)
+        self.assertEqual(self.server.requests, requests)
+
+    def test_info(self):
+        self.fs.listdir('/')
+        info = json.loads(self.fs.readtext('Video 1.info.json'))
+        self.assertEqual(info['videoid'], 'vid1')
+        self.assertNotIn('url', info)
+        self.assertTrue(self.fs.isfile('Video 1.info.json'))
+
+    def test_scandir(self):
+        infos = list(self.fs.scandir('/', namespaces=['details']))
+        self.assertEqual(infos[1].name, 'Video 0.jpg')
+        self.assertEqual(infos[1].size, 40)
+        self.assertEqual(infos[0].size, len(self.data))
+
+    def test_fetched_on_open(self):
+        self.fs.listdir('/')
+        self.fs._blobs.clear()
+        with self.fs.openbin('Video 0.jpg') as f:
+            self.assertEqual(f.read(), b'vid0' * 10)
+        self.assertEqual(self.server.paths['/vid0.jpg'], 2)
+
+    def test_missing_thumbnail(self):
+        del self.server.routes['/vid2.jpg']
+        self.server.forbidden.add('/vid2.jpg')
+        # Videos are listed even if their thumbnail fails
+        self.assertEqual(len(self.fs.listdir('/')), 9)
+        self.assertRaises(
+            errors.RemoteConnectionError, self.fs.readbytes, 'Video 2.jpg')
+
+    def test_opener(self):
+        url = 'youtube://PLtest?sidecars=info'
+        yt_fs = YouTubeOpener.open_fs(url, parse_fs_url(url), False, False, '.')
+        self.assertEqual(yt_fs.sidecars, ('info',))
+        self.assertEqual(yt_fs.listdir('/')[:2], [
+            'Video 0.mp4', 'Video 0.info.json'])
@@ -0,0 +1,176 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import threading
+import time
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.youtube import YoutubeFS
+from fs.youtube.metrics import Metrics
+from fs.youtube.pool import HTTPConnectionPool
+from fs.youtube.singleflight import SingleFlight
+from fs.youtube.youtubefs import SeekableHTTPFile
+
+from .fakepafy import SINGLE_PREFIX
+from .fakepafy import SINGLE_URL
+from .fakepafy import FakePafyModule
+from .fakepafy import FakeStream
+from .fakepafy import make_videos
+from .rangeserver import RangeServer
+
+
+def run_threads(count, target):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as error:
+            results[i] = error
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_shared_result(self):
+        metrics = Metrics()
+        flights = SingleFlight(metrics)
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.2)
+            return object()
+
+        results = run_threads(8, lambda: flights.do('key', work))
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(metrics.counter('coalesced'), 7)
+        self.assertEqual(len(flights), 0)
+        flights.do('key', work)
+        self.assertEqual(len(calls), 2)
+
+    def test_shared_error(self):
+        flights = SingleFlight()
+
+        def work():
+            time.sleep(0.2)
+            raise IOError('extraction failed')
+
+        results = run_threads(4, lambda: flights.do('key', work))
+        self.assertTrue(all(isinstance(r, IOError) for r in results))
+        self.assertEqual(len(flights), 0)
+
+    def test_shared_base_exception(self):
+        flights = SingleFlight()
+        started = threading.Event()
+        results = []
+
+        class Interrupt(BaseException):
+            pass
+
+        def work():
+            started.set()
+            time.sleep(0.2)
+            raise Interrupt()
+
+        def run():
+            try:
+                results.append(flights.do('key', work))
+            except BaseException as error:
+                results.append(error)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(isinstance(r, Interrupt) for r in results))
+        self.assertEqual(len(flights), 0)
+
+
+class TestCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        self.data = os.urandom(64 * 1024)
+        self.server = RangeServer(self.data, latency=0.2).__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+
+    def test_extractions(self):
+        fake = FakePafyModule(make_videos(
+            self.server.url, [len(self.data)], prefix=SINGLE_PREFIX))
+        fake.videos[SINGLE_PREFIX + '0'].delay = 0.2
+        with mock.patch('fs.youtube.youtubefs.pafy', fake):
+            yt_fs = YoutubeFS(
+                SINGLE_URL, playlist=False)
+            name = yt_fs.listdir('/')[0]
+            yt_fs._videos.clear()
+            infos = run_threads(
+                10, lambda: yt_fs.getinfo(name, namespaces=['details']))
+        self.assertEqual([info.size for info in infos], [len(self.data)] * 10)
+        self.assertEqual(fake.calls['new'], 2)
+        self.assertEqual(yt_fs.metrics.counter('coalesced_extractions'), 9)
+
+    def test_block_fetches(self):
+        pool = HTTPConnectionPool(per_host=8)
+        self.addCleanup(pool.clear)
+        flights = SingleFlight()
+        files = [
+            SeekableHTTPFile(self.server.url, pool=pool, block_size=4096,
+                             flights=flights)
+            for _ in range(8)
+        ]
+        requests = self.server.requests
+        start = threading.Event()
+        threading.Timer(0.1, start.set).start()
+
+        def read(f):
+            start.wait()
+            return f.read(4096)
+
+        files = iter(files)
+        results = run_threads(8, lambda: read(next(files)))
+        self.assertEqual(results, [self.data[:4096]] * 8)
+        self.assertEqual(self.server.requests - requests, 1)
+
+    def test_url_refresh(self):
+        url = self.server.url + '?sig=0'
+        fake = FakePafyModule(
+            make_videos(url, [len(self.data)], prefix=SINGLE_PREFIX))
+        with mock.patch('fs.youtube.youtubefs.pafy', fake):
+            yt_fs = YoutubeFS(
+                SINGLE_URL, playlist=False,
+                block_size=4096)
+            name = yt_fs.listdir('/')[0]
+            files = [yt_fs.openbin(name) for _ in range(4)]
+            self.server.forbidden.add('/video.mp4?sig=0')
+            fake.videos[SINGLE_PREFIX + '0'].stream = FakeStream(
+                self.server.url + '?sig=1', len(self.data))
+            fake.videos[SINGLE_PREFIX + '0'].delay = 0.2
+
+            def read(i):
+                files[i].seek(i * 4096)
+                return files[i].read(10)
+
+            indexes = iter(range(4))
+            results = run_threads(4, lambda: read(next(indexes)))
+        self.assertEqual(
+            sorted(results), sorted(self.data[i * 4096:][:10] for i in range(4)))
+        self.assertEqual(fake.calls['new'], 2)
+        self.assertEqual(yt_fs.metrics.counter('url_refreshes'), 4)
@@ -0,0 +1,105 @@
+# coding: utf-8
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from fs.opener.parse import parse_fs_url
+from fs.opener.youtubefs import YouTubeOpener
+from fs.youtube import YoutubeFS
+from fs.youtube.streams import check_quality
+from fs.youtube.streams import select_stream
+
+from .fakepafy import FakePafy
+from .fakepafy import FakePafyModule
+from .fakepafy import FakeStream
+
+
+def make_video(videoid='vid0'):
+    url = 'http://127.0.0.1:1/%s' % videoid
+    return FakePafy(
+        videoid, 'Video %s' % videoid, FakeStream(url + '/22', 300, itag='22'),
+        streams=[
+            FakeStream(url + '/18', 100, itag='18', dimensions=(640, 360)),
+            FakeStream(url + '/36', 50, '3gp', itag='36', dimensions=(320, 240)),
+            FakeStream(url + '/140', 30, 'm4a', itag='140', dimensions=(0, 0),
+                       mediatype='audio'),
+            FakeStream(url + '/137', 500, itag='137', dimensions=(1920, 1080),
+                       mediatype='video'),
+        ],
+    )
+
+
+class TestSelectStream(unittest.TestCase):
+
+    def test_select(self):
+        video = make_video()
+        itags = {
+            'best': '22',
+            'worst': '36',
+            'bestaudio': '140',
+            'bestvideo': '137',
+            '480p': '18',
+            '360p': '18',
+            '300p': '36',
+            '144p': '36',
+            '1080p': '22',
+            '140': '140',
+            '999': '22',
+        }
+        for quality, itag in itags.items():
+            check_quality(quality)
+            self.assertEqual(select_stream(video, quality).itag, itag, quality)
+
+    def test_fallback_to_best(self):
+        video = FakePafy('vid0', 'Video', FakeStream('http://127.0.0.1:1/', 10))
+        self.assertIs(select_stream(video, 'bestaudio'), video.stream)
+        self.assertIs(select_stream(video, 'bestvideo'), video.stream)
+
+    def test_invalid(self):
+        for quality in ('high', '360P', 'p', ''):
+            self.assertRaises(ValueError, check_quality, quality)
+
+
+class TestQuality(unittest.TestCase):
+
+    def setUp(self):
+        self.pafy = FakePafyModule([make_video('vid0'), make_video('vid1')])
+        patcher = mock.patch('fs.youtube.youtubefs.pafy', self.pafy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_audio(self):
+        yt_fs = YoutubeFS('PLtest', quality='bestaudio')
+        names = yt_fs.listdir('/')
+        self.assertEqual(names, ['Video vid0.m4a', 'Video vid1.m4a'])
+        info = yt_fs.getinfo(names[0], namespaces=['details', 'mediaproxy.media'])
+        self.assertEqual(info.size, 30)
+        self.assertEqual(info.get('mediaproxy.media', 'mediatype'), 'audio')
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, YoutubeFS, 'PLtest', quality='high')
+
+    def test_invalid_allocates_nothing(self):
+        with mock.patch('fs.youtube.youtubefs.HTTPConnectionPool') as pool, \
+                mock.patch('fs.youtube.youtubefs.ChunkCache') as cache, \
+                mock.patch('fs.youtube.youtubefs.MetadataIndex') as index:
+            with self.assertRaises(ValueError):
+                YoutubeFS('PLtest', quality='high', cache_dir='cache',
+                          index_path='index.db')
+        self.assertFalse(pool.called)
+        self.assertFalse(cache.called)
+        self.assertFalse(index.called)
+
+    def test_opener(self):
+        url = 'youtube://PLtest?quality=360p'
+        yt_fs = YouTubeOpener.open_fs(url, parse_fs_url(url), False, False, '.')
+        self.assertEqual(yt_fs.quality, '360p')
+        name = yt_fs.listdir('/')[0]
+        info = yt_fs.getinfo(name, namespaces=['mediaproxy.media'])
+        self.assertEqual(info.get('mediaproxy.media', 'quality'), '640x360')
@@ -197,8 +197,11 @@ class TestYoutubeFS(unittest.TestCase):
             data_part = read_file.read(90)
             read_file.seek(-10, whence=1)
             assert read_file.tell() == 90
-            with self.assertRaises(errors.Unsupported):
-                read_file.seek(10, whence=2)
+            size = self.fs.getsize(testfile)
+            read_file.seek(-10, whence=2)
+            assert read_file.tell() == size - 10
+            assert len(read_file.read(100)) == 10
+            assert read_file.read(100) == b''
             with self.assertRaises(errors.Unsupported):
                 read_file.seek(10, whence=10)
 
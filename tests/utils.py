@@ -8,7 +8,6 @@ except ImportError:
     import mock
 
 import os
-import time
 import fs
 
 try:
@@ -27,7 +26,3 @@ except ImportError:
 
 CI = os.getenv('CI', '').lower() == 'true'
 FSVERSION = tuple(map(int, fs.__version__.split('.')))
-
-if DOCKER:
-    pass
-time.sleep(15)